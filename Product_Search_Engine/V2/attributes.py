@@ -0,0 +1,147 @@
+"""
+Per-file attribute records.
+
+Every questionnaire criterion is "some term of the criterion is a substring of
+the searchable path". For the fixed vocabulary of constants.py (material,
+color and design codes, questionnaire heights and whole-inch widths) that test
+is run once per file and term and stored as one bit per term, so a search only
+ORs the selected bits into a mask and ANDs it with the record column. A term's
+bits are computed for every row the first time a query or facet count asks
+for it, so the first query over a table only pays for its own terms; the
+column is computed into a copy and swapped in under a lock, so concurrent
+searches and facet counts never see or lose a partly written column. Terms
+outside the vocabulary (free-text widths, unknown codes) fall back to the
+table's substring columns, so results are unchanged.
+
+name_codes() reads the supplier code and folder code from a path
+("..._<nn>_<SUP>_Q8.jpg") as small integer ids (FeatureTable.name_codes).
+"""
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from .constants import SUPPLIER_CODES_LOWER, HEIGHT_OPTIONS, ATTRIBUTE_WIDTHS, MATERIAL_MAP, COLOR_MAP, DESIGN_MAP
+from .parsing import (
+    MATERIAL_CODES, COLOR_CODES, DESIGN_LABEL_TO_CODE,
+    normalize_token, normalize_height_token, normalize_inches_token, generate_size_variants,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+    from .scoring import FeatureTable
+
+# Bit j of a record field means "term j of the field's vocabulary is present".
+VOCABULARY: Dict[str, Tuple[str, ...]] = {
+    "material": tuple(sorted(normalize_token(c) for c in MATERIAL_CODES)),
+    "color": tuple(sorted(normalize_token(c) for c in COLOR_CODES)),
+    "size": tuple(normalize_height_token(h) for h in HEIGHT_OPTIONS)
+            + tuple(normalize_inches_token(f'{w}"') for w in ATTRIBUTE_WIDTHS),
+    "design": tuple(sorted({normalize_token(c) for c in DESIGN_LABEL_TO_CODE.values()})),
+}
+HEIGHT_TERMS = frozenset(VOCABULARY["size"][:len(HEIGHT_OPTIONS)])
+BITS: Dict[str, Dict[str, int]] = {f: {t: j for j, t in enumerate(v)} for f, v in VOCABULARY.items()}
+SUPPLIERS: Tuple[str, ...] = tuple(sorted(SUPPLIER_CODES_LOWER))
+_SUPPLIER_ID = {s: i for i, s in enumerate(SUPPLIERS)}
+
+for _field, _vocab in VOCABULARY.items():
+    assert len(_vocab) <= 64, f"{_field} vocabulary does not fit a 64-bit record field"
+
+
+def term_substrings(field: str, term: str) -> List[str]:
+    """
+    The substrings whose presence makes term satisfy field (sizes match any
+    variant). A variant containing another one is implied by it and dropped.
+    """
+    if field == "size":
+        variants = {v for v in generate_size_variants(term) if v}
+        return sorted(v for v in variants if not any(u != v and u in v for u in variants))
+    return [term]
+
+
+def supplier_id(code: str) -> int:
+    """Id of a supplier code in SUPPLIERS (any case), -1 if unknown."""
+    return _SUPPLIER_ID.get(code.lower(), -1)
+
+
+def name_codes(searchable: str) -> Tuple[int, int]:
+    """(supplier id, folder code) from the last supplier token of a searchable path; -1 where absent."""
+    tokens = searchable.split("_")
+    for k in range(len(tokens) - 1, -1, -1):
+        sid = _SUPPLIER_ID.get(tokens[k])
+        if sid is not None:
+            prev = tokens[k - 1] if k else ""
+            return sid, int(prev) if prev.isdigit() and len(prev) <= 6 else -1
+    return -1, -1
+
+
+def label_counts(counts: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    """Facet counts keyed by code (scoring.facet_counts) re-keyed by questionnaire option label."""
+    def by_label(field, labels):
+        return {label: counts[field].get(code, 0) for label, code in labels}
+    return {
+        "material": by_label("material", ((k, normalize_token(v)) for k, v in MATERIAL_MAP.items())),
+        "height": by_label("size", ((h, normalize_height_token(h)) for h in HEIGHT_OPTIONS)),
+        "color": by_label("color", ((k, normalize_token(v)) for k, v in COLOR_MAP.items())),
+        "design": by_label("design", ((k, normalize_token(v)) for k, v in DESIGN_MAP.items())),
+    }
+
+
+class AttributeRecords:
+    """
+    Columnar attribute records for the rows of one FeatureTable: a uint64 bitmask
+    per field (see VOCABULARY). Bits of a term are filled in on first use (see
+    built). Supplier ids and folder codes are FeatureTable.name_codes.
+    """
+    def __init__(self, table: "FeatureTable"):
+        import numpy as np
+        self._table = table
+        self.fields: Dict[str, "np.ndarray"] = {f: np.zeros(len(table), dtype=np.uint64) for f in VOCABULARY}
+        # Per field, the bits of the terms computed so far; set after the column holding them is in fields.
+        self.built: Dict[str, int] = {f: 0 for f in VOCABULARY}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._table)
+
+    def _build(self, field: str, bits: int):
+        """Compute the terms of bits not computed yet into a new column, swapped in before they are marked built."""
+        import numpy as np
+        if not bits & ~self.built[field]:
+            return
+        with self._lock:
+            todo = bits & ~self.built[field]
+            if not todo:
+                return
+            col = self.fields[field].copy()
+            for j, term in enumerate(VOCABULARY[field]):
+                if todo >> j & 1:
+                    hit = self._table.contains_any(term_substrings(field, term))
+                    col |= hit.astype(np.uint64) << np.uint64(j)
+            self.fields[field] = col
+            self.built[field] |= todo
+
+    def mask(self, field: str, terms: Sequence[str]) -> Tuple[int, List[str]]:
+        """(bitmask of the vocabulary terms, terms outside the vocabulary)."""
+        bits, extra = 0, []
+        lookup = BITS[field]
+        for t in terms:
+            j = lookup.get(t)
+            if j is None:
+                extra.append(t)
+            else:
+                bits |= 1 << j
+        return bits, extra
+
+    def satisfies(self, field: str, bits: int) -> "np.ndarray":
+        """Rows that have at least one of the bits set."""
+        import numpy as np
+        self._build(field, bits)
+        return (self.fields[field] & np.uint64(bits)) != 0
+
+    def field_counts(self, field: str, rows: Optional["np.ndarray"] = None) -> Dict[str, int]:
+        """Rows (all, or those where rows is True) having each vocabulary term of field."""
+        import numpy as np
+        self._build(field, (1 << len(VOCABULARY[field])) - 1)
+        col = self.fields[field] if rows is None else self.fields[field][rows]
+        # Unpack every uint64 into its 64 bits (little-endian: bit j is column j) and sum per bit.
+        per_bit = np.unpackbits(col.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little").sum(axis=0)
+        return {t: int(per_bit[j]) for j, t in enumerate(VOCABULARY[field])}
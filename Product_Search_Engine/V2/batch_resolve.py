@@ -0,0 +1,118 @@
+"""
+Headless batch resolution of product codes.
+
+Usage:
+  python -m V2.batch_resolve codes.csv -o resolved.csv [--workers N] [--root DIR] [--limit N]
+
+The input is either a CSV (the "code"/"product_code" column, or the first column)
+or a plain newline-separated list. The FolderIndex is loaded once and shared by
+all workers, so supplier lookups and candidate tables are computed once per
+folder and reused by every code that resolves to it. NATURO_PROFILE=1 profiles
+the batch on a single worker and writes the report to naturo_profiles/.
+"""
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import List, Optional, Tuple
+
+from .cli import add_index_arguments, root_dirs_or_exit
+from .folder_index import FolderIndex
+from .sharded_index import open_index
+from . import profiling
+
+CODE_COLUMNS = ("code", "product_code", "product code")
+PATH_SEPARATOR = " | "
+
+
+def read_codes(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        text = f.read()
+    lines = [ln for ln in text.splitlines() if ln.strip()]
+    if not lines:
+        return []
+    if not any("," in ln for ln in lines):
+        # Newline list; product codes never contain commas.
+        return [ln.strip() for ln in lines]
+
+    rows = list(csv.reader(lines))
+    header = [h.strip().lower() for h in rows[0]]
+    col = 0
+    for name in CODE_COLUMNS:
+        if name in header:
+            col = header.index(name)
+            rows = rows[1:]
+            break
+    return [r[col].strip() for r in rows if len(r) > col and r[col].strip()]
+
+
+def resolve_one(index: FolderIndex, code: str, limit: Optional[int] = None) -> Tuple[str, List[str], float]:
+    start = perf_counter()
+    try:
+        paths = index.search_files(code, limit=limit)
+    except Exception as e:
+        print(f"Failed to resolve {code!r}: {e}", file=sys.stderr)
+        paths = []
+    return code, paths, (perf_counter() - start) * 1000.0
+
+
+def resolve_codes(index: FolderIndex, codes: List[str], workers: int = 4,
+                  limit: Optional[int] = None) -> List[Tuple[str, List[str], float]]:
+    """Resolve codes with search_files semantics, preserving input order."""
+    unique = list(dict.fromkeys(codes))
+    if workers <= 1 or profiling.active():
+        # A profiled batch stays on the calling thread so the profiler sees the searches.
+        done = [resolve_one(index, c, limit) for c in unique]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(lambda c: resolve_one(index, c, limit), unique))
+    resolved = {code: (paths, ms) for code, paths, ms in done}
+    return [(code,) + resolved[code] for code in codes]
+
+
+def write_results(path: str, results: List[Tuple[str, List[str], float]]):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["code", "match_count", "matched_paths", "elapsed_ms"])
+        for code, paths, ms in results:
+            w.writerow([code, len(paths), PATH_SEPARATOR.join(paths), f"{ms:.2f}"])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m V2.batch_resolve", description="Resolve a list of product codes to files.")
+    ap.add_argument("input", help="CSV file or newline-separated list of product codes")
+    ap.add_argument("-o", "--output", default="resolved_codes.csv", help="CSV file to write (default: %(default)s)")
+    ap.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 4, help="worker threads (default: CPU count)")
+    add_index_arguments(ap)
+    ap.add_argument("--limit", type=int, help="keep at most this many matches per code (stops scanning early)")
+    args = ap.parse_args(argv)
+
+    root_dirs = root_dirs_or_exit(ap, args)
+
+    codes = read_codes(args.input)
+    t0 = perf_counter()
+    index = open_index(root_dirs, cache_file=args.cache)
+    load_ms = (perf_counter() - t0) * 1000.0
+
+    workers = args.workers
+    if profiling.is_armed():
+        # The profiled batch runs on the calling thread (see resolve_codes).
+        workers = 1
+    t1 = perf_counter()
+    with profiling.profile_next("batch_resolve", codes=len(codes)) as prof:
+        results = resolve_codes(index, codes, workers=workers, limit=args.limit)
+    total_ms = (perf_counter() - t1) * 1000.0
+    write_results(args.output, results)
+
+    found = sum(1 for _, paths, _ in results if paths)
+    print(f"Index loaded in {load_ms:.0f} ms")
+    print(f"Resolved {found}/{len(results)} codes in {total_ms:.0f} ms with {workers} workers -> {args.output}")
+    if prof.report_path:
+        print(f"Profile written to {prof.report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Benchmarks and catalog fixtures; run the modules with python -m V2.bench.<name>
@@ -0,0 +1,126 @@
+"""
+Synthetic catalog trees shaped like the real highlighter-folder drive.
+
+  <SUP>_I_<Name>,<City>/
+    <SUP> PDF/                                   supplier catalogues (.pdf)
+    Price List/
+    <SUP> Selected Item/
+      P_<nn>_<DESIGN>_<MON> <yy>_<w>"<h>F_<MAT>_<SUP>/       folder code <nn>
+        <MAT>_<DESIGN>_<k>L_<w>"<h>F_<nn>_<SUP>/
+          <KP n>_<MAT>_<COL>_CST_<mrp> <DESIGN>_<k>L <w>"<h>F_<nn>_<SUP>_Q8.jpg
+
+Usage:
+  python -m V2.bench.catalog DEST --files 10000 [--seed 7]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from ..constants import SUPPLIER_CODES, MATERIAL_MAP, COLOR_MAP, DESIGN_MAP
+
+NAMES = ["Kiyaan", "LivingPlus", "Regal", "Swift", "Ryan", "Kalky", "Nexus", "Janco", "Heights", "Orange"]
+CITIES = ["Ganour", "Delhi", "Patiala", "Sangrur", "Noida", "Rajkot", "Mumbai", "Surat", "Indore"]
+MONTHS = ["JAN", "APR", "JUL", "OCT"]
+WIDTHS = ["5", "6.5", "10", "12", "16"]
+HEIGHTS = ["8F", "9F", "9.5F"]
+EXTS = [".jpg", ".jpg", ".png", ".jpeg", ".webp"]
+FILES_PER_LEAF = 8
+LEAVES_PER_FOLDER = 4
+
+
+@dataclass
+class CatalogInfo:
+    root: str
+    files: int = 0
+    dirs: int = 0
+    # Product codes that resolve to generated files, and questionnaire selections.
+    codes: List[str] = field(default_factory=list)
+    selections: List[Dict] = field(default_factory=list)
+
+
+def _touch(path: str):
+    with open(path, "a", encoding="utf-8"):
+        pass
+
+
+def generate_catalog(dest: str, n_files: int, seed: int = 7, max_codes: int = 200) -> CatalogInfo:
+    """Create an empty-file catalog of roughly n_files files under dest (deterministic for a seed)."""
+    rng = random.Random(seed)
+    info = CatalogInfo(root=os.path.abspath(dest))
+    suppliers = sorted(SUPPLIER_CODES)
+    materials = sorted(MATERIAL_MAP.values())
+    colors = sorted(COLOR_MAP.values())
+    designs = sorted(DESIGN_MAP.values())
+    per_folder = FILES_PER_LEAF * LEAVES_PER_FOLDER
+    folders_per_supplier = max(1, math.ceil(n_files / (len(suppliers) * per_folder)))
+
+    def mkdir(path):
+        os.makedirs(path, exist_ok=True)
+        info.dirs += 1
+        return path
+
+    mkdir(dest)
+    for s_i, sup in enumerate(suppliers):
+        if info.files >= n_files:
+            break
+        sup_dir = mkdir(os.path.join(dest, f"{sup}_I_{NAMES[s_i % len(NAMES)]},{CITIES[s_i % len(CITIES)]}"))
+        pdf_dir = mkdir(os.path.join(sup_dir, f"{sup} PDF"))
+        for k in range(3):
+            _touch(os.path.join(pdf_dir, f"{k + 1:02d}_{NAMES[s_i % len(NAMES)]} {rng.choice(list(MATERIAL_MAP))} Catalogue {rng.choice(MONTHS)} 2025.pdf"))
+            info.files += 1
+        price_dir = mkdir(os.path.join(sup_dir, "Price List"))
+        _touch(os.path.join(price_dir, f"{sup} Price List 2025.pdf"))
+        info.files += 1
+
+        sel_dir = mkdir(os.path.join(sup_dir, f"{sup} Selected Item"))
+        for f_i in range(1, folders_per_supplier + 1):
+            if info.files >= n_files:
+                break
+            nn = f"{f_i:02d}"
+            mat = rng.choice(materials)
+            design = rng.choice(designs)
+            w, h = rng.choice(WIDTHS), rng.choice(HEIGHTS)
+            size = f'{w}"{h}'
+            folder = mkdir(os.path.join(sel_dir, f"P_{nn}_{design}_{rng.choice(MONTHS)} 25_{size}_{mat}_{sup}"))
+            for l_i in range(LEAVES_PER_FOLDER):
+                lines = rng.randint(4, 16)
+                leaf = mkdir(os.path.join(folder, f"{mat}_{design}_{lines}L_{size}_{nn}_{sup}"))
+                for _ in range(FILES_PER_LEAF):
+                    col = rng.choice(colors)
+                    mrp = rng.choice([265, 390, 450, 975])
+                    kp = rng.randint(1, 999)
+                    name = f"KP {kp}_{mat}_{col}_CST_{mrp} {design}_{lines}L {size}_{nn}_{sup}_Q8{rng.choice(EXTS)}"
+                    _touch(os.path.join(leaf, name))
+                    info.files += 1
+                    if len(info.codes) < max_codes and rng.random() < 0.25:
+                        info.codes.append(f"{kp}_PK_{mat}_{col}_MRP_{mrp}_{design}_{lines}L_{size}_{nn}_{sup}_Q8")
+            if len(info.selections) < max_codes // 4:
+                info.selections.append({
+                    "material": next(k for k, v in MATERIAL_MAP.items() if v == mat),
+                    "height": h,
+                    "width_inches": w,
+                    "color": None,
+                    "designs": [next(k for k, v in DESIGN_MAP.items() if v == design)],
+                })
+    return info
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m V2.bench.catalog", description="Generate a synthetic catalog tree.")
+    ap.add_argument("dest", help="directory to create")
+    ap.add_argument("--files", type=int, default=10000, help="approximate number of files (default: %(default)s)")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+    info = generate_catalog(args.dest, args.files, args.seed)
+    print(json.dumps({"root": info.root, "files": info.files, "dirs": info.dirs,
+                      "sample_codes": info.codes[:5]}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
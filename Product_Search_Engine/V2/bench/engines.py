@@ -0,0 +1,180 @@
+"""
+Search engines that the replay harness can run side by side.
+
+"reference" keeps the original implementations of the routing methods
+(find_supplier_selected_folder, find_folder_with_code: full tree walks, no
+folder summaries or memo), of collect_candidate_files (every listed file
+checked on disk) and of search_files and search_by_selection (scalar per-file
+filter and compute_match_score) so that optimized engines can be checked for
+identical results. Its search_files always narrows by folders; the queries
+where the planner's fallback (planner.py) returns other files are listed in
+replay.PLANNER_DIFFERENCES.
+Extra engines can be named as "package.module:factory", where factory(root_dir,
+cache_file) returns an object with search_files() and search_by_selection().
+"""
+import importlib
+import os
+import re
+from typing import Callable, Dict, Optional, Tuple
+
+from ..constants import FILE_EXTS
+from ..folder_index import FolderIndex, SupplierCandidate
+from ..matching import color_matches, matches_size, file_token_match, compute_match_score
+from ..parsing import (
+    normalize_token, make_searchable, parse_product_code,
+    extract_series_signatures, path_contains_any_signature
+)
+from ..sharded_index import ShardedIndex
+
+
+class ReferenceIndex(FolderIndex):
+    """FolderIndex with the original unoptimized routing and scan loops."""
+
+    def find_supplier_selected_folder(self, supplier: str, gen=None, stats=None) -> Optional[Dict]:
+        best = None
+        stack = [self.tree] if self.tree else []
+        while stack:
+            node = stack.pop()
+            cand = SupplierCandidate(self.score_supplier_node(node, supplier), node)
+            if best is None or best < cand:
+                best = cand
+            stack.extend(v for k, v in node.items() if k not in ("_path", "_files"))
+        return None if best is None else best.node
+
+    def find_folder_with_code(self, parent_node: Dict, folder_code: str, supplier_prefix: Optional[str] = None,
+                              gen=None, stats=None) -> Tuple[Optional[Dict], int, int]:
+        if not parent_node or not folder_code:
+            return None, -1, 10**9
+        fc = normalize_token(folder_code)
+        sp = normalize_token(supplier_prefix) if supplier_prefix else None
+        best = (None, -1, 10**9)
+        parent_depth = len(parent_node.get("_path", "").split(os.sep))
+        stack = [parent_node]
+        while stack:
+            node = stack.pop()
+            base = normalize_token(os.path.basename(node.get("_path", "")))
+            score = 0
+            if re.search(rf'(^|_){re.escape(fc)}(_|$)', base):
+                score += 5
+            if sp and sp in base:
+                score += 2
+            if score > 0:
+                depth = len(node.get("_path", "").split(os.sep)) - parent_depth
+                if score > best[1] or (score == best[1] and depth < best[2]):
+                    best = (node, score, depth)
+            stack.extend(v for k, v in node.items() if k not in ("_path", "_files"))
+        return best
+
+    def _scan_root(self, supplier, folder_code):
+        search_node = self.tree
+        if supplier:
+            sup_node = self.find_supplier_selected_folder(supplier)
+            if sup_node:
+                search_node = sup_node
+        if folder_code and search_node:
+            fc_node, _, _ = self.find_folder_with_code(search_node, folder_code, supplier_prefix=supplier)
+            if fc_node:
+                search_node = fc_node
+        final_node, _ = self.descend_to_images_or_branch(search_node, folder_code, allow_images=True)
+        return final_node or search_node
+
+    def collect_candidate_files(self, start_node, timer=None):
+        if not start_node:
+            return []
+        exts_lower = tuple(ext.lower() for ext in FILE_EXTS)
+
+        def has_valid_ext(name):
+            n = ''.join(ch for ch in name if ch not in ('\u200b', '\u200c', '\u200d'))
+            n = n.replace('\u00a0', ' ')
+            return n.strip().lower().rstrip('.').endswith(exts_lower)
+
+        out = []
+        stack = [start_node]
+        while stack:
+            node = stack.pop()
+            base_path = node.get("_path", "")
+            for fn in node.get("_files", []) or []:
+                try:
+                    full = os.path.join(base_path, fn)
+                    if os.path.isfile(full):
+                        basename = os.path.basename(fn)
+                        if has_valid_ext(basename) or ('.' not in basename):
+                            out.append(full)
+                except Exception:
+                    continue
+            stack.extend(v for k, v in node.items() if k not in ("_path", "_files"))
+        return out
+
+    def _verify(self, code, parsed, paths, base_root):
+        materials = [normalize_token(m) for m in parsed["material"]]
+        colors = [normalize_token(c) for c in parsed["color"]]
+        sizes = parsed["size"]
+        file_token = parsed["file_token"]
+        series_signatures = extract_series_signatures(code)
+        results = []
+        for p in paths:
+            rel = os.path.relpath(p, base_root) if base_root else os.path.basename(p)
+            s = make_searchable(rel)
+            if path_contains_any_signature(rel, series_signatures):
+                results.append(p)
+                continue
+            if materials and not any(m in s for m in materials):
+                continue
+            if colors and not color_matches(s, colors):
+                continue
+            if sizes and not matches_size(s, sizes):
+                continue
+            if not file_token_match(s, file_token):
+                continue
+            results.append(p)
+        return results
+
+    def search_files(self, code):
+        parsed = parse_product_code(code)
+        node = self._scan_root(parsed["supplier"], parsed["folder_code"])
+        return self._verify(code, parsed, self.collect_candidate_files(node),
+                            node.get("_path") if node else self.root_dir)
+
+    def search_by_selection(self, selection, max_suggestions=200):
+        materials = [normalize_token(m) for m in (selection.get("material") or [])]
+        colors = [normalize_token(c) for c in (selection.get("color") or [])]
+        sizes = selection.get("size") or []
+        designs = selection.get("designs") or []
+        file_token = selection.get("file_token")
+        node = self._scan_root(selection.get("supplier"), selection.get("folder_code"))
+        base_root = node.get("_path") if node else self.root_dir
+        provided = {
+            "material": bool(materials),
+            "color": bool(colors),
+            "size": bool(sizes),
+            "design": bool(designs),
+            "file_token": bool(file_token),
+        }
+        exact, suggestions = [], []
+        for p in self.collect_candidate_files(node):
+            rel = os.path.relpath(p, base_root) if base_root else os.path.basename(p)
+            sc, missing = compute_match_score(make_searchable(rel), materials, colors, sizes, designs, file_token)
+            if not any(provided[m] for m in missing):
+                exact.append(p)
+            elif sc > 0:
+                suggestions.append((p, missing, sc))
+        suggestions.sort(key=lambda x: (-x[2], os.path.basename(x[0]).lower()))
+        if max_suggestions is not None:
+            suggestions = suggestions[:max_suggestions]
+        return {"selection": selection}, exact, suggestions
+
+
+ENGINES: Dict[str, Callable] = {
+    "folder_index": lambda root, cache_file: FolderIndex(root, cache_file=cache_file),
+    "sharded": lambda root, cache_file: ShardedIndex([root], cache_file=cache_file),
+    "reference": lambda root, cache_file: ReferenceIndex(root, cache_file=cache_file),
+}
+
+
+def make_engine(spec: str, root: str, cache_file: str):
+    if spec in ENGINES:
+        return ENGINES[spec](root, cache_file)
+    if ":" in spec:
+        mod_name, attr = spec.split(":", 1)
+        return getattr(importlib.import_module(mod_name), attr)(root, cache_file)
+    raise ValueError(f"unknown engine {spec!r}; choose from {sorted(ENGINES)} or use module:factory")
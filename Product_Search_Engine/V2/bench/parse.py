@@ -0,0 +1,112 @@
+"""
+Parser micro-benchmark.
+
+Usage:
+  python -m V2.bench.parse [--codes 20000] [--distinct 2000] [--repeat 5] [--seed 7] [--out parse.json]
+
+A batch of product codes (with repeats, like a real order list) is parsed by the
+legacy parser, by the current parser with its LRU bypassed, and by the memoized
+entry point cold (cache cleared) and warm. The same is done for build_selection.
+Reports throughput in codes per second (best of --repeat runs).
+"""
+import argparse
+import json
+import random
+import sys
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from ..constants import MATERIAL_MAP, COLOR_MAP, DESIGN_MAP, SUPPLIER_CODES
+from .. import parsing
+from . import legacy_parsing
+from .catalog import WIDTHS, HEIGHTS
+
+
+def synthetic_codes(n: int, distinct: int, seed: int = 7) -> List[str]:
+    """n catalogue-style codes drawn from `distinct` unique ones."""
+    rng = random.Random(seed)
+    materials = sorted(MATERIAL_MAP.values())
+    colors = sorted(COLOR_MAP.values())
+    designs = sorted(DESIGN_MAP.values())
+    suppliers = sorted(SUPPLIER_CODES)
+    pool = []
+    for _ in range(max(1, distinct)):
+        size = f'{rng.choice(WIDTHS)}"{rng.choice(HEIGHTS)}'
+        pool.append(f"{rng.randint(1, 999)}_PK_{rng.choice(materials)}_{rng.choice(colors)}_MRP_"
+                    f"{rng.choice([265, 390, 450, 975])}_{rng.choice(designs)}_{rng.randint(4, 16)}L_"
+                    f"{size}_{rng.randint(1, 40):02d}_{rng.choice(suppliers)}_Q8")
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def synthetic_selections(n: int, distinct: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(max(1, distinct)):
+        pool.append({
+            "material": rng.choice(sorted(MATERIAL_MAP)),
+            "height": rng.choice(HEIGHTS + [None]),
+            "width_inches": rng.choice(WIDTHS + [None]),
+            "color": rng.choice(sorted(COLOR_MAP) + [None]),
+            "designs": rng.sample(sorted(DESIGN_MAP), rng.randint(0, 2)),
+        })
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def throughput(fn: Callable, items: List, repeat: int, setup: Callable = None) -> Dict:
+    best = None
+    for _ in range(max(1, repeat)):
+        if setup:
+            setup()
+        t0 = perf_counter()
+        for it in items:
+            fn(it)
+        elapsed = perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return {"items": len(items), "best_ms": round(best * 1000.0, 3),
+            "per_second": round(len(items) / best) if best else None}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m V2.bench.parse", description="Benchmark product-code parsing.")
+    ap.add_argument("--codes", type=int, default=20000, help="codes per batch (default: %(default)s)")
+    ap.add_argument("--distinct", type=int, default=2000, help="unique codes in the batch (default: %(default)s)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    args = ap.parse_args(argv)
+
+    codes = synthetic_codes(args.codes, args.distinct, args.seed)
+    selections = synthetic_selections(args.codes, args.distinct // 4 or 1, args.seed)
+    clear_parse = parsing._parse_product_code_cached.cache_clear
+    clear_selection = parsing._build_selection_cached.cache_clear
+
+    mismatched = sum(1 for c in set(codes) if parsing.parse_product_code(c) != legacy_parsing.parse_product_code(c))
+    report = {
+        "codes": args.codes,
+        "distinct": len(set(codes)),
+        "mismatches_vs_legacy": mismatched,
+        "parse_product_code": {
+            "legacy": throughput(legacy_parsing.parse_product_code, codes, args.repeat),
+            "uncached": throughput(parsing._parse_product_code, codes, args.repeat),
+            "memoized_cold": throughput(parsing.parse_product_code, codes, args.repeat, setup=clear_parse),
+            "memoized_warm": throughput(parsing.parse_product_code, codes, args.repeat),
+        },
+        "build_selection": {
+            "legacy": throughput(lambda s: legacy_parsing.build_selection(**s), selections, args.repeat),
+            "uncached": throughput(lambda s: parsing._build_selection(**s), selections, args.repeat),
+            "memoized_cold": throughput(lambda s: parsing.build_selection(**s), selections, args.repeat,
+                                        setup=clear_selection),
+            "memoized_warm": throughput(lambda s: parsing.build_selection(**s), selections, args.repeat),
+        },
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0 if mismatched == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
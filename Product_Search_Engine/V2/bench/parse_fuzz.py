@@ -0,0 +1,113 @@
+"""
+Differential fuzz check of the product-code parser against the legacy one.
+
+Usage:
+  python -m V2.bench.parse_fuzz [--iterations 200000] [--seed 7]
+
+Codes are generated from catalogue vocabulary (materials, colors, sizes, MRP
+prices, designs, supplier and folder codes), random separators and noise
+(unicode, dots, stray quotes, mixed case), and by mutating the replay corpus.
+Every code is parsed by V2.parsing (uncached) and by V2.bench.legacy_parsing;
+any difference is printed and the exit status is 1.
+"""
+import argparse
+import json
+import random
+import sys
+from time import perf_counter
+from typing import Iterator, List
+
+from ..constants import MATERIAL_MAP, COLOR_MAP, DESIGN_MAP, SUPPLIER_CODES
+from .. import parsing
+from . import legacy_parsing
+from .replay import DEFAULT_CORPUS, load_corpus
+
+SEPARATORS = ["_", "_", "_", " ", "-", "__", ".", ",", "/", " _ ", "\t", "’"]
+NOISE = ['"', '""', "'", ".", "“", "”", "é", "٣", "²", "ß", "İ", "​", " ", "x", "0", "F", "L"]
+
+
+def vocabulary() -> List[str]:
+    words = list(MATERIAL_MAP.values()) + list(COLOR_MAP.values()) + list(DESIGN_MAP.values())
+    words += list(SUPPLIER_CODES) + ["PK", "CST", "Q8", "KP", "MRP", "mrp", "Mrp", "P", "I"]
+    words += ["MRP450", "mrp975", "MRPx", "MRP4a", "450", "02", "7", "0"]
+    words += ['12"', '6.5"', '12"9', '12"9.5F', '12"9F', '5"8F', '12"x', '12""', '"12', "9F", "9.5F", "8f"]
+    words += ["10L", "14l", "L", "F", "10LL", "9FF", "3f4"]
+    return words
+
+
+def random_code(rng: random.Random, words: List[str]) -> str:
+    parts = []
+    for _ in range(rng.randint(0, 14)):
+        w = rng.choice(words)
+        r = rng.random()
+        if r < 0.15:
+            w = w.lower()
+        elif r < 0.2:
+            w = w.upper()
+        elif r < 0.3:
+            w = w + rng.choice(NOISE)
+        elif r < 0.35:
+            w = rng.choice(NOISE) + w
+        parts.append(w)
+        parts.append(rng.choice(SEPARATORS))
+    return "".join(parts[:-1]) if parts else rng.choice(["", " ", "_", "\"", "MRP"])
+
+
+def mutate(rng: random.Random, code: str, words: List[str]) -> str:
+    chars = list(code)
+    for _ in range(rng.randint(1, 4)):
+        op = rng.randrange(4)
+        pos = rng.randint(0, len(chars))
+        if op == 0 and chars:
+            del chars[min(pos, len(chars) - 1)]
+        elif op == 1:
+            chars.insert(pos, rng.choice(SEPARATORS + NOISE))
+        elif op == 2:
+            chars[pos:pos] = list(rng.choice(words))
+        elif chars:
+            i = min(pos, len(chars) - 1)
+            chars[i] = chars[i].swapcase()
+    return "".join(chars)
+
+
+def fuzz_codes(iterations: int, seed: int) -> Iterator[str]:
+    rng = random.Random(seed)
+    words = vocabulary()
+    corpus = [q for kind, q in load_corpus(DEFAULT_CORPUS) if kind == "code"]
+    yield from corpus
+    for _ in range(iterations):
+        if corpus and rng.random() < 0.3:
+            yield mutate(rng, rng.choice(corpus), words)
+        else:
+            yield random_code(rng, words)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m V2.bench.parse_fuzz",
+                                 description="Differential fuzz check of parse_product_code.")
+    ap.add_argument("--iterations", type=int, default=200000)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--max-report", type=int, default=10, help="differences to print (default: %(default)s)")
+    args = ap.parse_args(argv)
+
+    t0 = perf_counter()
+    checked, failures = 0, []
+    for code in fuzz_codes(args.iterations, args.seed):
+        checked += 1
+        expected = legacy_parsing.parse_product_code(code)
+        got = parsing._parse_product_code(code)
+        if got != expected:
+            failures.append({"code": code, "legacy": expected, "current": got})
+            if len(failures) >= args.max_report:
+                break
+    elapsed = perf_counter() - t0
+
+    for f in failures:
+        print(json.dumps(f, ensure_ascii=False))
+    print(f"{checked} codes checked in {elapsed:.1f} s, {len(failures)} difference(s)"
+          f"{' (stopped early)' if len(failures) >= args.max_report else ''}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
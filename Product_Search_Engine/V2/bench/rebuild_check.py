@@ -0,0 +1,105 @@
+"""
+Check that rebuilding a shard after a catalog change is incremental.
+
+Usage:
+  python -m V2.bench.rebuild_check [--files 3000] [--seed 7] [--workdir DIR]
+
+Two generated catalogs are opened as a ShardedIndex and their folder summaries
+and completion tries are built. One file is then added to a folder of the first
+catalog and ShardedIndex.rebuild_shard(force=False) is called, as the server
+watcher does.
+The check fails (exit status 1) unless:
+  - the shard object is kept and publishes a new generation, the other shard is untouched;
+  - the summary of every folder whose fingerprint did not change is reused from
+    the previous build, and only the changed folder and its ancestors are recomputed;
+  - the summaries equal ones built from scratch for the new tree;
+  - the completion trie reads only the changed folder again, and completes
+    like a trie built from scratch for the new tree.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from ..code_completion import CodeCompleter
+from ..constants import COMPLETION_LIMIT
+from ..folder_bloom import build_summaries
+from ..sharded_index import ShardedIndex
+from .catalog import generate_catalog
+
+
+def ancestors(path: str, root: str):
+    out = {path}
+    while path != root:
+        path = os.path.dirname(path)
+        out.add(path)
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m V2.bench.rebuild_check",
+                                 description="Check that shard rebuilds reuse unchanged folders.")
+    ap.add_argument("--files", type=int, default=3000, help="files per catalog (default: %(default)s)")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--workdir", help="directory for the catalogs and caches (default: a temporary one)")
+    args = ap.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rebuild_check_")
+    roots = [os.path.join(workdir, name) for name in ("catalog_a", "catalog_b")]
+    for i, root in enumerate(roots):
+        shutil.rmtree(root, ignore_errors=True)
+        generate_catalog(root, args.files, seed=args.seed + i)
+    failures = []
+    try:
+        index = ShardedIndex(roots, cache_file=os.path.join(workdir, "tree.json"), force_rebuild=True)
+        shard, other = index.shards[roots[0]], index.shards[roots[1]]
+        before, other_gen = shard.generation, other.generation.number
+        summaries = dict(shard.folder_summaries())
+        other.folder_summaries()
+        index.complete_code("")
+
+        changed = sorted(p for p in summaries if p != roots[0])[len(summaries) // 2]
+        with open(os.path.join(changed, "PV_BL_12_9F_99_ADDED.jpg"), "wb"):
+            pass
+        if not index.rebuild_shard(roots[0], force=False):
+            failures.append("rebuild_shard did not publish a generation after the change")
+        if index.shards[roots[0]] is not shard:
+            failures.append("the shard object was replaced")
+        if shard.generation.number <= before.number:
+            failures.append("no new generation was published")
+        if other.generation.number != other_gen:
+            failures.append("the unchanged shard was rebuilt")
+
+        after = shard.folder_summaries()
+        expected_new = ancestors(changed, roots[0])
+        recomputed = {p for p, entry in after.items() if summaries.get(p) is not entry}
+        if recomputed != expected_new:
+            failures.append(f"recomputed {len(recomputed)} folder summaries, expected {len(expected_new)} "
+                            f"(unexpected: {sorted(recomputed - expected_new)[:5]})")
+        scratch = build_summaries(shard.tree)
+        if {p: bloom for p, (_, bloom) in after.items()} != {p: bloom for p, (_, bloom) in scratch.items()}:
+            failures.append("summaries differ from a build from scratch")
+
+        prefixes = ["", "pv", "PV_BL", "ch_", "12"]
+        got = [shard.complete_code(p) for p in prefixes]
+        if shard._completer.folders_read != 1:
+            failures.append(f"completion trie read {shard._completer.folders_read} folders, expected 1")
+        fresh = CodeCompleter()
+        fresh.update(shard.tree)
+        if got != [fresh.complete(p, COMPLETION_LIMIT) for p in prefixes]:
+            failures.append("completions differ from a trie built from scratch")
+        print(f"{len(after)} folders, {len(recomputed)} summaries recomputed and "
+              f"{shard._completer.folders_read} folder(s) read for completion after changing {changed}",
+              file=sys.stderr)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for f in failures:
+        print("FAIL:", f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Replay a corpus of real queries against one or more engines.
+
+Usage:
+  python -m V2.bench.replay [--corpus V2/bench/corpus.txt] [--tree V1/folder_tree.json | --root DIR]
+                            [--engine folder_index --engine reference] [--repeat 5]
+                            [--save run.json] [--compare older_run.json] [--out report.json]
+                            [--allow CODE=N ...]
+
+Reports p50/p95/p99 latency per engine and entry point, and diffs the result
+sets of every engine against the first one (and against --compare, a run saved
+with --save on another commit). Exits with status 1 when any result differs, so
+an optimized engine is only adopted when it returns identical results. The one
+intended difference is the planner's fallback (planner.py): for the code
+searches in PLANNER_DIFFERENCES (or given with --allow for other catalogs) the
+"reference" engine's folder scan finds nothing and other engines return the
+stated number of files named with the code's supplier and folder code instead.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from ..parsing import SELECTION_FIELDS, build_selection
+from .engines import make_engine
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus.txt")
+DEFAULT_TREE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            "V1", "folder_tree.json")
+
+# Code searches of the bundled corpus on DEFAULT_TREE whose folder scan finds nothing,
+# so the planner falls back to the global plan: {query key: files the fallback returns}.
+PLANNER_DIFFERENCES = {
+    "code:CH_LP_LVGU": 22,
+    'code:WP_6.5"9.5F_06_KYGH': 7,
+}
+
+
+def load_corpus(path: str) -> List[Tuple[str, object]]:
+    """[(kind, query)] where kind is "code" (str) or "selection" (raw questionnaire dict)."""
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                out.append(("selection", json.loads(line)))
+            else:
+                out.append(("code", line))
+    return out
+
+
+def materialize_tree(tree_json: str, dest: str) -> str:
+    """Recreate a cached folder tree (folder_tree.json shape) as empty files under dest."""
+    with open(tree_json, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    root = data.get("root", data)
+    old_root = root["_path"]
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        rel = os.path.relpath(node["_path"], old_root)
+        path = os.path.normpath(os.path.join(dest, rel))
+        os.makedirs(path, exist_ok=True)
+        for fn in node.get("_files", []):
+            with open(os.path.join(path, fn), "a", encoding="utf-8"):
+                pass
+        stack.extend(v for k, v in node.items() if k not in ("_path", "_files"))
+    return dest
+
+
+def percentiles(samples: List[float]) -> Dict:
+    """Nearest-rank p50/p95/p99 in ms."""
+    if not samples:
+        return {"count": 0}
+    s = sorted(samples)
+
+    def pct(p):
+        return round(s[max(0, math.ceil(p / 100.0 * len(s)) - 1)], 3)
+
+    return {"count": len(s), "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99), "max_ms": round(s[-1], 3)}
+
+
+def run_engine(engine, corpus, root: str, repeat: int):
+    """Time every query and return (latency report, results keyed by query)."""
+    timings = {"search_files": [], "debug_search_files": [], "search_by_selection": []}
+    results = {}
+
+    def rel(paths):
+        return [os.path.relpath(p, root) for p in paths]
+
+    for kind, query in corpus:
+        if kind == "code":
+            for _ in range(repeat):
+                t0 = perf_counter()
+                paths = engine.search_files(query)
+                timings["search_files"].append((perf_counter() - t0) * 1000.0)
+            if hasattr(engine, "debug_search_files"):
+                for _ in range(repeat):
+                    t0 = perf_counter()
+                    engine.debug_search_files(query)
+                    timings["debug_search_files"].append((perf_counter() - t0) * 1000.0)
+            results["code:" + query] = {"paths": sorted(rel(paths))}
+        else:
+            selection = build_selection(**{k: query.get(k) for k in SELECTION_FIELDS})
+            for _ in range(repeat):
+                t0 = perf_counter()
+                _, exact, suggestions = engine.search_by_selection(selection)
+                timings["search_by_selection"].append((perf_counter() - t0) * 1000.0)
+            results["selection:" + json.dumps(query, sort_keys=True)] = {
+                "exact": sorted(rel(exact)),
+                "suggestions": [[os.path.relpath(p, root), list(missing), sc] for p, missing, sc in suggestions],
+            }
+    latency = {name: percentiles(samples) for name, samples in timings.items() if samples}
+    return latency, results
+
+
+def diff_results(base: Dict, other: Dict, max_examples: int = 10, allowed: Optional[Dict[str, int]] = None) -> Dict:
+    """
+    Queries whose results differ. A key in allowed ({query key: file count}) is not
+    counted when base found no paths and other found exactly that many.
+    """
+    allowed = allowed or {}
+    differing, allowed_diffs = [], []
+    for key in sorted(set(base) | set(other)):
+        if base.get(key) != other.get(key):
+            if key in allowed and base.get(key) == {"paths": []} \
+                    and len((other.get(key) or {}).get("paths") or []) == allowed[key]:
+                allowed_diffs.append(key)
+            else:
+                differing.append(key)
+    examples = []
+    for key in differing[:max_examples]:
+        a, b = base.get(key) or {}, other.get(key) or {}
+        ex = {"query": key}
+        for field in sorted(set(a) | set(b)):
+            va, vb = a.get(field), b.get(field)
+            if va == vb:
+                continue
+            if field == "suggestions":
+                ex[field] = {"base_count": len(va or []), "other_count": len(vb or []),
+                             "first_difference": next((i for i, (x, y) in enumerate(zip(va or [], vb or [])) if x != y),
+                                                      min(len(va or []), len(vb or [])))}
+            else:
+                sa, sb = set(va or []), set(vb or [])
+                ex[field] = {"only_in_base": sorted(sa - sb)[:5], "only_in_other": sorted(sb - sa)[:5]}
+        examples.append(ex)
+    return {"queries": len(set(base) | set(other)), "differing": len(differing), "examples": examples,
+            "allowed": allowed_diffs}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m V2.bench.replay", description="Replay a query corpus and diff engines.")
+    ap.add_argument("--corpus", default=DEFAULT_CORPUS, help="query file (default: bundled corpus.txt)")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--tree", help="folder_tree.json fixture to materialize (default: V1/folder_tree.json)")
+    src.add_argument("--root", help="replay against an existing catalog directory instead of a fixture")
+    ap.add_argument("--engine", action="append", help="engine name or module:factory; first is the baseline "
+                                                      "(default: reference and folder_index)")
+    ap.add_argument("--repeat", type=int, default=5, help="timed runs per query (default: %(default)s)")
+    ap.add_argument("--save", help="save the first engine's result sets for later --compare")
+    ap.add_argument("--compare", help="result sets saved by --save from another version")
+    ap.add_argument("--out", help="write the JSON report here (default: stdout)")
+    ap.add_argument("--allow", action="append", default=[], metavar="CODE=N",
+                    help="code search where the reference finds nothing and the planner's fallback finds N files; "
+                         "repeat for several (default: PLANNER_DIFFERENCES on the bundled fixture)")
+    args = ap.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    engines = args.engine or ["reference", "folder_index"]
+    bundled = not args.root and os.path.abspath(args.tree or DEFAULT_TREE) == DEFAULT_TREE
+    planner_differences = dict(PLANNER_DIFFERENCES) if bundled else {}
+    for item in args.allow:
+        code, _, count = item.rpartition("=")
+        if not code or not count.isdigit():
+            ap.error(f"--allow expects CODE=N, got {item!r}")
+        planner_differences["code:" + code] = int(count)
+    workdir = tempfile.mkdtemp(prefix="naturo-replay-")
+    try:
+        root = args.root or materialize_tree(args.tree or DEFAULT_TREE, os.path.join(workdir, "catalog"))
+        report = {"corpus": args.corpus, "queries": len(corpus), "root": root, "engines": {}, "diffs": {}}
+        all_results = {}
+        for name in engines:
+            engine = make_engine(name, root, os.path.join(workdir, f"tree_{len(all_results)}.json"))
+            latency, results = run_engine(engine, corpus, root, args.repeat)
+            report["engines"][name] = latency
+            all_results[name] = results
+
+        base_name = engines[0]
+        for name in engines[1:]:
+            allowed = planner_differences if base_name == "reference" and name != "reference" else None
+            report["diffs"][f"{base_name} vs {name}"] = diff_results(all_results[base_name], all_results[name],
+                                                                     allowed=allowed)
+        if args.compare:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            report["diffs"][f"{args.compare} vs {base_name}"] = diff_results(saved, all_results[base_name])
+        if args.save:
+            with open(args.save, "w", encoding="utf-8") as f:
+                json.dump(all_results[base_name], f, indent=1, sort_keys=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    identical = all(d["differing"] == 0 for d in report["diffs"].values())
+    allowed = sum(len(d.get("allowed", [])) for d in report["diffs"].values())
+    note = f" ({allowed} planner fallback difference(s) allowed)" if allowed else ""
+    print(("Result sets identical." if identical else "Result sets DIFFER.") + note, file=sys.stderr)
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
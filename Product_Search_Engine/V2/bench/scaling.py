@@ -0,0 +1,195 @@
+"""
+Scaling benchmark over synthetic catalogs.
+
+Usage:
+  python -m V2.bench.scaling --sizes 1000 10000 100000 [--repeat 3] [--out bench.json] [--workdir DIR]
+
+For every size a catalog is generated (or reused from --workdir), then build_tree,
+compute_dir_hash (from scratch and on an unchanged tree), cache save/load (JSON,
+mmap and lazy shard formats), each search entry point and code completion are
+timed, along with the filesystem calls each one issued. Results are written as JSON so runs from
+different commits can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from time import perf_counter, time
+from typing import Callable, Dict, List
+
+from ..code_completion import CodeCompleter
+from ..constants import MAPPED_CACHE_EXT, LAZY_CACHE_EXT
+from ..fingerprint import DirFingerprints, RACY_MTIME_WINDOW
+from ..folder_index import FolderIndex
+from ..fsio import io_accounting
+from ..parsing import build_selection
+from .catalog import generate_catalog
+
+
+def time_call(fn: Callable, repeat: int = 3, setup: Callable = None) -> Dict:
+    """Run fn repeat times (calling setup before each run, untimed) and summarize in ms and I/O calls."""
+    samples = []
+    for _ in range(max(1, repeat)):
+        if setup:
+            setup()
+        with io_accounting() as io:
+            start = perf_counter()
+            fn()
+            samples.append((perf_counter() - start) * 1000.0)
+    return {
+        "runs": len(samples),
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "max_ms": round(max(samples), 3),
+        # filesystem calls of the last run, so removed disk hits show up between commits
+        "io_calls": io.as_dict()["calls"],
+    }
+
+
+def per_query(metric: Dict, n_queries: int) -> Dict:
+    out = dict(metric)
+    out["queries"] = n_queries
+    out["per_query_ms"] = round(metric["median_ms"] / max(1, n_queries), 4)
+    return out
+
+
+def bench_catalog(root: str, codes: List[str], selections: List[Dict], repeat: int, cache_file: str) -> Dict:
+    index = FolderIndex(root, cache_file=cache_file, force_rebuild=True)
+    metrics = {}
+    metrics["build_tree"] = time_call(index.build_tree, repeat)
+    metrics["compute_dir_hash_cold"] = time_call(
+        index.compute_dir_hash, repeat, setup=lambda: setattr(index, "_fingerprints", DirFingerprints(root)))
+    current_hash = index.compute_dir_hash()
+    # Treat the just-generated folders as settled (see RACY_MTIME_WINDOW) to time the unchanged-tree path.
+    index._fingerprints.scanned = time() + RACY_MTIME_WINDOW
+    metrics["compute_dir_hash"] = time_call(index.compute_dir_hash, repeat)
+    metrics["save_cache"] = time_call(lambda: index.save_cache(current_hash), repeat)
+    metrics["load_cache"] = time_call(index.load_cache, repeat)
+    metrics["load_or_build_cached"] = time_call(lambda: FolderIndex(root, cache_file=cache_file), repeat)
+    metrics["load_trusted_cache"] = time_call(
+        lambda: FolderIndex(root, cache_file=cache_file, validate_cache=False), repeat)
+    mapped_file = os.path.splitext(cache_file)[0] + MAPPED_CACHE_EXT
+    mapped = FolderIndex(root, cache_file=mapped_file, validate_cache=False)
+    metrics["save_mapped_cache"] = time_call(lambda: mapped.save_cache(current_hash), repeat)
+    metrics["load_trusted_mapped_cache"] = time_call(
+        lambda: FolderIndex(root, cache_file=mapped_file, validate_cache=False), repeat)
+    lazy_dir = os.path.splitext(cache_file)[0] + LAZY_CACHE_EXT
+    lazy = FolderIndex(root, cache_file=lazy_dir, validate_cache=False)
+    metrics["save_lazy_cache"] = time_call(lambda: lazy.save_cache(current_hash), repeat)
+    metrics["load_trusted_lazy_cache"] = time_call(
+        lambda: FolderIndex(root, cache_file=lazy_dir, validate_cache=False), repeat)
+    # Fresh process-like start on the lazy cache: only the shards the first query resolves to are read.
+    metrics["lazy_cache_first_code_search"] = time_call(
+        lambda: FolderIndex(root, cache_file=lazy_dir, validate_cache=False).search_files(codes[0]), repeat)
+
+    sels = [build_selection(**s) for s in selections]
+    reset = index.clear_query_caches
+
+    def run_codes(fn):
+        return lambda: [fn(c) for c in codes]
+
+    def run_selections():
+        return [index.search_by_selection(s) for s in sels]
+
+    metrics["search_files_cold"] = per_query(time_call(run_codes(index.search_files), repeat, setup=reset), len(codes))
+    metrics["search_files_warm"] = per_query(time_call(run_codes(index.search_files), repeat), len(codes))
+    metrics["debug_search_files_warm"] = per_query(time_call(run_codes(index.debug_search_files), repeat), len(codes))
+    metrics["search_by_selection_cold"] = per_query(time_call(run_selections, repeat, setup=reset), len(sels))
+    metrics["search_by_selection_warm"] = per_query(time_call(run_selections, repeat), len(sels))
+    # Unknown supplier and folder code: resolution fails and the whole tree is scanned.
+    unresolved = [c.rsplit("_", 3)[0] + "_99_ZZZZ_Q8" for c in codes[:20]]
+    metrics["search_files_unresolved_warm"] = per_query(
+        time_call(lambda: [index.search_files(c) for c in unresolved], repeat), len(unresolved))
+    metrics["did_you_mean_warm"] = per_query(
+        time_call(lambda: [index.did_you_mean(c) for c in unresolved], repeat), len(unresolved))
+    broad = build_selection(material="PVC", height=None, width_inches=None, color=None, designs=[])
+    metrics["search_by_selection_broad_cold"] = time_call(lambda: index.search_by_selection(broad), repeat, setup=reset)
+    metrics["search_by_selection_broad_warm"] = time_call(lambda: index.search_by_selection(broad), repeat)
+    # Questionnaire facet counts after a field change (criterion columns of the other fields are memoized).
+    metrics["facet_counts_warm"] = per_query(time_call(lambda: [index.facet_counts(s) for s in sels], repeat), len(sels))
+
+    # Code completion: trie built from scratch, brought to a new generation (unchanged folders
+    # skipped via fingerprints), and one lookup per keystroke of typing every code.
+    metrics["complete_code_build"] = time_call(
+        lambda: index.complete_code(""), repeat, setup=lambda: setattr(index, "_completer", CodeCompleter()))
+    metrics["complete_code_new_generation"] = time_call(lambda: index.complete_code(""), repeat, setup=reset)
+    prefixes = [c[:i] for c in codes for i in range(1, len(c) + 1)]
+    metrics["complete_code_keystroke"] = per_query(
+        time_call(lambda: [index.complete_code(p) for p in prefixes], repeat), len(prefixes))
+
+    hits = sum(1 for c in codes if index.search_files(c))
+    # Folder resolution work on a fresh generation: folders visited vs. subtrees skipped by their Bloom filter.
+    reset()
+    folder_counts = {"folders_visited": 0, "subtrees_pruned": 0}
+    for c in codes:
+        counts = index.debug_search_files(c)[0]["timings"]["counts"]
+        for k in folder_counts:
+            folder_counts[k] += counts.get(k, 0)
+    return {"metrics": metrics, "codes": len(codes), "codes_with_hits": hits, "folder_resolution": folder_counts}
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m V2.bench.scaling", description="Benchmark index and search scaling.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="catalog sizes in files")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per metric (default: %(default)s)")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--workdir", help="keep generated catalogs here instead of a temp dir")
+    ap.add_argument("--out", help="write JSON results to this file (default: stdout)")
+    args = ap.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="naturo-bench-")
+    runs = []
+    try:
+        for n in args.sizes:
+            # Generation is deterministic and idempotent, so a kept catalog is simply re-walked.
+            root = os.path.join(workdir, f"catalog_{n}_{args.seed}")
+            t0 = perf_counter()
+            info = generate_catalog(root, n, seed=args.seed)
+            gen_ms = (perf_counter() - t0) * 1000.0
+            print(f"[bench] {info.files} files / {info.dirs} dirs generated in {gen_ms:.0f} ms", file=sys.stderr)
+            result = bench_catalog(root, info.codes, info.selections, args.repeat,
+                                   cache_file=os.path.join(workdir, f"tree_{n}.json"))
+            result.update({"requested_files": n, "files": info.files, "dirs": info.dirs})
+            runs.append(result)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
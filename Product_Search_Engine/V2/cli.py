@@ -0,0 +1,23 @@
+"""
+Command-line arguments shared by V2.search, V2.batch_resolve and V2.server.
+"""
+import os
+
+from .config import load_config, get_root_dirs
+from .constants import TREE_CACHE_FILE
+
+
+def add_index_arguments(ap):
+    """Add --root and --cache to an argparse parser."""
+    ap.add_argument("--root", action="append", help="catalog root, repeat for several (default: roots from the config file)")
+    ap.add_argument("--cache", default=TREE_CACHE_FILE,
+                    help="tree cache file; a .idx file uses the shared mmap format, a .shards path "
+                         "is a directory of lazily loaded shards (default: %(default)s)")
+
+
+def root_dirs_or_exit(ap, args):
+    """Catalog roots from --root or the config file; exits through ap.error if any is not a directory."""
+    root_dirs = args.root or get_root_dirs(load_config())
+    if not root_dirs or not all(os.path.isdir(r) for r in root_dirs):
+        ap.error("no valid catalog root; pass --root or set root_dir/root_dirs in the config file")
+    return root_dirs
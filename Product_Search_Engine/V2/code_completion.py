@@ -0,0 +1,288 @@
+"""
+Product-code completion from the file and folder names in the index.
+
+Staff type codes from the material onwards (PV_BL_12"9.5F_03_KYGH,
+CH_LP_LVGU), optionally after a quantity prefix (63_PK_...). Every name is
+split into code tokens (the tokens of parsing.lex_product_code), and from each
+material token to the end of the name the sequence is added to a trie keyed by
+lowercase tokens. Each trie node counts the names passing through it and keeps
+the token as written in the first one (with the separator before it, spaces
+as "_"), so completions carry the supplier codes, folder codes and size
+patterns that follow in real names. A node only one name passes through keeps
+the rest of that name as a tail instead of a chain of nodes, and is expanded
+when a second name arrives or a completion walks into it.
+
+Completing text walks its whole tokens from the first material token and
+offers the children of the node it reaches whose token starts with the last,
+partly typed one, ranked by how many names share them. A completion runs on
+through tokens that every name below it shares. Typed codes often skip parts
+of a name, so when the walk finds nothing the last token alone is completed:
+from the tokens that follow the one before it in names, else from every
+token. A lookup is a few dict steps plus one pass over a short list.
+
+The trie is updated when the index changes. Each folder contributes the names
+of its entries; with directory fingerprints (fingerprint.py) a folder whose
+listing hash is unchanged keeps its contribution, so only changed folders are
+read and lexed again.
+
+Mapped and lazy caches (mapped_tree.py, lazy_cache.py) only read file names a
+search needs, so their trees are never walked for file names here. When such a
+cache is saved, every folder's names are written next to it (write_names) and
+the trie is built from that file; without it, those folders contribute only
+their subfolder names.
+"""
+import json
+import os
+import re
+import sys
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .constants import FILE_EXTS, MATERIAL_MAP
+from . import fsio
+from .tree_nodes import META_KEYS, TreeNode
+
+NAMES_VERSION = 1
+
+# Same tokens as parsing.lex_product_code; positions are needed to keep the separators between them.
+_TOKEN = re.compile(r'[0-9A-Za-z"]+')
+_SPACE_RUN = re.compile(r'\s+')
+_MATERIALS = frozenset(v.lower() for v in MATERIAL_MAP.values())
+_EXTS = frozenset(FILE_EXTS)
+
+
+class _Node:
+    __slots__ = ("count", "text", "children", "tail")
+
+    def __init__(self, text: str, count: int = 0, tail: Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]] = None):
+        self.count = count
+        self.text = text
+        self.children: Optional[Dict[str, "_Node"]] = None
+        # (tokens, segments) after this one, only while a single name passes through
+        self.tail = tail
+
+    def expand(self):
+        tokens, segments = self.tail
+        self.tail = None
+        if tokens:
+            self.children = {tokens[0]: _Node(segments[0], self.count, (tokens[1:], segments[1:]))}
+
+
+def split_name(name: str) -> Tuple[List[str], List[str], List[str]]:
+    """(lowercase tokens, tokens as written, each token with the separator before it) of name."""
+    tokens, words, segments = [], [], []
+    end = None
+    for m in _TOKEN.finditer(name):
+        word = m.group()
+        sep = "" if end is None else _SPACE_RUN.sub("_", name[end:m.start()])
+        tokens.append(sys.intern(word.lower()))
+        words.append(word)
+        segments.append(sys.intern(sep + word))
+        end = m.end()
+    return tokens, words, segments
+
+
+def _stem(file_name: str) -> str:
+    base, ext = os.path.splitext(file_name)
+    return base if ext.lower() in _EXTS else file_name
+
+
+def folder_names(node) -> List[str]:
+    """Names a folder contributes: its file names without image extension, then its subfolder names."""
+    return [_stem(f) for f in node.get("_files") or []] + [k for k in node if k not in META_KEYS]
+
+
+def write_names(path: str, tree, dir_hash: Optional[str]):
+    """Save folder_names of every folder of a dict tree, for the cache saved with dir_hash."""
+    folders = {}
+    stack = [tree] if tree else []
+    while stack:
+        node = stack.pop()
+        folders[node.get("_path", "")] = folder_names(node)
+        stack.extend(v for k, v in node.items() if k not in META_KEYS)
+    with fsio.atomic_write(path, "w", encoding="utf-8") as f:
+        json.dump({"version": NAMES_VERSION, "hash": dir_hash, "folders": folders}, f)
+
+
+def read_names(path: str, dir_hash: Optional[str]) -> Optional[Dict[str, List[str]]]:
+    """{folder path: names} saved by write_names for dir_hash, None when missing or saved for another tree."""
+    try:
+        with fsio.open_file(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != NAMES_VERSION or not dir_hash or data.get("hash") != dir_hash:
+        return None
+    return data.get("folders")
+
+
+class CodeCompleter:
+    """Completion trie over one index's names; update() brings it to a new generation of the tree."""
+    def __init__(self):
+        self.root = _Node("")
+        self.generation: Optional[int] = None
+        # {token: [names containing it, text]} and {token: {next token: count}}
+        self.tokens: Dict[str, list] = {}
+        self.follows: Dict[str, Dict[str, int]] = {}
+        self._vocabulary: Optional[List[str]] = None
+        # {folder path: (listing hash or None, entry names it contributed)}
+        self._folders: Dict[str, Tuple[Optional[str], List[str]]] = {}
+        self.folders_read = 0
+
+    def _apply(self, names: Iterable[str], delta: int):
+        for name in names:
+            tokens, words, segments = split_name(name)
+            prev = None
+            for i, tok in enumerate(tokens):
+                self._count_token(prev, tok, words[i], delta)
+                prev = tok
+                if tok in _MATERIALS:
+                    self._insert(tokens, words[i], segments, i, delta)
+
+    def _count_token(self, prev: Optional[str], tok: str, word: str, delta: int):
+        entry = self.tokens.get(tok)
+        if entry is None:
+            entry = self.tokens[tok] = [0, sys.intern(word)]
+            self._vocabulary = None
+        entry[0] += delta
+        if entry[0] <= 0:
+            del self.tokens[tok]
+            self._vocabulary = None
+        if prev is not None:
+            nxt = self.follows.setdefault(prev, {})
+            n = nxt[tok] = nxt.get(tok, 0) + delta
+            if n <= 0:
+                del nxt[tok]
+                if not nxt:
+                    del self.follows[prev]
+
+    def _insert(self, tokens: List[str], first: str, segments: List[str], start: int, delta: int):
+        node = self.root
+        for i in range(start, len(tokens)):
+            tok = tokens[i]
+            child = node.children.get(tok) if node.children else None
+            if child is None:
+                if delta > 0:
+                    if node.children is None:
+                        node.children = {}
+                    text = first if i == start else segments[i]
+                    node.children[tok] = _Node(text, delta, (tuple(tokens[i + 1:]), tuple(segments[i + 1:])))
+                return
+            if child.tail is not None and delta > 0:
+                child.expand()
+            child.count += delta
+            if child.count <= 0:
+                # Every name below went through this node, so the subtree is empty too.
+                del node.children[tok]
+                return
+            node = child
+
+    @staticmethod
+    def _children(node: _Node) -> Dict[str, _Node]:
+        if node.tail is not None:
+            node.expand()
+        return node.children or {}
+
+    def update(self, tree, fingerprints: Optional[Dict[str, list]] = None, generation: Optional[int] = None,
+               saved: Optional[Dict[str, List[str]]] = None):
+        """
+        Re-sync with tree. fingerprints: DirFingerprints.dirs of the same tree; folders
+        whose listing hash is unchanged are not read. Without them each folder's names
+        are compared with the ones it contributed before. saved: read_names of the
+        tree's cache, used instead of the file names of cache-backed nodes; such nodes
+        missing from it contribute their subfolder names only.
+        """
+        fingerprints = fingerprints or {}
+        saved = saved or {}
+        folders: Dict[str, Tuple[Optional[str], List[str]]] = {}
+        read = 0
+        stack = [tree] if tree else []
+        while stack:
+            node = stack.pop()
+            path = node.get("_path", "")
+            children = [(k, v) for k, v in node.items() if k not in META_KEYS]
+            record = fingerprints.get(path)
+            listing = record[1] if record else None
+            old = self._folders.get(path)
+            if old is not None and listing is not None and old[0] == listing:
+                folders[path] = old
+            else:
+                read += 1
+                names = saved.get(path)
+                if names is None and isinstance(node, TreeNode):
+                    # No listing hash, so the full names replace these once they are known.
+                    names, listing = [k for k, _ in children], None
+                elif names is None:
+                    names = folder_names(node)
+                if old is None or old[1] != names:
+                    if old is not None:
+                        self._apply(old[1], -1)
+                    self._apply(names, 1)
+                folders[path] = (listing, names)
+            stack.extend(v for _, v in children)
+        for path, (_, names) in self._folders.items():
+            if path not in folders:
+                self._apply(names, -1)
+        self._folders = folders
+        self.folders_read = read
+        self.generation = generation
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.tokens)
+
+    def complete(self, text: str, limit: int) -> List[Tuple[str, int]]:
+        """[(completed code, names sharing it)] for text, most common first."""
+        found = list(_TOKEN.finditer(text))
+        partial = found.pop() if found and found[-1].end() == len(text) else None
+        stem = partial.group().lower() if partial else ""
+        out = self._complete_sequence(text, found, stem, partial)
+        if not out:
+            out = self._complete_token(text, found, stem, partial)
+        out = [(code, n) for code, n in out if code.lower() != text.lower()]
+        if not out and stem in self.tokens:
+            # A whole token typed without a separator: offer what follows it.
+            return self.complete(text + "_", limit)
+        out.sort(key=lambda x: (-x[1], x[0]))
+        return out[:limit]
+
+    def _complete_sequence(self, text, found, stem, partial) -> List[Tuple[str, int]]:
+        start = next((i for i, m in enumerate(found) if m.group().lower() in _MATERIALS), len(found))
+        # Whatever comes before the material (a quantity prefix) is kept as typed.
+        if start < len(found):
+            head = text[:found[start].start()]
+        else:
+            head = text[:partial.start()] if partial else text
+        node, path = self.root, []
+        for m in found[start:]:
+            node = self._children(node).get(m.group().lower())
+            if node is None:
+                return []
+            path.append(node.text)
+        head += "".join(path)
+        out = []
+        for tok, child in self._children(node).items():
+            if not tok.startswith(stem):
+                continue
+            parts = [child.text]
+            while child.tail is None and child.children is not None and len(child.children) == 1:
+                only = next(iter(child.children.values()))
+                if only.count != child.count:
+                    break
+                child = only
+                parts.append(child.text)
+            if child.tail is not None:
+                parts.extend(child.tail[1])
+            out.append((head + "".join(parts), child.count))
+        return out
+
+    def _complete_token(self, text, found, stem, partial) -> List[Tuple[str, int]]:
+        head = text[:partial.start()] if partial else text
+        prev = found[-1].group().lower() if found else None
+        follow = self.follows.get(prev, {}) if prev else {}
+        cands = [(tok, n) for tok, n in follow.items() if tok.startswith(stem)]
+        if not cands and stem:
+            vocab = self._vocabulary or []
+            i = bisect_left(vocab, stem)
+            while i < len(vocab) and vocab[i].startswith(stem):
+                cands.append((vocab[i], self.tokens[vocab[i]][0]))
+                i += 1
+        return [(head + self.tokens[tok][1], n) for tok, n in cands]
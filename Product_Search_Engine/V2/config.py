@@ -1,6 +1,5 @@
 import json
 import os
-from PySide6.QtWidgets import QFileDialog
 from .constants import CONFIG_FILE
 
 def load_config():
@@ -13,7 +12,18 @@ def save_config(cfg):
     with open(CONFIG_FILE, "w", encoding="utf-8") as f:
         json.dump(cfg, f, indent=2)
 
+def get_root_dirs(cfg):
+    """Catalog roots from "root_dirs" (list) or the single legacy "root_dir"."""
+    roots = cfg.get("root_dirs") or []
+    if isinstance(roots, str):
+        roots = [roots]
+    if not roots and cfg.get("root_dir"):
+        roots = [cfg["root_dir"]]
+    return list(roots)
+
 def pick_root_dir():
+    # Qt is only needed for the dialog; keep config importable by headless tools.
+    from PySide6.QtWidgets import QFileDialog
     dlg = QFileDialog()
     dlg.setFileMode(QFileDialog.Directory)
     dlg.setOption(QFileDialog.ShowDirsOnly, True)
@@ -1,6 +1,18 @@
 # ---------------- CONFIG / CONSTANTS ----------------
 CONFIG_FILE = "naturo_config.json"
 TREE_CACHE_FILE = "folder_tree.json"
+# A tree cache file with this extension is saved in the mmap format (mapped_tree.py)
+MAPPED_CACHE_EXT = ".idx"
+# A tree cache path with this extension is a directory of lazily loaded shards (lazy_cache.py)
+LAZY_CACHE_EXT = ".shards"
+LAZY_SHARDS_MAX_LOADED = 8
+# Per-directory fingerprints (fingerprint.py) are saved as <tree cache path> + this
+FINGERPRINT_EXT = ".dirs.json"
+# Names the completion trie is built from (code_completion.py), saved next to a mapped or lazy cache as <path> + this
+COMPLETION_NAMES_EXT = ".names.json"
+# Per-folder Bloom filters of folder-name tokens (folder_bloom.py)
+BLOOM_BITS = 2048
+BLOOM_HASHES = 3
 
 FILE_EXTS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff', '.pdf', '.heic', '.jfif')
 IMG_EXTS  = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff', '.pdf', '.heic', '.jfif')
@@ -65,7 +77,38 @@ SUPPLIER_CODES = {
 }
 SUPPLIER_CODES_LOWER = {s.lower() for s in SUPPLIER_CODES}
 
+# Time budget of an interactive code search; the rest of a slower search finishes in the background
+SEARCH_BUDGET_MS = 1500
+
 # UI sizing
 HEIGHT_COLLAPSED_QN = 65
 HEIGHT_SEARCH = 120
 HEIGHT_QN = 900
+
+# Per-stage timing log (JSON lines, rotated)
+TIMING_LOG_FILE = "naturo_timings.log"
+TIMING_LOG_MAX_BYTES = 1_000_000
+TIMING_LOG_BACKUPS = 5
+
+# "Profile next search": NATURO_PROFILE=<n> profiles the next n operations
+PROFILE_ENV = "NATURO_PROFILE"
+PROFILE_DIR = "naturo_profiles"
+PROFILE_TOP_N = 40
+
+# LRU sizes for the memoized parser entry points
+PARSE_CACHE_SIZE = 4096
+SELECTION_CACHE_SIZE = 512
+
+# Trigram index: scan roots with at least this many files use it for substring lookups
+TRIGRAM_MIN_FILES = 5000
+DID_YOU_MEAN_LIMIT = 5
+DID_YOU_MEAN_MIN_SIMILARITY = 0.5
+# Product-code completions offered per keystroke (code_completion.py)
+COMPLETION_LIMIT = 10
+# Pause in typing before the search box asks the index for completions
+COMPLETION_DEBOUNCE_MS = 150
+
+# Questionnaire height options; with these whole-inch widths they form the size
+# vocabulary of the per-file attribute records
+HEIGHT_OPTIONS = ("8F", "9F", "9.5F")
+ATTRIBUTE_WIDTHS = tuple(range(1, 49))
@@ -0,0 +1,128 @@
+"""
+Hierarchical (Merkle) fingerprints of a catalog directory tree.
+
+Each directory has a listing hash (the names of its entries, files and folders
+marked apart) and a tree hash combining the listing hash with the tree hashes
+of its subfolders, so the root hash changes exactly when some folder below it
+gains, loses or renames an entry. The tree cache only holds names, which is
+all a fingerprint covers.
+
+Adding, removing or renaming an entry updates the mtime of the folder that
+holds it, so a folder whose mtime matches its previous record is not listed
+again: confirming an unchanged tree costs one stat per directory. Records are
+only trusted when their mtime is older than the previous scan by
+RACY_MTIME_WINDOW seconds; a folder changed within the same mtime tick as that
+scan is listed again.
+
+update() also reports which subtrees changed since the previous fingerprints
+(folders whose listing changed, plus the topmost added and removed folders).
+"""
+import hashlib
+import json
+import os
+from time import time
+from typing import Dict, List, Optional, Tuple
+
+from . import fsio
+
+VERSION = 1
+RACY_MTIME_WINDOW = 2.0
+SKIP_DIRS = (".git",)
+
+
+def _md5(parts) -> str:
+    hasher = hashlib.md5()
+    for p in parts:
+        hasher.update(p.encode("utf-8", "surrogatepass"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+class DirFingerprints:
+    """
+    Fingerprints of the folders under root_dir, keyed by path (joined like
+    FolderIndex.build_tree). Each record is [mtime_ns, listing hash, subfolder
+    names, tree hash].
+    """
+    def __init__(self, root_dir: str, dirs: Optional[Dict[str, List]] = None, scanned: float = 0.0):
+        self.root_dir = root_dir
+        self.dirs: Dict[str, List] = dirs or {}
+        self.scanned = scanned
+        self.hash: Optional[str] = self.dirs[root_dir][3] if root_dir in self.dirs else None
+        self.changes: Dict[str, str] = {}
+        self.listed = 0
+
+    @classmethod
+    def load(cls, path: str, root_dir: str) -> Optional["DirFingerprints"]:
+        try:
+            with fsio.open_file(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != VERSION or data.get("root") != root_dir:
+            return None
+        return cls(root_dir, data.get("dirs"), data.get("scanned", 0.0))
+
+    def save(self, path: str):
+        with fsio.atomic_write(path, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "root": self.root_dir, "scanned": self.scanned, "dirs": self.dirs}, f)
+
+    def update(self) -> str:
+        """
+        Re-fingerprint the tree, listing only folders whose mtime changed.
+        Sets hash, changes ({path: "changed" | "added" | "removed"}) and listed
+        (folders read with scandir) and returns the root hash.
+        """
+        started = time()
+        trusted_before = int((self.scanned - RACY_MTIME_WINDOW) * 1e9)
+        previous, self.dirs = self.dirs, {}
+        self.changes, self.listed = {}, 0
+
+        def visit(path: str, parent_added: bool) -> Optional[str]:
+            try:
+                mtime = fsio.stat(path).st_mtime_ns
+            except OSError:
+                return None
+            prev = previous.get(path)
+            if prev and prev[0] == mtime and mtime < trusted_before:
+                listing, children = prev[1], prev[2]
+            else:
+                listing, children = self._list(path)
+                self.listed += 1
+                if prev is None:
+                    if not parent_added:
+                        self.changes[path] = "added"
+                elif prev[1] != listing:
+                    self.changes[path] = "changed"
+                    for name in set(prev[2]) - set(children):
+                        self.changes[os.path.join(path, name)] = "removed"
+            added = prev is None
+            parts = [listing]
+            for name in children:
+                child = visit(os.path.join(path, name), added)
+                parts += [name, child or ""]
+            tree_hash = _md5(parts)
+            self.dirs[path] = [mtime, listing, children, tree_hash]
+            return tree_hash
+
+        self.hash = visit(self.root_dir, False)
+        self.scanned = started
+        return self.hash
+
+    @staticmethod
+    def _list(path: str) -> Tuple[str, List[str]]:
+        """(listing hash, subfolders to descend into) of one folder; symlinked folders are listed, not entered."""
+        try:
+            entries = fsio.scandir(path)
+        except OSError:
+            return _md5(["<unreadable>"]), []
+        names, children = [], []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+                if is_dir and not entry.is_symlink() and entry.name not in SKIP_DIRS:
+                    children.append(entry.name)
+            except OSError:
+                is_dir = False
+            names.append(("d:" if is_dir else "f:") + entry.name)
+        return _md5(sorted(names)), sorted(children)
@@ -0,0 +1,123 @@
+"""
+Per-folder Bloom filters for pruning folder-name searches.
+
+Supplier-folder and folder-code resolution score folders by tokens of their
+normalized names. Each folder's summary is a Bloom filter (a BLOOM_BITS-bit
+int) of the name tokens of the folder and every folder beneath it, plus
+markers for the substring features those scores use ("selected", "item",
+known supplier codes). A subtree whose filter lacks every token that could
+score is skipped; false positives only cost a visit, so results are
+unchanged. File names are not included: no folder search looks at them.
+
+Summaries belong to one index generation and are built on first use. A
+folder whose directory fingerprint (fingerprint.py) is unchanged since the
+previous build reuses that build's filters for its whole subtree, so a
+rebuild only hashes tokens of the folders that changed.
+"""
+import os
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+
+from .constants import BLOOM_BITS, BLOOM_HASHES, SUPPLIER_CODES_LOWER
+from .parsing import normalize_token
+from .tree_nodes import META_KEYS
+
+# Substring features of folder names, stored as markers that cannot clash with a name token.
+SELECTED = "\0selected"
+ITEM = "\0item"
+
+
+def supplier_marker(code: str) -> str:
+    return "\0sup:" + code
+
+
+def _bits(token: str) -> int:
+    data = token.encode("utf-8", "surrogatepass")
+    h1 = zlib.crc32(data)
+    h2 = zlib.adler32(data) | 1
+    out = 0
+    for i in range(BLOOM_HASHES):
+        out |= 1 << ((h1 + i * h2) % BLOOM_BITS)
+    return out
+
+
+def bloom_of(tokens: Iterable[str]) -> int:
+    out = 0
+    for t in tokens:
+        out |= _bits(t)
+    return out
+
+
+def may_contain(bloom: int, token: str) -> bool:
+    bits = _bits(token)
+    return bloom & bits == bits
+
+
+def supplier_score_bound(bloom: int, supplier: str) -> int:
+    """
+    Highest matching.score_supplier_selected_path any folder summarized by bloom
+    can reach for the normalized supplier code.
+    """
+    bound = 3  # path depth term
+    if supplier and ("_" in supplier or may_contain(bloom, supplier)):
+        bound += 3
+    if may_contain(bloom, SELECTED):
+        bound += 4
+    if may_contain(bloom, ITEM):
+        bound += 1
+    return bound
+
+
+def folder_tokens(name: str) -> set:
+    """Name tokens and substring markers of one folder name."""
+    base = normalize_token(name)
+    tokens = {t for t in base.split("_") if t}
+    if "selected" in base:
+        tokens.add(SELECTED)
+    if "item" in base:
+        tokens.add(ITEM)
+    tokens.update(supplier_marker(s) for s in SUPPLIER_CODES_LOWER if s in base)
+    return tokens
+
+
+def build_summaries(tree, fingerprints: Optional[Dict[str, list]] = None,
+                    previous: Optional[Dict[str, Tuple[Optional[str], int]]] = None
+                    ) -> Dict[str, Tuple[Optional[str], int]]:
+    """
+    {folder path: (fingerprint tree hash or None, Bloom filter of the subtree)}.
+    fingerprints: DirFingerprints.dirs of the same tree; previous: an earlier
+    result, whose entries are reused where the tree hash did not change.
+    """
+    out: Dict[str, Tuple[Optional[str], int]] = {}
+    fingerprints = fingerprints or {}
+    previous = previous or {}
+
+    def reuse(node) -> int:
+        # Unchanged subtree: same folders as when previous was built.
+        path = node.get("_path", "")
+        prev = previous.get(path)
+        if prev is None:
+            return visit(node)
+        out[path] = prev
+        for k, child in node.items():
+            if k not in META_KEYS:
+                reuse(child)
+        return prev[1]
+
+    def visit(node) -> int:
+        path = node.get("_path", "")
+        record = fingerprints.get(path)
+        tree_hash = record[3] if record else None
+        prev = previous.get(path)
+        if tree_hash and prev and prev[0] == tree_hash:
+            return reuse(node)
+        bloom = bloom_of(folder_tokens(os.path.basename(path)))
+        for k, child in node.items():
+            if k not in META_KEYS:
+                bloom |= visit(child)
+        out[path] = (tree_hash, bloom)
+        return bloom
+
+    if tree:
+        visit(tree)
+    return out
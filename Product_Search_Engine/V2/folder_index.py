@@ -1,21 +1,34 @@
 import os
 import re
 import json
-import hashlib
+import threading
 from time import time
 from typing import Optional, Iterable, List, Dict, Tuple, Any
-from .constants import TREE_CACHE_FILE, FILE_EXTS
+from .constants import SUPPLIER_CODES_LOWER, TREE_CACHE_FILE, MAPPED_CACHE_EXT, LAZY_CACHE_EXT, FINGERPRINT_EXT, COMPLETION_NAMES_EXT, FILE_EXTS, DID_YOU_MEAN_LIMIT, DID_YOU_MEAN_MIN_SIMILARITY, COMPLETION_LIMIT
 from .parsing import (
-    normalize_token, make_searchable,
-    extract_series_signatures, path_contains_any_signature,
+    normalize_token, make_searchable, generate_size_variants,
+    extract_series_signatures, contains_any_signature,
     parse_product_code
 )
 from .matching import (
     score_supplier_selected_path, color_matches,
     matches_size, file_token_match
 )
+from .scoring import FeatureTable, score_table, facet_counts
+from .timing import StageTimer, continue_in_background, log_timing
+from .fsio import io_accounting
+from . import fsio
+from .mapped_tree import MappedTree, write_mapped_tree
+from .lazy_cache import LazyTree, write_lazy_tree
+from .fingerprint import DirFingerprints
+from .folder_bloom import build_summaries, may_contain, supplier_marker, supplier_score_bound
+from .code_completion import CodeCompleter, read_names, write_names
+from .planner import (
+    CodePlan, NARROW, GLOBAL, choose_plan, global_rows, name_code_filter, subtree_file_count, unresolved_fields
+)
 
-from dataclasses import dataclass
+from collections.abc import Mapping
+from dataclasses import dataclass, field
 from functools import total_ordering
 
 @total_ordering
@@ -29,9 +42,14 @@ class SupplierCandidate:
             return NotImplemented
         if self.score != other.score:
             return self.score < other.score
-        self_key = getattr(self.node, "name", None) or getattr(self.node, "path", None) or id(self.node)
-        other_key = getattr(other.node, "name", None) or getattr(other.node, "path", None) or id(other.node)
-        return self_key < other_key
+        return self._tie_key(self.node) < self._tie_key(other.node)
+
+    @staticmethod
+    def _tie_key(node: Any):
+        # Tree nodes are dicts (or mapped nodes); break ties on their path so the pick is reproducible.
+        if isinstance(node, Mapping):
+            return node.get("_path", "")
+        return getattr(node, "name", None) or getattr(node, "path", None) or str(id(node))
 
     def __eq__(self, other: object) -> bool:
         if not isinstance(other, SupplierCandidate):
@@ -39,45 +57,107 @@ class SupplierCandidate:
         return self.score == other.score and self.node is other.node
 
 
+@dataclass(frozen=True)
+class IndexGeneration:
+    """
+    One published state of a FolderIndex: a tree that is not modified once
+    published, its dir hash, and the lookups derived from that tree.
+    """
+    number: int
+    tree: Any
+    hash: Optional[str]
+    feature_tables: Dict = field(default_factory=dict)
+    # Tables over the file names the tree lists (not checked on disk), see FolderIndex.name_table
+    name_tables: Dict = field(default_factory=dict)
+    # {name-code conditions: existing whole-tree name_table rows}, see FolderIndex.global_candidates
+    global_rows: Dict = field(default_factory=dict)
+    supplier_nodes: Dict = field(default_factory=dict)
+    # {folder path: (fingerprint tree hash, Bloom filter)}, see folder_bloom.py
+    folder_summaries: Dict = field(default_factory=dict)
+
+
 class FolderIndex:
     """
     In-memory folder tree persisted to TREE_CACHE_FILE.
     Node format:
       {"_path": "...", "_files": [...], "Subfolder Name": { ... } }
+    With validate_cache=False an existing cache is trusted without walking the
+    drive to recompute its hash (fast start for headless tools).
+    A cache_file ending in MAPPED_CACHE_EXT is kept in the mmap format of
+    mapped_tree.py: loading it is near-instant, nodes are read-only mappings
+    decoded on demand, and processes opening the same file share its pages.
+    A cache_file ending in LAZY_CACHE_EXT is a directory of per-supplier shards
+    read on demand (lazy_cache.py).
+    The cache is validated against directory fingerprints (fingerprint.py)
+    saved next to it as <cache_file>FINGERPRINT_EXT.
+    Loads and rebuilds publish a new IndexGeneration by replacing
+    self.generation; a search pins the generation current when it starts, so
+    it never sees a half-built tree and reads take no lock.
     """
-    def __init__(self, root_dir, cache_file=TREE_CACHE_FILE, force_rebuild=False):
+    def __init__(self, root_dir, cache_file=TREE_CACHE_FILE, force_rebuild=False, validate_cache=True):
         self.root_dir = root_dir
         self.cache_file = cache_file
-        self.tree = None
-        self.hash = None
+        self.validate_cache = validate_cache
+        self.generation = IndexGeneration(0, None, None)
         self.last_built = None
+        self.last_load_timings = None
+        self.last_changes = {}
+        self._fingerprints = None
+        self._last_summaries = {}
+        self._completer = CodeCompleter()
+        self._completer_lock = threading.Lock()
+        # Serializes loads, rebuilds and fingerprint updates; searches never take it.
+        self._update_lock = threading.RLock()
         self.load_or_build(force_rebuild)
 
+    @property
+    def tree(self):
+        return self.generation.tree
+
+    @property
+    def hash(self) -> Optional[str]:
+        return self.generation.hash
+
+    def _publish(self, tree, dir_hash: Optional[str]) -> IndexGeneration:
+        with self._update_lock:
+            self.generation = IndexGeneration(self.generation.number + 1, tree, dir_hash)
+        return self.generation
+
+    @property
+    def fingerprint_file(self) -> str:
+        return self.cache_file.rstrip("/\\") + FINGERPRINT_EXT
+
+    @property
+    def completion_names_file(self) -> str:
+        return self.cache_file.rstrip("/\\") + COMPLETION_NAMES_EXT
+
     def compute_dir_hash(self):
-        hasher = hashlib.md5()
-        for dirpath, dirnames, filenames in os.walk(self.root_dir):
-            hasher.update(dirpath.encode('utf-8', 'ignore'))
-            try:
-                m = os.path.getmtime(dirpath)
-                hasher.update(str(m).encode('utf-8', 'ignore'))
-            except Exception:
-                pass
-            for fn in sorted(filenames):
+        """
+        Root hash of the directory fingerprints (fingerprint.py). Only folders
+        whose mtime changed since the previous call (or the fingerprints saved
+        next to the cache) are listed again; last_changes records which.
+        """
+        with self._update_lock:
+            if self._fingerprints is None:
+                self._fingerprints = (DirFingerprints.load(self.fingerprint_file, self.root_dir)
+                                      or DirFingerprints(self.root_dir))
+            fp = self._fingerprints
+            dir_hash = fp.update()
+            self.last_changes = fp.changes
+            if fp.listed:
                 try:
-                    full = os.path.join(dirpath, fn)
-                    m = os.path.getmtime(full)
-                    hasher.update(fn.encode('utf-8', 'ignore'))
-                    hasher.update(str(m).encode('utf-8', 'ignore'))
-                except Exception:
-                    continue
-        return hasher.hexdigest()
+                    fp.save(self.fingerprint_file)
+                except Exception as e:
+                    print("Failed to save directory fingerprints:", e)
+            return dir_hash
 
-    def build_tree(self):
+    def build_tree(self, dir_hash: Optional[str] = None):
+        """Walk root_dir into a new tree and publish it (with dir_hash) as the next generation."""
         start = time()
         def _build(path):
             node = {"_path": path, "_files": []}
             try:
-                entries = list(os.scandir(path))
+                entries = fsio.scandir(path)
             except Exception:
                 entries = []
             for entry in sorted(entries, key=lambda e: e.name):
@@ -102,94 +182,189 @@ class FolderIndex:
                     continue
             return node
 
-        self.tree = _build(self.root_dir)
+        tree = _build(self.root_dir)
         self.last_built = time() - start
-        return self.tree
+        self._publish(tree, dir_hash)
+        return tree
+
+    @property
+    def mapped_cache(self) -> bool:
+        return self.cache_file.lower().endswith(MAPPED_CACHE_EXT)
+
+    @property
+    def lazy_cache(self) -> bool:
+        return self.cache_file.lower().rstrip("/\\").endswith(LAZY_CACHE_EXT)
 
     def load_cache(self):
-        if not os.path.exists(self.cache_file):
+        if not fsio.exists(self.cache_file):
             return None
+        if self.lazy_cache:
+            try:
+                lazy = LazyTree(self.cache_file)
+            except (OSError, ValueError, KeyError) as e:
+                print("Ignoring unreadable tree cache:", e)
+                return None
+            return {"hash": lazy.hash, "root": lazy.root}
+        if self.mapped_cache:
+            try:
+                mapped = MappedTree(self.cache_file)
+            except (OSError, ValueError) as e:
+                print("Ignoring unreadable tree cache:", e)
+                return None
+            return {"hash": mapped.hash, "root": mapped.root}
         try:
-            with open(self.cache_file, "r", encoding="utf-8") as f:
+            with fsio.open_file(self.cache_file, "r", encoding="utf-8") as f:
                 return json.load(f)
         except Exception:
             return None
 
     def save_cache(self, dir_hash):
+        tree = self.tree
+        if self.lazy_cache or self.mapped_cache:
+            try:
+                if self.lazy_cache:
+                    write_lazy_tree(self.cache_file, tree, dir_hash)
+                else:
+                    write_mapped_tree(self.cache_file, tree, dir_hash)
+            except Exception as e:
+                print("Failed to save tree cache:", e)
+                return
+            if isinstance(tree, dict):
+                # Completion reads names from here rather than from the cache (see code_completion.py).
+                try:
+                    write_names(self.completion_names_file, tree, dir_hash)
+                except Exception as e:
+                    print("Failed to save completion names:", e)
+            return
         try:
-            with open(self.cache_file, "w", encoding="utf-8") as f:
-                json.dump({"hash": dir_hash, "root": self.tree}, f)
+            with fsio.atomic_write(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump({"hash": dir_hash, "root": tree}, f)
         except Exception as e:
             print("Failed to save tree cache:", e)
 
-    def load_or_build(self, force=False):
-        if not os.path.isdir(self.root_dir):
-            self.tree = None
+    def load_or_build(self, force=False, dir_hash=None):
+        # dir_hash: a compute_dir_hash() result just taken, used instead of hashing again.
+        timer = StageTimer()
+        with self._update_lock, io_accounting() as io:
+            self._load_or_build(force, timer, dir_hash)
+        self.last_load_timings = timer.as_dict(io)
+        log_timing("load_index", self.last_load_timings, root=self.root_dir, force=force,
+                   changed=self.last_changes)
+
+    def _load_or_build(self, force, timer, dir_hash=None):
+        if not fsio.isdir(self.root_dir):
+            self._publish(None, None)
             return
-        current_hash = self.compute_dir_hash()
-        cached = None if force else self.load_cache()
+        with timer.stage("cache_load"):
+            cached = None if force else self.load_cache()
+        if cached and "root" in cached and not self.validate_cache:
+            self._publish(cached["root"], cached.get("hash"))
+            return
+        with timer.stage("hash"):
+            current_hash = dir_hash if dir_hash is not None else self.compute_dir_hash()
+        timer.count("dirs", len(self._fingerprints.dirs))
+        timer.count("dirs_listed", self._fingerprints.listed)
+        timer.count("dirs_changed", len(self.last_changes))
         if cached and cached.get("hash") == current_hash and "root" in cached:
-            self.tree = cached["root"]
-            self.hash = current_hash
+            self._publish(cached["root"], current_hash)
             return
-        self.build_tree()
-        self.hash = current_hash
-        self.save_cache(current_hash)
-
-    def rebuild(self):
-        self.load_or_build(force=True)
+        with timer.stage("build"):
+            self.build_tree(current_hash)
+        with timer.stage("cache_save"):
+            self.save_cache(current_hash)
 
-    def _iterate_all_nodes_with_names(self) -> Iterable[Tuple[str, Dict]]:
-        if not self.tree:
-            return
-        import os as _os
-        root_name = _os.path.basename(self.root_dir) or ""
-        stack = [(root_name, self.tree)]
-        while stack:
-            name, node = stack.pop()
-            yield name, node
-            for k, v in node.items():
-                if k in ("_path", "_files"):
-                    continue
-                stack.append((k, v))
+    def rebuild(self, dir_hash=None):
+        self.load_or_build(force=True, dir_hash=dir_hash)
 
-    def iter_supplier_nodes(self, supplier: str) -> Iterable[Dict]:
-        """Yield all nodes that might contain supplier folders"""
-        for name, node in self._iterate_all_nodes_with_names():
-            yield node
+    def refresh(self) -> bool:
+        """
+        Re-hash the catalog and, if it changed, rebuild it into a new generation of
+        this index (the completion trie and folder summaries then update
+        incrementally). True if a generation was published.
+        """
+        with self._update_lock:
+            dir_hash = self.compute_dir_hash()
+            if dir_hash == self.hash:
+                return False
+            self.rebuild(dir_hash)
+            return True
+
+    def clear_query_caches(self):
+        """Republish the same tree with empty derived lookups (cold-query timing); searches in flight keep theirs."""
+        gen = self.generation
+        self._publish(gen.tree, gen.hash)
 
     def score_supplier_node(self, node: Dict, supplier: str) -> int:
         """Score a node for supplier relevance"""
         path = node.get("_path", "")
         return score_supplier_selected_path(path, supplier)
 
-    def pick_best_by_score(self, nodes: Iterable, score_fn) -> Optional[Dict]:
+    def folder_summaries(self, gen: Optional[IndexGeneration] = None) -> Dict:
+        """
+        Per-folder Bloom filters of gen's tree, built on first use. Subtrees whose
+        fingerprint is unchanged reuse the filters of the previous build.
+        """
+        gen = gen or self.generation
+        if not gen.folder_summaries and gen.tree:
+            fp = self._fingerprints
+            fingerprints = fp.dirs if fp is not None and fp.hash == gen.hash else None
+            summaries = build_summaries(gen.tree, fingerprints, self._last_summaries)
+            gen.folder_summaries.update(summaries)
+            self._last_summaries = summaries
+        return gen.folder_summaries
+
+    def find_supplier_selected_folder(self, supplier: str, gen: Optional[IndexGeneration] = None,
+                                      stats: Optional[Dict[str, int]] = None) -> Optional[Dict]:
+        """
+        Best scoring folder for supplier (see score_supplier_selected_path). Subtrees
+        whose Bloom filter bounds every score below the best so far are skipped.
+        """
+        gen = gen or self.generation
+        if supplier in gen.supplier_nodes:
+            return gen.supplier_nodes[supplier]
+        summaries = self.folder_summaries(gen)
+        sc = normalize_token(supplier or "")
         best: Optional[SupplierCandidate] = None
-        for n in nodes:
-            sc = score_fn(n)
-            if not isinstance(sc, int):
-                raise TypeError(f"score_fn must return int, got {type(sc)} for {n!r}")
-            cand = SupplierCandidate(sc, n)
+        visited = pruned = 0
+        stack = [gen.tree] if gen.tree else []
+        while stack:
+            node = stack.pop()
+            visited += 1
+            cand = SupplierCandidate(self.score_supplier_node(node, supplier), node)
             if best is None or best < cand:
                 best = cand
-        return None if best is None else best.node
-
-    def find_supplier_selected_folder(self, supplier: str) -> Optional[Dict]:
-        return self.pick_best_by_score(
-            self.iter_supplier_nodes(supplier),
-            lambda node: self.score_supplier_node(node, supplier),
-            )
-
-    def find_folder_with_code(self, parent_node: Dict, folder_code: str, supplier_prefix: Optional[str] = None) -> Tuple[Optional[Dict], int, int]:
+            for k, child in node.items():
+                if k in ("_path", "_files"):
+                    continue
+                entry = summaries.get(child.get("_path", ""))
+                if entry and supplier_score_bound(entry[1], sc) < best.score:
+                    pruned += 1
+                    continue
+                stack.append(child)
+        if stats is not None:
+            stats["folders_visited"] = stats.get("folders_visited", 0) + visited
+            stats["subtrees_pruned"] = stats.get("subtrees_pruned", 0) + pruned
+        node = None if best is None else best.node
+        gen.supplier_nodes[supplier] = node
+        return node
+
+    def find_folder_with_code(self, parent_node: Dict, folder_code: str, supplier_prefix: Optional[str] = None,
+                              gen: Optional[IndexGeneration] = None,
+                              stats: Optional[Dict[str, int]] = None) -> Tuple[Optional[Dict], int, int]:
         if not parent_node or not folder_code:
             return None, -1, 10**9
         fc = normalize_token(folder_code)
         sp = normalize_token(supplier_prefix) if supplier_prefix else None
         best = (None, -1, 10**9)
         parent_depth = len(parent_node.get("_path", "").split(os.sep))
+        # A subtree can only score if its Bloom filter may hold the folder-code token or the supplier marker.
+        summaries = self.folder_summaries(gen)
+        prunable = bool(fc) and "_" not in fc and (not sp or sp in SUPPLIER_CODES_LOWER)
+        visited = pruned = 0
         stack = [parent_node]
         while stack:
             node = stack.pop()
+            visited += 1
             base = normalize_token(os.path.basename(node.get("_path", "")))
             score = 0
             if re.search(rf'(^|_){re.escape(fc)}(_|$)', base):
@@ -203,7 +378,17 @@ class FolderIndex:
             for k, v in node.items():
                 if k in ("_path", "_files"):
                     continue
+                entry = summaries.get(v.get("_path", "")) if prunable else None
+                if entry:
+                    possible = (5 if may_contain(entry[1], fc) else 0) + \
+                               (2 if sp and may_contain(entry[1], supplier_marker(sp)) else 0)
+                    if possible == 0 or possible < best[1]:
+                        pruned += 1
+                        continue
                 stack.append(v)
+        if stats is not None:
+            stats["folders_visited"] = stats.get("folders_visited", 0) + visited
+            stats["subtrees_pruned"] = stats.get("subtrees_pruned", 0) + pruned
         return best
 
     def choose_subdir_matching_code(self, node: Dict, folder_code: str) -> List[Dict]:
@@ -238,7 +423,7 @@ class FolderIndex:
                     break
                 # Fallback to disk scan if cache is empty
                 try:
-                    if any(entry.is_file() for entry in os.scandir(path)):
+                    if any(entry.is_file() for entry in fsio.scandir(path)):
                         reason = "images_found_here"
                         break
                 except Exception:
@@ -263,251 +448,499 @@ class FolderIndex:
             _, current = children[0]
         return current, reason
 
-    def collect_candidate_files(self, start_node: Dict) -> List[str]:
-            if not start_node:
-                return []
-            out = []
-            stack = [start_node]
-
-            exts_lower = tuple(ext.lower() for ext in FILE_EXTS)
-
-            def normalize_name(name: str) -> str:
-                n = ''.join(ch for ch in name if ch not in ('\u200b', '\u200c', '\u200d'))
-                n = n.replace('\u00a0', ' ')
-                n = n.strip().lower().rstrip('.')
-                return n
-
-            def has_valid_ext(name: str) -> bool:
-                nn = normalize_name(name)
-                return nn.endswith(exts_lower)
-
-            while stack:
-                node = stack.pop()
-                base_path = node.get("_path", "")
-
-                # Use cached files from tree instead of disk scan
-                cached = node.get("_files", []) or []
-                for fn in cached:
-                    try:
-                        full = os.path.join(base_path, fn)
-                        if os.path.isfile(full):
-                            basename = os.path.basename(fn)
-                            if has_valid_ext(basename) or ('.' not in basename):
-                                out.append(full)
-                    except Exception:
-                        continue
+    def candidate_names(self, start_node: Dict, timer: Optional[StageTimer] = None) -> List[str]:
+        """
+        Paths of the image files the tree lists under start_node, without checking
+        that they still exist; stops early with the paths found so far once timer
+        is out of time.
+        """
+        if not start_node:
+            return []
+        out = []
+        stack = [start_node]
 
-                # Add child directories to stack
-                for k, child in node.items():
-                    if k in ("_path", "_files"):
-                        continue
-                    stack.append(child)
+        exts_lower = tuple(ext.lower() for ext in FILE_EXTS)
+        # Drop zero-width characters, non-breaking space -> space
+        cleanup = str.maketrans({'\u200b': None, '\u200c': None, '\u200d': None, '\u00a0': ' '})
+
+        def normalize_name(name: str) -> str:
+            n = name.translate(cleanup)
+            n = n.strip().lower().rstrip('.')
+            return n
 
-            return out
+        def has_valid_ext(name: str) -> bool:
+            nn = normalize_name(name)
+            return nn.endswith(exts_lower)
 
-    def search_by_selection(self, selection: dict, max_suggestions: int = 200) -> tuple[dict, list[str], list[tuple[str, list[str], int]]]:
+        while stack:
+            if timer is not None and timer.out_of_time():
+                break
+            node = stack.pop()
+            base_path = node.get("_path", "")
+
+            # Use cached files from tree instead of disk scan
+            cached = node.get("_files", []) or []
+            for fn in cached:
+                basename = os.path.basename(fn)
+                if has_valid_ext(basename) or ('.' not in basename):
+                    out.append(os.path.join(base_path, fn))
+
+            # Add child directories to stack
+            for k, child in node.items():
+                if k in ("_path", "_files"):
+                    continue
+                stack.append(child)
+
+        return out
+
+    def collect_candidate_files(self, start_node: Dict, timer: Optional[StageTimer] = None) -> List[str]:
+        """Files under start_node that exist on disk; stops early with the files found so far once timer is out of time."""
+        out = []
+        for full in self.candidate_names(start_node, timer):
+            if timer is not None and timer.out_of_time():
+                break
+            try:
+                if fsio.isfile(full):
+                    out.append(full)
+            except Exception:
+                continue
+        return out
+
+    def feature_table(self, node: Optional[Dict], gen: Optional[IndexGeneration] = None,
+                      timer: Optional[StageTimer] = None, partial: bool = True) -> Optional[FeatureTable]:
         """
-        Perform questionnaire search based on normalized selection dict from build_selection().
-        Returns:
-        debug_info: dict (similar structure to debug_search_files)
-        exact_matches: list[str] (absolute paths)
-        suggestions: list of tuples (path, missing_parts, score) sorted by score desc
+        Candidate files under node (the rows of name_table that exist on disk) with
+        feature columns memoized per generation. A table cut short by timer's budget
+        holds the files found so far and is not memoized; with partial=False, None
+        is returned instead. Rows are checked on disk when the table is built, so a
+        file deleted later stays in it until the next generation: searches check the
+        files they return again, facet counts still include it.
         """
-        supplier = selection.get("supplier")
-        folder_code = selection.get("folder_code")
-        materials = [normalize_token(m) for m in (selection.get("material") or [])]
-        colors = [normalize_token(c) for c in (selection.get("color") or [])]
-        sizes = selection.get("size") or []
-        designs = selection.get("designs") or []
-        file_token = selection.get("file_token")
+        gen = gen or self.generation
+        key = node.get("_path") if node else None
+        table = gen.feature_tables.get(key)
+        if table is None:
+            names = self.name_table(node, gen, timer)
+            table = names.take(self._existing_rows(names, range(len(names)), timer))
+            if not partial and timer is not None and timer.incomplete:
+                return None
+            if timer is None or not timer.incomplete:
+                gen.feature_tables[key] = table
+        return table
+
+    @staticmethod
+    def _existing_rows(names: FeatureTable, ids: Iterable[int], timer: Optional[StageTimer] = None) -> List[int]:
+        """The ids of names whose file exists on disk; stops early once timer is out of time."""
+        out = []
+        for i in ids:
+            if timer is not None and timer.out_of_time():
+                break
+            try:
+                if fsio.isfile(names.paths[i]):
+                    out.append(i)
+            except Exception:
+                continue
+        return out
 
-        # pick search root
-        search_node = self.tree
+    def name_table(self, node: Optional[Dict], gen: Optional[IndexGeneration] = None,
+                   timer: Optional[StageTimer] = None, partial: bool = True) -> Optional[FeatureTable]:
+        """
+        Table over the file names the tree lists under node, memoized per generation.
+        Nothing is read from disk, so it serves statistics and suggestions over the
+        whole tree; rows can name files deleted since the tree was built. Budgets
+        are handled as in feature_table.
+        """
+        gen = gen or self.generation
+        key = node.get("_path") if node else None
+        table = gen.name_tables.get(key)
+        if table is None:
+            paths = self.candidate_names(node, timer)
+            if not partial and timer is not None and timer.incomplete:
+                return None
+            table = FeatureTable(paths, node.get("_path") if node else self.root_dir)
+            if timer is None or not timer.incomplete:
+                gen.name_tables[key] = table
+        return table
+
+    def global_candidates(self, conditions: Dict[str, int], gen: Optional[IndexGeneration] = None,
+                          timer: Optional[StageTimer] = None) -> Tuple[FeatureTable, List[int]]:
+        """
+        (whole-tree name_table, ids of its rows whose names carry the name codes in
+        conditions and whose files exist). Only those rows are checked on disk.
+        """
+        gen = gen or self.generation
+        names = self.name_table(gen.tree, gen, timer)
+        key = tuple(sorted(conditions.items()))
+        rows = gen.global_rows.get(key)
+        if rows is None:
+            rows = self._existing_rows(names, global_rows(names, conditions).tolist(), timer)
+            if timer is None or not timer.incomplete:
+                gen.global_rows[key] = rows
+        return names, rows
+
+    def _resolve_scan_root(self, supplier: Optional[str], folder_code: Optional[str], timer: StageTimer,
+                           gen: IndexGeneration) -> Dict[str, Any]:
+        """Supplier folder -> folder-code folder -> auto-descent, each timed as its own stage."""
+        search_node = gen.tree
         sup_node = None
-        if supplier:
-            sup_node = self.find_supplier_selected_folder(supplier)
-            if sup_node:
-                search_node = sup_node
+        stats = {"folders_visited": 0, "subtrees_pruned": 0}
+        with timer.stage("supplier_resolution"):
+            if supplier:
+                sup_node = self.find_supplier_selected_folder(supplier, gen, stats)
+                if sup_node:
+                    search_node = sup_node
 
         fc_node = None
-        if folder_code and search_node:
-            fc_node, _, _ = self.find_folder_with_code(search_node, folder_code, supplier_prefix=supplier)
-            if fc_node:
-                search_node = fc_node
-
-        final_node, stop_reason = self.descend_to_images_or_branch(search_node, folder_code, allow_images=True)
-        node_for_scan = final_node or search_node
-
-        # scan candidates once
-        candidate_files = self.collect_candidate_files(node_for_scan)
-        base_root = node_for_scan.get("_path") if node_for_scan else self.root_dir
-
-        # strict filter = all provided criteria must match
-        exact_matches = []
-        suggestions = []
+        with timer.stage("folder_code_resolution"):
+            if folder_code and search_node:
+                fc_node, _, _ = self.find_folder_with_code(search_node, folder_code, supplier_prefix=supplier,
+                                                           gen=gen, stats=stats)
+                if fc_node:
+                    search_node = fc_node
+
+        timer.count("folders_visited", stats["folders_visited"])
+        timer.count("subtrees_pruned", stats["subtrees_pruned"])
+
+        with timer.stage("descend"):
+            final_node, stop_reason = self.descend_to_images_or_branch(search_node, folder_code, allow_images=True)
+        return {
+            "generation": gen,
+            "supplier_node": sup_node,
+            "folder_code_node": fc_node,
+            "scan_node": final_node or search_node,
+            "stop_reason": stop_reason,
+        }
 
-        for p in candidate_files:
-            rel = os.path.relpath(p, base_root) if base_root else os.path.basename(p)
-            s = make_searchable(rel)
+    def _route_debug(self, route: Dict[str, Any]) -> Dict[str, Any]:
+        sup_node, fc_node, scan_node = route["supplier_node"], route["folder_code_node"], route["scan_node"]
+        return {
+            "initial_root": self.root_dir,
+            "index_generation": route["generation"].number,
+            "supplier_folder_found": sup_node.get("_path") if sup_node else None,
+            "folder_code_folder_found": fc_node.get("_path") if fc_node else None,
+            "autodescent_final_root": scan_node.get("_path") if scan_node else None,
+            "autodescent_stop_reason": route["stop_reason"],
+        }
 
-            # Compute score and missing parts
-            sc, missing = compute_match_score(
-                s,
+    def search_by_selection(self, selection: dict, max_suggestions: int = 200, budget_ms: Optional[float] = None,
+                            on_complete=None, on_error=None) -> tuple[dict, list[str], list[tuple[str, list[str], int]]]:
+        """
+        Perform questionnaire search based on normalized selection dict from build_selection().
+        Returns:
+        debug_info: dict (similar structure to debug_search_files, plus "timings")
+        exact_matches: list[str] (absolute paths)
+        suggestions: list of tuples (path, missing_parts, score) sorted by score desc
+        With budget_ms, see debug_search_files.
+        """
+        gen = self.generation
+        timer = StageTimer(budget_ms)
+        materials, colors, sizes, designs, file_token = self._selection_criteria(selection)
+
+        with io_accounting() as io:
+            route = self._resolve_scan_root(selection.get("supplier"), selection.get("folder_code"), timer, gen)
+
+            # scan candidates once; feature columns are reused across queries on the same root
+            with timer.stage("candidate_collection"):
+                table = self.feature_table(route["scan_node"], gen, timer)
+            # Returned files are checked on disk again (see feature_table).
+            exact_matches, suggestions = score_table(
+                table,
                 materials,
                 colors,
                 sizes,
                 designs,
                 file_token,
+                max_suggestions=max_suggestions,
+                timer=timer,
+                exists=fsio.isfile,
             )
-
-            # Strict logic: if a criterion was provided, it must not be missing.
-            criteria_provided = {
-                "material": bool(materials),
-                "color": bool(colors),
-                "size": bool(sizes),
-                "design": bool(designs),
-                "file_token": bool(file_token),
-            }
-            any_missing_provided = any(criteria_provided.get(m, False) for m in missing)
-
-            if not any_missing_provided:
-                exact_matches.append(p)
-            else:
-                # Only add as suggestion if it matches something (score>0)
-                if sc > 0:
-                    suggestions.append((p, missing, sc))
-
-        # rank suggestions by score desc, then by filename asc
-        suggestions.sort(key=lambda x: (-x[2], os.path.basename(x).lower()))
-        if max_suggestions is not None:
-            suggestions = suggestions[:max_suggestions]
-
-        debug = {
-            "selection": selection,
-            "initial_root": self.root_dir,
-            "supplier_folder_found": sup_node.get("_path") if sup_node else None,
-            "folder_code_folder_found": fc_node.get("_path") if fc_node else None,
-            "autodescent_final_root": (final_node or search_node).get("_path") if (final_node or search_node) else None,
-            "autodescent_stop_reason": stop_reason,
-            "candidate_count": len(candidate_files),
+        timer.count("candidates", len(table))
+        timer.count("matches", len(exact_matches))
+        timer.count("suggestions", len(suggestions))
+        timings = timer.as_dict(io)
+        log_timing("search_by_selection", timings, root=self.root_dir, query=selection, **timer.budget_info())
+
+        debug = {"selection": selection}
+        debug.update(self._route_debug(route))
+        debug.update({
+            "candidate_count": len(table),
             "matches_count": len(exact_matches),
             "suggestions_count": len(suggestions),
             "sample_suggestions": [(p, missing, sc) for (p, missing, sc) in suggestions[:60]],
-        }
+            "timings": timings,
+        })
+        debug.update(timer.budget_info())
+        if timer.incomplete and on_complete is not None:
+            continue_in_background(lambda: self.search_by_selection(selection, max_suggestions), on_complete, on_error)
         return debug, exact_matches, suggestions
 
+    @staticmethod
+    def _selection_criteria(selection: dict) -> Tuple[List[str], List[str], List[str], List[str], Optional[str]]:
+        return (
+            [normalize_token(m) for m in (selection.get("material") or [])],
+            [normalize_token(c) for c in (selection.get("color") or [])],
+            selection.get("size") or [],
+            selection.get("designs") or [],
+            selection.get("file_token"),
+        )
+
+    def facet_counts(self, selection: dict, budget_ms: Optional[float] = None, on_complete=None, on_error=None) -> Dict[str, Any]:
+        """
+        Questionnaire facet counts for a build_selection() dict: for every material,
+        color, size and design code, how many files would match exactly if it were
+        chosen (see scoring.facet_counts). Uses the same scan root as
+        search_by_selection and reuses its attribute records and criterion columns.
+        With budget_ms, see debug_search_files.
+        """
+        gen = self.generation
+        timer = StageTimer(budget_ms)
+        with io_accounting() as io:
+            route = self._resolve_scan_root(selection.get("supplier"), selection.get("folder_code"), timer, gen)
+            with timer.stage("candidate_collection"):
+                table = self.feature_table(route["scan_node"], gen, timer)
+        with timer.stage("facets"):
+            counts = facet_counts(table, *self._selection_criteria(selection))
+        counts["candidates"] = len(table)
+        counts["timings"] = timer.as_dict(io)
+        counts.update(timer.budget_info())
+        if timer.incomplete and on_complete is not None:
+            continue_in_background(lambda: self.facet_counts(selection), on_complete, on_error)
+        return counts
+
+    def _code_criteria(self, code: str, parsed: Dict) -> Dict[str, Any]:
+        return {
+            "materials": [normalize_token(m) for m in parsed["material"]],
+            "colors": [normalize_token(c) for c in parsed["color"]],
+            "sizes": parsed["size"],
+            "file_token": parsed["file_token"],
+            "signatures": extract_series_signatures(code),
+        }
 
-    def search_files(self, code: str) -> List[str]:
-        parsed = parse_product_code(code)
-        supplier = parsed["supplier"]
-        folder_code = parsed["folder_code"]
-        materials = [normalize_token(m) for m in parsed["material"]]
-        colors = [normalize_token(c) for c in parsed["color"]]
-        sizes = parsed["size"]
-        file_token = parsed["file_token"]
-
-        search_node = self.tree
-        sup_node = None
-        if supplier:
-            sup_node = self.find_supplier_selected_folder(supplier)
-            if sup_node:
-                search_node = sup_node
-
-        fc_node = None
-        if folder_code and search_node:
-            fc_node, _, _ = self.find_folder_with_code(search_node, folder_code, supplier_prefix=supplier)
-            if fc_node:
-                search_node = fc_node
-
-        final_node, _ = self.descend_to_images_or_branch(search_node, folder_code, allow_images=True)
-        node_for_scan = final_node or search_node
-        candidate_files = self.collect_candidate_files(node_for_scan)
-        base_root = node_for_scan.get("_path") if node_for_scan else self.root_dir
-
-        series_signatures = extract_series_signatures(code)
-
-        results = []
-        for p in candidate_files:
-            rel = os.path.relpath(p, base_root) if base_root else os.path.basename(p)
-            s = make_searchable(rel)
-
-            if path_contains_any_signature(rel, series_signatures):
-                results.append(p)
-                continue
-
-            if materials and not any(m in s for m in materials):
-                continue
-            if colors and not color_matches(s, colors):
-                continue
-            if sizes and not matches_size(s, sizes):
-                continue
-            if not file_token_match(s, file_token):
+    def _code_candidate_ids(self, table: FeatureTable, crit: Dict[str, Any]) -> Optional[List[int]]:
+        """
+        Ids that can possibly match, narrowed with the table's trigram index: files
+        containing a series signature, plus files passing every criterion that can
+        be looked up. None means the index can't narrow this query (scan everything).
+        """
+        sig_ids = table.find_any_compact(sig for sig in crit["signatures"] if sig)
+        if sig_ids is None:
+            return None
+        term_sets = []
+        if crit["materials"]:
+            term_sets.append(crit["materials"])
+        if crit["colors"]:
+            term_sets.append(crit["colors"])
+        if crit["sizes"]:
+            variants = set()
+            for sz in crit["sizes"]:
+                variants.update(v for v in generate_size_variants(sz) if v)
+            term_sets.append(sorted(variants))
+        ft_norm = make_searchable(crit["file_token"]) if crit["file_token"] else ""
+        if ft_norm:
+            term_sets.append([ft_norm])
+        narrowed = None
+        for terms in term_sets:
+            ids = table.find_any(terms)
+            if ids is None:
                 continue
-            results.append(p)
-        return results
-
-    def debug_search_files(self, code: str, max_show: int = 60) -> Tuple[Dict, List[str]]:
-        parsed = parse_product_code(code)
-        supplier = parsed["supplier"]
-        folder_code = parsed["folder_code"]
-        materials = [normalize_token(m) for m in parsed["material"]]
-        colors = [normalize_token(c) for c in parsed["color"]]
-        sizes = parsed["size"]
-        file_token = parsed["file_token"]
-
-        search_node = self.tree
-        sup_node = None
-        if supplier:
-            sup_node = self.find_supplier_selected_folder(supplier)
-            if sup_node:
-                search_node = sup_node
-
-        fc_node = None
-        if folder_code and search_node:
-            fc_node, _, _ = self.find_folder_with_code(search_node, folder_code, supplier_prefix=supplier)
-            if fc_node:
-                search_node = fc_node
-
-        final_node, stop_reason = self.descend_to_images_or_branch(search_node, folder_code, allow_images=True)
-        node_for_scan = final_node or search_node
-        candidate_files = self.collect_candidate_files(node_for_scan)
-        base_root = node_for_scan.get("_path") if node_for_scan else self.root_dir
-
-        series_signatures = extract_series_signatures(code)
+            narrowed = set(ids) if narrowed is None else narrowed.intersection(ids)
+        if narrowed is None:
+            return None
+        return sorted(narrowed.union(sig_ids))
+
+    @staticmethod
+    def _code_failures(s: str, crit: Dict[str, Any]) -> List[str]:
+        fail = []
+        if crit["materials"] and not any(m in s for m in crit["materials"]):
+            fail.append("material")
+        if crit["colors"] and not color_matches(s, crit["colors"]):
+            fail.append("color")
+        if crit["sizes"] and not matches_size(s, crit["sizes"]):
+            fail.append("size")
+        if not file_token_match(s, crit["file_token"]):
+            fail.append("file_token")
+        return fail
+
+    def _match_code(self, code: str, parsed: Dict, table: FeatureTable, max_reasons: int = 0,
+                    limit: Optional[int] = None, rows=None, timer: Optional[StageTimer] = None):
+        """
+        (matches in table order, first max_reasons rejections as (path, failed criteria),
+        rows verified). Only rows (sorted ids, default: all) are considered.
+        Large tables only verify the trigram candidates; the result is the same as a full scan.
+        Matching rows are checked on disk again, so files deleted since the table was
+        built are not returned.
+        With a limit, scanning stops at the first `limit` matches. Verification started
+        within timer's budget stops when it runs out; rows collected before it ran out
+        are verified in full (they are in memory).
+        """
+        crit = self._code_criteria(code, parsed)
+        signatures = crit["signatures"]
+        paths, searchables, compacts = table.paths, table.searchables, table.compacts
 
-        matches, reasons = [], []
-        for p in candidate_files:
-            rel = os.path.relpath(p, base_root) if base_root else os.path.basename(p)
-            s = make_searchable(rel)
+        ids = self._code_candidate_ids(table, crit)
+        if rows is not None:
+            ids = rows if ids is None else sorted(set(ids).intersection(rows))
+        matched = []
+        verified = 0
+        budgeted = timer is not None and not timer.incomplete
+        for i in (range(len(paths)) if ids is None else ids):
+            if budgeted and timer.out_of_time():
+                break
+            verified += 1
+            if contains_any_signature(compacts[i], signatures) or not self._code_failures(searchables[i], crit):
+                if not fsio.isfile(paths[i]):
+                    continue  # deleted since the table was checked on disk
+                matched.append(i)
+                if limit is not None and len(matched) >= limit:
+                    break
 
-            if path_contains_any_signature(rel, series_signatures):
-                matches.append(p)
-                continue
+        reasons = []
+        if max_reasons:
+            matched_set = set(matched)
+            for i in (range(len(paths)) if rows is None else rows):
+                if len(reasons) >= max_reasons:
+                    break
+                if i not in matched_set:
+                    reasons.append((paths[i], self._code_failures(searchables[i], crit)))
+        return [paths[i] for i in matched], reasons, verified
+
+    def _plan_code_search(self, parsed: Dict, route: Dict[str, Any], gen: IndexGeneration,
+                          timer: Optional[StageTimer] = None):
+        """(CodePlan, name-code conditions); see planner.py."""
+        conditions = name_code_filter(parsed["supplier"], parsed["folder_code"])
+        missing = unresolved_fields(parsed, route)
+        estimate = None
+        if missing and conditions:
+            # Estimated from the names the tree lists; an estimate cut short by the budget would be too low.
+            names = self.name_table(gen.tree, gen, timer, partial=False)
+            if names is not None:
+                estimate = len(global_rows(names, conditions))
+        plan = choose_plan(subtree_file_count(route["scan_node"]), estimate, missing)
+        return plan, conditions
+
+    def did_you_mean(self, code: str, node: Optional[Dict] = None, limit: int = DID_YOU_MEAN_LIMIT,
+                     gen: Optional[IndexGeneration] = None, timer: Optional[StageTimer] = None) -> List[Tuple[str, float]]:
+        """
+        Files under node (default: the whole tree, so it still helps when supplier or
+        folder resolution went wrong) whose names are most similar to the code or its
+        reversed form, as (path, similarity) best first. Candidates come from the
+        names the tree lists; only the suggested files are checked on disk.
+        """
+        gen = gen or self.generation
+        table = self.name_table(node if node is not None else gen.tree, gen, timer)
+        best: Dict[int, float] = {}
+        for sig in extract_series_signatures(code):
+            for i, sim in table.similar(sig, limit=limit, min_similarity=DID_YOU_MEAN_MIN_SIMILARITY):
+                best[i] = max(sim, best.get(i, 0.0))
+        out = []
+        for i, sim in sorted(best.items(), key=lambda x: (-x[1], x[0])):
+            if len(out) >= limit:
+                break
+            if self._existing_rows(table, [i]):
+                out.append((table.paths[i], sim))
+        return out
+
+    def _search_code(self, code: str, max_reasons: int = 0, limit: Optional[int] = None,
+                     timer: Optional[StageTimer] = None):
+        gen = self.generation
+        timer = timer or StageTimer()
+        with timer.stage("parse"):
+            parsed = parse_product_code(code)
+        with io_accounting() as io:
+            route = self._resolve_scan_root(parsed["supplier"], parsed["folder_code"], timer, gen)
+            with timer.stage("planning"):
+                plan, conditions = self._plan_code_search(parsed, route, gen, timer)
+            with timer.stage("candidate_collection"):
+                rows = None
+                if plan.kind == NARROW:
+                    table = self.feature_table(route["scan_node"], gen, timer)
+                else:
+                    table, rows = self.global_candidates(conditions, gen, timer)
+            plan.candidate_rows = len(table) if rows is None else len(rows)
+            with timer.stage("matching"):
+                matches, reasons, plan.rows_verified = self._match_code(
+                    code, parsed, table, max_reasons, limit, rows=rows, timer=timer)
+            if not matches and conditions and (plan.kind == GLOBAL or route["scan_node"] is not gen.tree) \
+                    and not timer.incomplete:
+                # Nothing found; run the other plan (global only applies when the code has name codes).
+                with timer.stage("fallback"):
+                    first = plan
+                    if first.kind == NARROW:
+                        table, rows = self.global_candidates(conditions, gen, timer)
+                        plan = CodePlan(GLOBAL, "narrow plan found no matches",
+                                        dict(first.estimated_rows, **{GLOBAL: len(global_rows(table, conditions))}),
+                                        fallback_from=NARROW)
+                        plan.candidate_rows = len(rows)
+                    else:
+                        table = self.feature_table(route["scan_node"], gen, timer)
+                        rows = None
+                        plan = CodePlan(NARROW, "global plan found no matches", first.estimated_rows,
+                                        fallback_from=GLOBAL)
+                        plan.candidate_rows = len(table)
+                    matches, reasons, verified = self._match_code(code, parsed, table, max_reasons, limit,
+                                                                  rows=rows, timer=timer)
+                    plan.rows_verified = first.rows_verified + verified
+        timer.count("candidates", plan.candidate_rows)
+        timer.count("rows_verified", plan.rows_verified)
+        timer.count("matches", len(matches))
+        timings = timer.as_dict(io)
+        log_timing("debug_search_files" if max_reasons else "search_files", timings,
+                   root=self.root_dir, query=code, plan=plan.kind, **timer.budget_info())
+        return parsed, route, plan, matches, reasons, timings
+
+    def search_files(self, code: str, limit: Optional[int] = None, budget_ms: Optional[float] = None) -> List[str]:
+        """
+        Files matching code in tree order; with a limit, only the first `limit` of them.
+        With budget_ms, the matches found when it ran out (debug_search_files reports whether it did).
+        """
+        _, _, _, matches, _, _ = self._search_code(code, limit=limit, timer=StageTimer(budget_ms))
+        return matches
 
-            fail = []
-            if materials and not any(m in s for m in materials):
-                fail.append("material")
-            if colors and not color_matches(s, colors):
-                fail.append("color")
-            if sizes and not matches_size(s, sizes):
-                fail.append("size")
-            if not file_token_match(s, file_token):
-                fail.append("file_token")
-            if fail:
-                reasons.append((p, fail))
-            else:
-                matches.append(p)
-
-        debug = {
-            "parsed": parsed,
-            "initial_root": self.root_dir,
-            "supplier_folder_found": sup_node.get("_path") if sup_node else None,
-            "folder_code_folder_found": fc_node.get("_path") if fc_node else None,
-            "autodescent_final_root": (final_node or search_node).get("_path") if (final_node or search_node) else None,
-            "autodescent_stop_reason": stop_reason,
-            "candidate_count": len(candidate_files),
+    def debug_search_files(self, code: str, max_show: int = 60, limit: Optional[int] = None,
+                           budget_ms: Optional[float] = None, on_complete=None, on_error=None) -> Tuple[Dict, List[str]]:
+        """
+        With budget_ms, stages that wait on the disk (collecting candidate files and
+        the searches that follow) stop once that many milliseconds have passed, and the
+        matches found so far are returned with "incomplete" and "stopped_at" (the stage
+        running then) in the debug dict. on_complete, if given, is called with the
+        (debug, matches) of the same search run to the end on a background thread;
+        on_error, if given, with the error message should that search fail.
+        """
+        timer = StageTimer(budget_ms)
+        parsed, route, plan, matches, reasons, timings = self._search_code(code, max_show, limit, timer)
+        similar = []
+        if not matches:
+            with timer.stage("did_you_mean"):
+                similar = self.did_you_mean(code, gen=route["generation"], timer=timer)
+        debug = {"parsed": parsed}
+        debug.update(self._route_debug(route))
+        debug.update({
+            "plan": plan.as_dict(),
+            "candidate_count": plan.candidate_rows,
             "matches_count": len(matches),
+            "truncated": limit is not None and len(matches) >= limit,
             "matches": matches[:max_show],
-            "rejections": reasons[:max_show]
-        }
-        return debug, matches
\ No newline at end of file
+            "rejections": reasons,
+            "did_you_mean": similar,
+            "timings": timings,
+        })
+        debug.update(timer.budget_info())
+        if timer.incomplete and on_complete is not None:
+            continue_in_background(lambda: self.debug_search_files(code, max_show, limit), on_complete, on_error)
+        return debug, matches
+
+    def complete_code(self, text: str, limit: int = COMPLETION_LIMIT) -> List[Tuple[str, int]]:
+        """
+        Completions of a partly typed code as (code, names sharing it), most common
+        first (see code_completion.py). The first call after the index changes
+        updates the completion trie; later calls are dict lookups. A tree loaded
+        from a mapped or lazy cache is completed from the names saved with it.
+        """
+        gen = self.generation
+        with self._completer_lock:
+            if self._completer.generation != gen.number:
+                fp = self._fingerprints
+                fingerprints = fp.dirs if fp is not None and fp.hash == gen.hash else None
+                saved = None if isinstance(gen.tree, dict) else read_names(self.completion_names_file, gen.hash)
+                self._completer.update(gen.tree, fingerprints, gen.number, saved)
+            return self._completer.complete(text, limit)
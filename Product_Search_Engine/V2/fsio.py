@@ -0,0 +1,143 @@
+"""
+Filesystem call accounting.
+
+FolderIndex and the preview code call these wrappers instead of os directly.
+Inside `with io_accounting() as io:` every call made on that thread is counted
+and timed per kind (scandir, stat, getmtime, isfile, isdir, exists, open);
+outside of it a wrapper costs one thread-local lookup.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_local = threading.local()
+
+
+class IOStats:
+    """Call counts and wall time (ms) per filesystem call kind."""
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self.ms: Dict[str, float] = {}
+
+    def record(self, kind: str, ms: float):
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        self.ms[kind] = self.ms.get(kind, 0.0) + ms
+
+    def merge(self, other: "IOStats"):
+        for kind, n in other.calls.items():
+            self.calls[kind] = self.calls.get(kind, 0) + n
+            self.ms[kind] = self.ms.get(kind, 0.0) + other.ms.get(kind, 0.0)
+
+    def as_dict(self) -> Dict:
+        return {
+            "calls": dict(self.calls),
+            "ms": {k: round(v, 3) for k, v in self.ms.items()},
+            "total_calls": sum(self.calls.values()),
+            "total_ms": round(sum(self.ms.values()), 3),
+        }
+
+
+@contextmanager
+def io_accounting():
+    """Collect IOStats for the enclosed block; nested blocks also count towards the outer one."""
+    outer: Optional[IOStats] = getattr(_local, "stats", None)
+    stats = IOStats()
+    _local.stats = stats
+    try:
+        yield stats
+    finally:
+        _local.stats = outer
+        if outer is not None:
+            outer.merge(stats)
+
+
+def _timed(kind: str, fn, *args, **kwargs):
+    stats = getattr(_local, "stats", None)
+    if stats is None:
+        return fn(*args, **kwargs)
+    t0 = perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        stats.record(kind, (perf_counter() - t0) * 1000.0)
+
+
+def scandir(path: str) -> List[os.DirEntry]:
+    """os.scandir fully consumed, so the directory read is included in the timing."""
+    def _read():
+        with os.scandir(path) as it:
+            return list(it)
+    return _timed("scandir", _read)
+
+
+def stat(path: str) -> os.stat_result:
+    return _timed("stat", os.stat, path)
+
+
+def getmtime(path: str) -> float:
+    return _timed("getmtime", os.path.getmtime, path)
+
+
+def isfile(path: str) -> bool:
+    return _timed("isfile", os.path.isfile, path)
+
+
+def isdir(path: str) -> bool:
+    return _timed("isdir", os.path.isdir, path)
+
+
+def exists(path: str) -> bool:
+    return _timed("exists", os.path.exists, path)
+
+
+def open_file(path: str, mode: str = "r", **kwargs):
+    """builtin open; only the open itself is timed, not later reads."""
+    return _timed("open", open, path, mode, **kwargs)
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", **kwargs):
+    """
+    open_file() on a temporary name next to path, flushed to disk and renamed
+    over path when the block succeeds. Readers see the old or the new file,
+    never a partial one, even if the process dies mid-write.
+    """
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open_file(tmp, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def walk(top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+    """
+    Top-down os.walk (same order, symlinked dirs listed but not entered, unreadable
+    dirs skipped) whose directory reads go through scandir() above.
+    """
+    try:
+        entries = scandir(top)
+    except OSError:
+        return
+    dirs, files, links = [], [], set()
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+            if is_dir and entry.is_symlink():
+                links.add(entry.name)
+        except OSError:
+            is_dir = False
+        if is_dir:
+            dirs.append(entry.name)
+        else:
+            files.append(entry.name)
+    yield top, dirs, files
+    for name in dirs:
+        if name not in links:
+            yield from walk(os.path.join(top, name))
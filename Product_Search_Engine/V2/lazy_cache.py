@@ -0,0 +1,175 @@
+"""
+Tree cache split into lazily loaded shards.
+
+A FolderIndex whose cache file ends in LAZY_CACHE_EXT keeps its tree in a
+directory instead of one JSON file:
+  manifest.json   dir hash, the directory skeleton (folder names and file
+                  counts, no file names) and one entry per shard
+  <shard>.json    {folder path: [file names]} for one top-level folder of the
+                  catalog (one supplier), plus a shard for files in the root
+
+Supplier, folder-code and descent resolution only read folder names, so they
+run on the skeleton; a shard is read the first time a search needs the file
+names of a folder in it. At most LAZY_SHARDS_MAX_LOADED shards are kept; the
+least recently used one is dropped and read again when needed. Cold-start
+memory and load time then follow what is searched, not the catalog size.
+
+Shard files carry the dir hash in their name. A save writes the new shards,
+then the manifest (each via a temporary file and a rename), then removes
+shards that neither the new nor the previous manifest references, so a
+process still reading the previous manifest can finish its searches.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .constants import LAZY_SHARDS_MAX_LOADED
+from . import fsio
+from .tree_nodes import META_KEYS, TreeNode
+
+MANIFEST = "manifest.json"
+VERSION = 1
+ROOT_SHARD = ""
+
+
+def _shard_file(key: str, dir_hash: Optional[str]) -> str:
+    slug = "".join(ch if ch.isalnum() else "-" for ch in key.lower()).strip("-")[:40] or "root"
+    digest = hashlib.md5(key.encode("utf-8", "surrogatepass")).hexdigest()[:8]
+    return f"{slug}-{digest}.{(dir_hash or 'nohash')[:8]}.json"
+
+
+def _write_json(path: str, obj):
+    with fsio.atomic_write(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+
+
+def _read_manifest(cache_dir: str) -> Optional[Dict]:
+    path = os.path.join(cache_dir, MANIFEST)
+    if not fsio.exists(path):
+        return None
+    with fsio.open_file(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != VERSION:
+        raise ValueError(f"{path}: not a version {VERSION} manifest")
+    return manifest
+
+
+def write_lazy_tree(cache_dir: str, tree: Dict, dir_hash: Optional[str]):
+    """Persist a dict tree as shards plus a manifest (see module docstring)."""
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        previous = _read_manifest(cache_dir)
+    except (OSError, ValueError):
+        previous = None
+
+    shards: Dict[str, Dict[str, List[str]]] = {}
+
+    def skeleton(node: Dict, shard: str) -> List:
+        # [file count, {child name: skeleton}]; paths are rebuilt from the names on load.
+        files = node.get("_files") or []
+        if files:
+            shards.setdefault(shard, {})[node.get("_path", "")] = files
+        return [len(files), {k: skeleton(v, shard if shard != ROOT_SHARD else k)
+                             for k, v in node.items() if k not in META_KEYS}]
+
+    root = {"path": tree.get("_path", ""), "node": skeleton(tree, ROOT_SHARD)}
+
+    entries = {}
+    for key, folders in shards.items():
+        name = _shard_file(key, dir_hash)
+        _write_json(os.path.join(cache_dir, name), folders)
+        entries[key] = {"file": name, "folders": len(folders), "files": sum(len(f) for f in folders.values())}
+    _write_json(os.path.join(cache_dir, MANIFEST),
+                {"version": VERSION, "hash": dir_hash, "shards": entries, "root": root})
+
+    keep = {e["file"] for e in entries.values()}
+    if previous:
+        keep.update(e["file"] for e in previous.get("shards", {}).values())
+    for name in os.listdir(cache_dir):
+        if name != MANIFEST and name.endswith(".json") and name not in keep:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+
+class LazyTree:
+    """A loaded manifest; root is a LazyNode usable wherever a dict tree node is."""
+    def __init__(self, cache_dir: str, max_loaded: int = LAZY_SHARDS_MAX_LOADED):
+        manifest = _read_manifest(cache_dir)
+        if manifest is None:
+            raise FileNotFoundError(os.path.join(cache_dir, MANIFEST))
+        self.cache_dir = cache_dir
+        self.hash = manifest.get("hash")
+        self.shards: Dict[str, Dict] = manifest.get("shards", {})
+        self.max_loaded = max(1, max_loaded)
+        self.loads = 0
+        self._loaded: "OrderedDict[str, Dict[str, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        root = manifest["root"]
+        self.root = LazyNode(self, root["path"], ROOT_SHARD, root["node"])
+
+    def folder_files(self, shard: str, path: str) -> List[str]:
+        with self._lock:
+            folders = self._loaded.get(shard)
+            if folders is None:
+                folders = self._load(shard)
+                self._loaded[shard] = folders
+                while len(self._loaded) > self.max_loaded:
+                    self._loaded.popitem(last=False)
+            else:
+                self._loaded.move_to_end(shard)
+        return folders.get(path, [])
+
+    def _load(self, shard: str) -> Dict[str, List[str]]:
+        entry = self.shards.get(shard)
+        if entry is None:
+            return {}
+        self.loads += 1
+        try:
+            with fsio.open_file(os.path.join(self.cache_dir, entry["file"]), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print("Failed to load index shard:", e)
+            return {}
+
+    @property
+    def loaded_shards(self) -> List[str]:
+        return list(self._loaded)
+
+
+class LazyNode(TreeNode):
+    """Node of a LazyTree: folder names come from the manifest, files from the node's shard."""
+    __slots__ = ("_tree", "_path", "_shard", "_nfiles", "_children")
+
+    def __init__(self, tree: LazyTree, path: str, shard: str, skeleton: List):
+        self._tree = tree
+        self._path = path
+        self._shard = shard
+        self._nfiles, children = skeleton
+        # Same joins as build_tree; top-level folders start their own shard.
+        self._children = {
+            name: LazyNode(tree, os.path.join(path, name), shard if shard != ROOT_SHARD else name, child)
+            for name, child in children.items()
+        }
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def files(self) -> List[str]:
+        if not self._nfiles:
+            return []
+        return self._tree.folder_files(self._shard, self._path)
+
+    @property
+    def children(self) -> Dict[str, "LazyNode"]:
+        return self._children
+
+    @property
+    def file_count(self) -> int:
+        return self._nfiles
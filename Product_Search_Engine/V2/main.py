@@ -1,7 +1,10 @@
+# Imported first so start-up milestones are measured from process start.
+from .startup import mark
 import sys
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout
-from .config import load_config, save_config, pick_root_dir
-from .folder_index import FolderIndex
+from .config import load_config, save_config, pick_root_dir, get_root_dirs
+from .sharded_index import open_index
 from .ui_search_tab import SearchTab
 
 class MainWindow(QMainWindow):
@@ -11,27 +14,49 @@ class MainWindow(QMainWindow):
         self.resize(1200, 800)
 
         cfg = load_config()
-        root_dir = cfg.get("root_dir")
-        if not root_dir:
+        root_dirs = get_root_dirs(cfg)
+        if not root_dirs:
             root_dir = pick_root_dir()
             if not root_dir:
                 raise SystemExit("No root directory selected.")
             cfg["root_dir"] = root_dir
             save_config(cfg)
+            root_dirs = [root_dir]
 
-        self.index = FolderIndex(root_dir)
-        tab = SearchTab(root_dir, self.index)
+        self.root_dirs = root_dirs
+        self.index = None
+        self.tab = SearchTab(root_dirs[0])
+        self.tab.index_ready.connect(self.on_index_ready)
 
         central = QWidget()
         v = QVBoxLayout(central)
-        v.addWidget(tab)
+        v.addWidget(self.tab)
         self.setCentralWidget(central)
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        mark("first_paint")
+
+    def start_index_load(self):
+        server_url = load_config().get("server_url")
+        if server_url:
+            # Query a shared V2.server instance instead of building a local index.
+            from .remote_index import RemoteIndex
+            self.tab.load_index(lambda: RemoteIndex(server_url), f"Connecting to {server_url}…")
+            return
+        root_dirs = self.root_dirs
+        self.tab.load_index(lambda: open_index(root_dirs))
+
+    def on_index_ready(self, index):
+        self.index = index
+
 def main():
     app = QApplication(sys.argv)
     win = MainWindow()
     win.show()
+    # Load the index once the event loop is running so the window paints first.
+    QTimer.singleShot(0, win.start_index_load)
     sys.exit(app.exec())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
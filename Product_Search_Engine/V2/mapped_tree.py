@@ -0,0 +1,162 @@
+"""
+Read-only tree cache designed for mmap.
+
+A FolderIndex whose cache file ends in MAPPED_CACHE_EXT saves its tree in this
+format instead of JSON. Opening it only maps the file and reads the header;
+nodes and file names are decoded from the mapping when a search first touches
+them, so several processes (app windows, the server, batch_resolve) opening
+the same file share its pages through the OS page cache.
+
+Layout (little-endian):
+  header      MAGIC, version, node/file/string counts, section offsets, dir hash
+  nodes       fixed-width records, breadth-first so every node's children are
+              contiguous: (path, name, first_child, n_children, first_file, n_files)
+  files       one string id per file name, contiguous per node
+  str offsets string_count + 1 uint64 offsets into the string pool
+  str pool    UTF-8 bytes of every distinct string
+
+Files are written to a temporary name and renamed over the old one, so a
+process still mapping the old file keeps a consistent view.
+"""
+import mmap
+import struct
+from typing import Dict, List, Optional, Tuple
+
+from . import fsio
+from .tree_nodes import META_KEYS, TreeNode
+
+MAGIC = b"NATIDX01"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIIIQQQQ32s")
+_NODE = struct.Struct("<IIIIII")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+
+def _encode(s: str) -> bytes:
+    # os.scandir can return undecodable names as surrogate escapes; keep them round-trippable.
+    return s.encode("utf-8", "surrogatepass")
+
+
+def write_mapped_tree(path: str, tree: Dict, dir_hash: Optional[str]):
+    """Write tree (FolderIndex dict nodes) to path via a temporary file and an atomic rename."""
+    string_ids: Dict[str, int] = {}
+    strings: List[bytes] = []
+
+    def sid(s: str) -> int:
+        i = string_ids.get(s)
+        if i is None:
+            i = string_ids[s] = len(strings)
+            strings.append(_encode(s))
+        return i
+
+    nodes: List[Tuple[Dict, str]] = [(tree, "")]
+    records = bytearray()
+    file_ids = bytearray()
+    n_files = 0
+    i = 0
+    while i < len(nodes):
+        node, name = nodes[i]
+        children = [(v, k) for k, v in node.items() if k not in META_KEYS]
+        files = node.get("_files") or []
+        records += _NODE.pack(sid(node.get("_path", "")), sid(name), len(nodes), len(children), n_files, len(files))
+        for fn in files:
+            file_ids += _U32.pack(sid(fn))
+        n_files += len(files)
+        nodes.extend(children)
+        i += 1
+
+    offsets = bytearray()
+    pos = 0
+    for b in strings:
+        offsets += _U64.pack(pos)
+        pos += len(b)
+    offsets += _U64.pack(pos)
+
+    nodes_off = _HEADER.size
+    files_off = nodes_off + len(records)
+    str_offsets_off = files_off + len(file_ids)
+    str_pool_off = str_offsets_off + len(offsets)
+    header = _HEADER.pack(MAGIC, VERSION, len(nodes), n_files, len(strings),
+                          nodes_off, files_off, str_offsets_off, str_pool_off,
+                          (dir_hash or "").encode("ascii", "ignore")[:32])
+    with fsio.atomic_write(path, "wb") as f:
+        f.write(header)
+        f.write(records)
+        f.write(file_ids)
+        f.write(offsets)
+        for b in strings:
+            f.write(b)
+
+
+class MappedTree:
+    """An mmapped tree cache; root is a MappedNode usable wherever a dict tree node is."""
+    def __init__(self, path: str):
+        with fsio.open_file(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, self.node_count, self.file_count, self.string_count,
+             self._nodes_off, self._files_off, self._str_offsets_off, self._str_pool_off,
+             dir_hash) = _HEADER.unpack_from(self._mm, 0)
+        except struct.error:
+            self._mm.close()
+            raise ValueError(f"{path}: truncated index file")
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path}: not a version {VERSION} mapped index")
+        self.hash = dir_hash.rstrip(b"\0").decode("ascii") or None
+        self.root = MappedNode(self, 0)
+
+    def string(self, i: int) -> str:
+        start, end = struct.unpack_from("<QQ", self._mm, self._str_offsets_off + 8 * i)
+        pool = self._str_pool_off
+        return self._mm[pool + start:pool + end].decode("utf-8", "surrogatepass")
+
+    def record(self, i: int) -> Tuple[int, int, int, int, int, int]:
+        return _NODE.unpack_from(self._mm, self._nodes_off + _NODE.size * i)
+
+    def file_names(self, first: int, count: int) -> List[str]:
+        ids = struct.unpack_from(f"<{count}I", self._mm, self._files_off + 4 * first)
+        return [self.string(i) for i in ids]
+
+    def close(self):
+        self._mm.close()
+
+
+class MappedNode(TreeNode):
+    """
+    Node of a MappedTree (child names in build order). Child nodes and file
+    names are decoded on first access and kept, so node identity is stable.
+    """
+    __slots__ = ("_tree", "_record", "_path", "_files", "_children")
+
+    def __init__(self, tree: MappedTree, index: int):
+        self._tree = tree
+        self._record = tree.record(index)
+        self._path: Optional[str] = None
+        self._files: Optional[List[str]] = None
+        self._children: Optional[Dict[str, "MappedNode"]] = None
+
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            self._path = self._tree.string(self._record[0])
+        return self._path
+
+    @property
+    def files(self) -> List[str]:
+        if self._files is None:
+            self._files = self._tree.file_names(self._record[4], self._record[5])
+        return self._files
+
+    @property
+    def children(self) -> Dict[str, "MappedNode"]:
+        if self._children is None:
+            tree, first, count = self._tree, self._record[2], self._record[3]
+            kids = (MappedNode(tree, first + k) for k in range(count))
+            self._children = {tree.string(kid._record[1]): kid for kid in kids}
+        return self._children
+
+    @property
+    def file_count(self) -> int:
+        return self._record[5]
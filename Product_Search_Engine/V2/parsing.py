@@ -1,9 +1,33 @@
 import re
-from .constants import MATERIAL_MAP, COLOR_MAP, DESIGN_CATEGORIES, DESIGN_CODES_LOWER, SUPPLIER_CODES_LOWER
+from functools import lru_cache
+from types import MappingProxyType
+from .constants import (
+    MATERIAL_MAP, COLOR_MAP, DESIGN_CATEGORIES, DESIGN_CODES_LOWER, SUPPLIER_CODES_LOWER,
+    PARSE_CACHE_SIZE, SELECTION_CACHE_SIZE
+)
+
+# Lookup tables derived once from constants (frozen so callers cannot mutate them).
+MATERIAL_CODES = frozenset(v.lower() for v in MATERIAL_MAP.values())
+COLOR_CODES = frozenset(v.lower() for v in COLOR_MAP.values())
+MATERIAL_LABEL_TO_CODE = MappingProxyType({k.lower(): v.lower() for k, v in MATERIAL_MAP.items()})
+COLOR_LABEL_TO_CODE = MappingProxyType({k.lower(): v.lower() for k, v in COLOR_MAP.items()})
+DESIGN_LABEL_TO_CODE = MappingProxyType({
+    label.lower(): code.lower()
+    for mapping in DESIGN_CATEGORIES.values()
+    for label, code in mapping.items()
+})
+
+_NON_ALNUM_RUN = re.compile(r'[^0-9a-z]+')
+_NON_ALNUM = re.compile(r'[^a-z0-9]')
+_NON_DIGIT = re.compile(r'[^0-9]')
+_NON_DIGITS_RUN = re.compile(r'[^0-9]+')
+_CODE_TOKEN = re.compile(r'[0-9A-Za-z"]+')
+_UNDERSCORE_RUN = re.compile(r'__+')
+_SIZE_SUFFIX = re.compile(r'(?:_)?[fl]$')
+_ASCII_DIGITS = "0123456789"
 
 def normalize_token(s):
-    import re
-    return re.sub(r'[^0-9a-z]+', '_', (s or "").lower()).strip('_')
+    return _NON_ALNUM_RUN.sub('_', (s or "").lower()).strip('_')
 
 def make_searchable(name):
     return normalize_token(name)
@@ -13,7 +37,7 @@ def normalize_size_token(s):
         return s
     x = s.replace('"', '_').replace('.', '_').replace(' ', '_')
     x = x.replace('’', '_').replace('‘', '_').replace('“', '_').replace('”', '_').replace("'", "_")
-    x = re.sub(r'__+', '_', x)
+    x = _UNDERSCORE_RUN.sub('_', x)
     return x.lower()
 
 def generate_size_variants(sz):
@@ -21,41 +45,58 @@ def generate_size_variants(sz):
         return set()
     base = normalize_size_token(sz)
     variants = set([base, base.replace('_', '')])
-    base_no_suffix = re.sub(r'(?:_)?[fl]$', '', base)
-    variants.update([base_no_suffix, base_no_suffix.replace('_', ''), base.replace('_', '"'), re.sub(r'[^0-9]', '', base)])
+    base_no_suffix = _SIZE_SUFFIX.sub('', base)
+    variants.update([base_no_suffix, base_no_suffix.replace('_', ''), base.replace('_', '"'), _NON_DIGIT.sub('', base)])
     return {v for v in variants if v}
 
+# Token kinds assigned by lex_product_code
+TK_WORD = "word"
+TK_NUMBER = "number"              # 450
+TK_MRP = "mrp"                    # MRP (a following number is its price)
+TK_MRP_PRICE = "mrp_price"        # MRP450
+TK_FEET = "feet"                  # 9F
+TK_INCHES = "inches"              # 12"
+TK_INCHES_REST = "inches_rest"    # 12"9 / 12"9F (inches glued to the height)
+TK_LINES = "lines"                # 14L (design)
+
+def _classify(tl: str) -> tuple[str, int]:
+    """Kind of a lowercase token and the length of its leading digit run."""
+    n = len(tl)
+    nd = n - len(tl.lstrip(_ASCII_DIGITS))
+    if nd:
+        if nd == n:
+            return TK_NUMBER, nd
+        c = tl[nd]
+        if c == '"':
+            return (TK_INCHES if nd + 1 == n else TK_INCHES_REST), nd
+        if nd + 1 == n:
+            if c == "f":
+                return TK_FEET, nd
+            if c == "l":
+                return TK_LINES, nd
+        return TK_WORD, nd
+    if tl.startswith("mrp"):
+        if n == 3:
+            return TK_MRP, 0
+        if tl[3:].isdigit():
+            return TK_MRP_PRICE, 0
+    return TK_WORD, 0
+
+def lex_product_code(code: str) -> list[tuple[str, str, str, int]]:
+    """
+    Split a code into tokens (runs of ASCII letters, digits and '"') and classify
+    each one in the same scan. Returns [(kind, token, token_lower, leading_digits)].
+    """
+    out = []
+    for m in _CODE_TOKEN.finditer(code or ""):
+        t = m.group()
+        tl = t.lower()
+        kind, nd = _classify(tl)
+        out.append((kind, t, tl, nd))
+    return out
+
 def normalize_input(code):
-    s = re.sub(r'[^0-9A-Za-z_"]+', '_', (code or ""))
-    s = re.sub(r'__+', '_', s)
-    return [t for t in s.split('_') if t]
-
-def is_mrp_token(t: str) -> bool:
-    tl = (t or "").lower()
-    if tl == "mrp":
-        return True
-    if re.fullmatch(r'mrp\d+', tl):
-        return True
-    return False
-
-def is_design_token(t: str) -> bool:
-    tl = (t or "").lower()
-    if tl in DESIGN_CODES_LOWER:
-        return True
-    if re.fullmatch(r'\d+l', tl):
-        return True
-    return False
-
-def is_height_feet_token(t: str) -> bool:
-    return bool(re.fullmatch(r'\d+(?:\.\d+)?f', (t or '').lower()))
-
-def inches_fragment(s: str) -> str | None:
-    m = re.match(r'^(\d+)"', (s or ''))
-    return m.group(1) + '"' if m else None
-
-def leftover_after_inches(s: str) -> str:
-    m = re.match(r'^\d+"(.*)$', (s or ''))
-    return m.group(1) if m else ''
+    return _CODE_TOKEN.findall(code or "")
 
 def normalize_height_token(h: str) -> str:
     return normalize_size_token(h)
@@ -64,7 +105,7 @@ def normalize_inches_token(w: str) -> str:
     return normalize_size_token(w)
 
 def normalize_alnum_only(s: str) -> str:
-    return re.sub(r'[^a-z0-9]', '', (s or '').lower())
+    return _NON_ALNUM.sub('', (s or '').lower())
 
 def extract_series_signatures(code: str):
     sig = normalize_alnum_only(code)
@@ -77,14 +118,31 @@ def extract_series_signatures(code: str):
     return out
 
 def path_contains_any_signature(rel_path: str, signatures: set) -> bool:
-    p = normalize_alnum_only(rel_path)
-    return any(sig in p for sig in signatures if sig)
+    return contains_any_signature(normalize_alnum_only(rel_path), signatures)
+
+def contains_any_signature(alnum_path: str, signatures: set) -> bool:
+    return any(sig in alnum_path for sig in signatures if sig)
 
 def parse_product_code(code: str):
-    tokens = normalize_input(code)
+    """
+    Parse a product code into its parts. Memoized: repeated codes (batch files,
+    re-searches) return a fresh copy of the cached parse.
+    """
+    return _thaw(_parse_product_code_cached(code or ""))
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_product_code_cached(code: str):
+    return _freeze(_parse_product_code(code))
 
-    material_codes = [v.lower() for v in MATERIAL_MAP.values()]
-    color_codes = [v.lower() for v in COLOR_MAP.values()]
+def _freeze(d: dict) -> tuple:
+    return tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in d.items())
+
+def _thaw(items: tuple) -> dict:
+    return {k: list(v) if isinstance(v, tuple) else v for k, v in items}
+
+def _parse_product_code(code: str):
+    lexed = lex_product_code(code)
+    tokens = [t for _, t, _, _ in lexed]
 
     prefix = []
     material = []
@@ -95,19 +153,20 @@ def parse_product_code(code: str):
     size = []
 
     found_material = False
+    n = len(lexed)
     i = 0
-    while i < len(tokens):
-        t = tokens[i]
-        tl = t.lower()
+    while i < n:
+        kind, t, tl, nd = lexed[i]
 
-        if is_mrp_token(tl):
-            if tl == "mrp" and i + 1 < len(tokens) and re.fullmatch(r'\d+', tokens[i + 1].lower()):
+        if kind == TK_MRP or kind == TK_MRP_PRICE:
+            # "MRP 450": the price belongs to the MRP marker
+            if kind == TK_MRP and i + 1 < n and lexed[i + 1][0] == TK_NUMBER:
                 i += 2
                 continue
             i += 1
             continue
 
-        if not found_material and tl in material_codes:
+        if tl in MATERIAL_CODES:
             found_material = True
             material.append(tl)
             i += 1
@@ -116,43 +175,34 @@ def parse_product_code(code: str):
             prefix.append(t)
             i += 1
             continue
-
-        if tl in material_codes:
-            material.append(tl)
-            i += 1
-            continue
-        if tl in color_codes:
+        if tl in COLOR_CODES:
             color.append(tl)
             i += 1
             continue
 
-        if is_height_feet_token(tl):
-            size.append(normalize_height_token(t))
+        if kind == TK_FEET:
+            size.append(tl)
             i += 1
             continue
-        if re.fullmatch(r'\d+"', t):
-            size.append(normalize_inches_token(t))
+        if kind == TK_INCHES:
+            size.append(tl[:nd] + "_")
             i += 1
             continue
-
-        inc = inches_fragment(t)
-        if inc:
-            size.append(normalize_inches_token(inc))
-            rest = leftover_after_inches(t)
-            next_t = tokens[i + 1].lower() if i + 1 < len(tokens) else ''
-            if rest and is_height_feet_token(next_t):
-                height = f"{rest}.{next_t[:-1]}F" if re.fullmatch(r'\d+', rest) else next_t.upper()
-                size.append(normalize_height_token(height))
+        if kind == TK_INCHES_REST:
+            size.append(tl[:nd] + "_")
+            rest = tl[nd + 1:]
+            if i + 1 < n and lexed[i + 1][0] == TK_FEET:
+                # 12"9 + 5F -> 9.5F; otherwise the next token is the height as-is
+                next_tl = lexed[i + 1][2]
+                size.append(f"{rest}_{next_tl[:-1]}f" if rest.isdigit() else next_tl)
                 i += 2
                 continue
-            if rest and rest.lower().endswith('f') and is_height_feet_token(rest.lower()):
-                size.append(normalize_height_token(rest))
-                i += 1
-                continue
+            if _classify(rest)[0] == TK_FEET:
+                size.append(rest)
             i += 1
             continue
 
-        if is_design_token(t):
+        if kind == TK_LINES or tl in DESIGN_CODES_LOWER:
             i += 1
             continue
 
@@ -181,6 +231,10 @@ def parse_product_code(code: str):
         "tokens": tokens
     }
 
+# build_selection() keyword arguments, as accepted from raw questionnaire dicts (server, replay corpus).
+SELECTION_FIELDS = ("material", "height", "width_inches", "color", "designs",
+                    "supplier", "folder_code", "file_token")
+
 def build_selection(material: str | None,
                     height: str | None,
                     width_inches: str | None,
@@ -191,6 +245,27 @@ def build_selection(material: str | None,
                     file_token: str | None = None) -> dict:
     """
     Build a normalized selection dict that mirrors the structure used by parse_product_code output,
+    but based on UI questionnaire inputs. Memoized on the (hashable) inputs; see _build_selection.
+    """
+    return _thaw(_build_selection_cached(material, height, width_inches, color,
+                                         tuple(designs) if designs else None,
+                                         supplier, folder_code, file_token))
+
+@lru_cache(maxsize=SELECTION_CACHE_SIZE)
+def _build_selection_cached(material, height, width_inches, color, designs, supplier, folder_code, file_token):
+    return _freeze(_build_selection(material, height, width_inches, color, designs,
+                                    supplier, folder_code, file_token))
+
+def _build_selection(material: str | None,
+                     height: str | None,
+                     width_inches: str | None,
+                     color: str | None,
+                     designs: list[str] | None,
+                     supplier: str | None = None,
+                     folder_code: str | None = None,
+                     file_token: str | None = None) -> dict:
+    """
+    Build a normalized selection dict that mirrors the structure used by parse_product_code output,
     but based on UI questionnaire inputs. All fields are normalized to downstream expectations.
     - material: label from MATERIAL_MAP keys (e.g. "PVC") or already code ("PV"). We store codes (lowercase).
     - height: values like '8F', '9F', '9.5F' or '' -> normalized via normalize_height_token
@@ -201,28 +276,19 @@ def build_selection(material: str | None,
     - folder_code: optional folder code token (lowercase)
     - file_token: optional additional file token filter (lowercase)
     """
-    # Map material/color labels to codes if they are labels
-    mat_codes = {k.lower(): v.lower() for k, v in MATERIAL_MAP.items()}
-    col_codes = {k.lower(): v.lower() for k, v in COLOR_MAP.items()}
-    # Flatten design maps
-    design_codes = {}
-    for cat, mapping in DESIGN_CATEGORIES.items():
-        for label, code in mapping.items():
-            design_codes[label.lower()] = code.lower()
-
     material_list = []
     if material:
         ml = material.lower()
-        if ml in mat_codes:
-            material_list.append(mat_codes[ml])
+        if ml in MATERIAL_LABEL_TO_CODE:
+            material_list.append(MATERIAL_LABEL_TO_CODE[ml])
         else:
             material_list.append(ml)
 
     color_list = []
     if color:
         cl = color.lower()
-        if cl in col_codes:
-            color_list.append(col_codes[cl])
+        if cl in COLOR_LABEL_TO_CODE:
+            color_list.append(COLOR_LABEL_TO_CODE[cl])
         else:
             color_list.append(cl)
 
@@ -235,7 +301,7 @@ def build_selection(material: str | None,
         w = width_inches.strip()
         if not w.endswith('"'):
             # accept 12 or 12" or 12in formats
-            w = re.sub(r'[^0-9]+', '', w) + '"'
+            w = _NON_DIGITS_RUN.sub('', w) + '"'
         size_list.append(normalize_inches_token(w))
 
     # designs to codes (lowercase)
@@ -244,8 +310,8 @@ def build_selection(material: str | None,
         dl = (d or "").strip().lower()
         if not dl:
             continue
-        if dl in design_codes:
-            design_list.append(design_codes[dl])
+        if dl in DESIGN_LABEL_TO_CODE:
+            design_list.append(DESIGN_LABEL_TO_CODE[dl])
         else:
             # if user typed code directly
             design_list.append(dl)
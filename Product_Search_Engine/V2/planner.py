@@ -0,0 +1,121 @@
+"""
+Query planning for product-code search.
+
+A code search normally narrows by folders: supplier folder -> folder-code
+folder -> auto-descent, then verifies the files under the folder it ends in
+("narrow"). When the code names a supplier or folder code that routing cannot
+find as a folder, narrowing scans a large subtree (often the whole tree) and
+matches files of any supplier. The other plan is a lookup over the file names
+of the whole tree ("global"): names are restricted by the supplier and folder
+code read from each one (attributes.name_codes), and only those files are
+checked on disk and verified with the same tests.
+
+When routing found every folder the code names, the narrow plan is used
+without consulting statistics. Otherwise both plans are estimated as rows to
+verify (files under the narrowed folder vs. file names in the tree with the
+code's supplier and folder code, both counted from the tree without touching
+the disk) and the cheaper one wins; ties, and a global plan with no rows at
+all, go to narrow. When the chosen plan finds nothing the other one is run, if
+it covers different rows.
+"""
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from .attributes import supplier_id
+from .tree_nodes import META_KEYS, TreeNode
+
+if TYPE_CHECKING:
+    import numpy as np
+    from .scoring import FeatureTable
+
+NARROW = "narrow"
+GLOBAL = "global"
+
+
+@dataclass
+class CodePlan:
+    """The plan a code search ran, with its estimated and actual cost in rows verified."""
+    kind: str
+    reason: str
+    estimated_rows: Dict[str, Optional[int]] = field(default_factory=dict)
+    fallback_from: Optional[str] = None
+    candidate_rows: int = 0
+    rows_verified: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "reason": self.reason,
+            "estimated_rows": dict(self.estimated_rows),
+            "fallback_from": self.fallback_from,
+            "candidate_rows": self.candidate_rows,
+            "rows_verified": self.rows_verified,
+        }
+
+
+def describe_plan(plan: Dict[str, Any]) -> str:
+    """One line for debug views from CodePlan.as_dict()."""
+    est = plan.get("estimated_rows") or {}
+    return (f"{plan['kind']} ({plan['reason']}); estimated rows narrow {est.get(NARROW)}, "
+            f"global {est.get(GLOBAL)}; {plan['candidate_rows']} candidates, "
+            f"{plan['rows_verified']} rows verified in total")
+
+
+def subtree_file_count(node: Optional[Mapping]) -> int:
+    """Files in node and its subfolders, from folder listings only (cache-backed nodes don't load file names)."""
+    if not node:
+        return 0
+    total = 0
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        total += n.file_count if isinstance(n, TreeNode) else len(n.get("_files") or [])
+        stack.extend(v for k, v in n.items() if k not in META_KEYS)
+    return total
+
+
+def name_code_filter(supplier: Optional[str], folder_code: Optional[str]) -> Dict[str, int]:
+    """The name-code conditions a global plan can apply: known supplier id and numeric folder code."""
+    out = {}
+    sid = supplier_id(supplier) if supplier else -1
+    if sid >= 0:
+        out["supplier"] = sid
+    if folder_code and folder_code.isdigit() and len(folder_code) <= 6:
+        out["folder_code"] = int(folder_code)
+    return out
+
+
+def global_rows(table: "FeatureTable", conditions: Dict[str, int]) -> "np.ndarray":
+    """Ids of table rows (FolderIndex.name_table) whose file name carries the supplier and folder code in conditions."""
+    import numpy as np
+    supplier, folder_code = table.name_codes
+    keep = np.ones(len(table), dtype=bool)
+    if "supplier" in conditions:
+        keep &= supplier == conditions["supplier"]
+    if "folder_code" in conditions:
+        keep &= folder_code == conditions["folder_code"]
+    return np.flatnonzero(keep)
+
+
+def unresolved_fields(parsed: Dict, route: Dict) -> list:
+    """Fields of the code that routing could not find as a folder."""
+    missing = []
+    if parsed.get("supplier") and not route.get("supplier_node"):
+        missing.append("supplier")
+    if parsed.get("folder_code") and not route.get("folder_code_node"):
+        missing.append("folder_code")
+    return missing
+
+
+def choose_plan(narrow_rows: int, global_estimate: Optional[int], missing: list) -> CodePlan:
+    estimates = {NARROW: narrow_rows, GLOBAL: global_estimate}
+    if not missing:
+        return CodePlan(NARROW, "route resolved every folder the code names", estimates)
+    if global_estimate is None:
+        return CodePlan(NARROW, f"unresolved {', '.join(missing)}, no name code to look up", estimates)
+    if global_estimate == 0:
+        return CodePlan(NARROW, f"unresolved {', '.join(missing)}, no file name carries the code", estimates)
+    if global_estimate < narrow_rows:
+        return CodePlan(GLOBAL, f"unresolved {', '.join(missing)}, name-code lookup is cheaper", estimates)
+    return CodePlan(NARROW, f"unresolved {', '.join(missing)}, narrowed folder is cheaper", estimates)
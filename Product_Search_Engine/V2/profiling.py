@@ -0,0 +1,129 @@
+"""
+On-demand profiling of the next search.
+
+arm() (the "Profile next search" checkbox, or NATURO_PROFILE=<n> for headless
+tools and the server) makes the next n operations run under cProfile and write
+a report to PROFILE_DIR: a text file with the top functions and the call tree,
+plus a .prof file for pstats/snakeviz. While nothing is armed, profile_next()
+only checks a counter. One profile runs at a time (cProfile can't run on two
+threads at once); an operation starting while another is profiled runs
+unprofiled and leaves the armed count for a later one.
+"""
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from .constants import PROFILE_ENV, PROFILE_DIR, PROFILE_TOP_N
+
+_lock = threading.Lock()
+_running = threading.Lock()
+_local = threading.local()
+
+
+def _env_count() -> int:
+    value = os.environ.get(PROFILE_ENV, "").strip()
+    if not value:
+        return 0
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 1
+
+
+_pending = _env_count()
+
+
+def arm(count: int = 1):
+    global _pending
+    with _lock:
+        _pending = count
+
+
+def disarm():
+    arm(0)
+
+
+def is_armed() -> bool:
+    return _pending > 0
+
+
+def active() -> bool:
+    """True while the current thread runs a profiled operation (callers should stay on this thread)."""
+    return getattr(_local, "active", False)
+
+
+def _take() -> bool:
+    global _pending
+    if _pending <= 0:
+        return False
+    with _lock:
+        if _pending <= 0:
+            return False
+        _pending -= 1
+        return True
+
+
+class profile_next:
+    """
+    Context manager that profiles the enclosed block if a profile is armed.
+    After the block, report_path is the text report (None when not profiled).
+    """
+    def __init__(self, operation: str, **fields):
+        self.operation = operation
+        self.fields = fields
+        self.report_path: Optional[str] = None
+        self._prof = None
+
+    def __enter__(self):
+        if _pending > 0 and _running.acquire(blocking=False):
+            if not _take():
+                _running.release()
+                return self
+            import cProfile
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except Exception as e:
+                # e.g. another profiling tool (a debugger) is active
+                _running.release()
+                print("Failed to start profiler:", e)
+                return self
+            self._prof = prof
+            _local.active = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._prof is None:
+            return False
+        self._prof.disable()
+        _local.active = False
+        _running.release()
+        try:
+            self.report_path = write_report(self._prof, self.operation, self.fields)
+        except Exception as e:
+            print("Failed to write profile report:", e)
+        return False
+
+
+def write_report(prof, operation: str, fields: dict, out_dir: str = PROFILE_DIR) -> str:
+    import pstats
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    slug = "".join(ch if ch.isalnum() else "_" for ch in operation)
+    base = os.path.join(out_dir, f"profile_{stamp}_{slug}")
+    prof.dump_stats(base + ".prof")
+
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(f"Operation: {operation}\n")
+        for k, v in fields.items():
+            f.write(f"{k}: {v}\n")
+        f.write(f"Raw profile: {base}.prof\n\n")
+        stats = pstats.Stats(prof, stream=f)
+        f.write(f"== Top {PROFILE_TOP_N} functions by cumulative time ==\n")
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+        f.write(f"== Top {PROFILE_TOP_N} functions by own time ==\n")
+        stats.sort_stats("tottime").print_stats(PROFILE_TOP_N)
+        f.write("== Call tree (callees of the top functions by cumulative time) ==\n")
+        stats.sort_stats("cumulative").print_callees(PROFILE_TOP_N)
+    return base + ".txt"
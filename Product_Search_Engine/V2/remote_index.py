@@ -0,0 +1,77 @@
+import json
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, quote
+from urllib.request import Request, urlopen
+
+from .timing import continue_in_background
+
+
+class RemoteIndex:
+    """
+    Client for V2.server exposing the FolderIndex search methods used by the UI,
+    so SearchTab can query a shared warm index instead of building its own.
+    A budget_ms is applied by the server; on_complete (and on_error) re-run the search without one.
+    """
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        status = self._get_json("/api/health")
+        self.root_dir = status.get("root_dir")
+        self.hash = status.get("hash")
+
+    def _get_json(self, path: str, params: Optional[Dict] = None):
+        url = self.base_url + path + ("?" + urlencode(params) if params else "")
+        with urlopen(url, timeout=self.timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def _post_json(self, path: str, body: Dict):
+        req = Request(self.base_url + path, data=json.dumps(body).encode("utf-8"),
+                      headers={"Content-Type": "application/json"}, method="POST")
+        with urlopen(req, timeout=self.timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def _code_params(self, code: str, limit: Optional[int], budget_ms: Optional[float] = None) -> Dict:
+        params = {"code": code}
+        if limit is not None:
+            params["limit"] = limit
+        if budget_ms is not None:
+            params["budget_ms"] = budget_ms
+        return params
+
+    def search_files(self, code: str, limit: Optional[int] = None, budget_ms: Optional[float] = None) -> List[str]:
+        return self._get_json("/api/search", self._code_params(code, limit, budget_ms))["results"]
+
+    def debug_search_files(self, code: str, max_show: int = 60, limit: Optional[int] = None,
+                           budget_ms: Optional[float] = None, on_complete=None, on_error=None) -> Tuple[Dict, List[str]]:
+        out = self._get_json("/api/search", self._code_params(code, limit, budget_ms))
+        if out["debug"].get("incomplete") and on_complete is not None:
+            continue_in_background(lambda: self.debug_search_files(code, max_show, limit), on_complete, on_error)
+        return out["debug"], out["results"]
+
+    def search_by_selection(self, selection: dict, max_suggestions: int = 200, budget_ms: Optional[float] = None,
+                            on_complete=None, on_error=None):
+        out = self._post_json("/api/search/selection", {"selection": selection, "max_suggestions": max_suggestions,
+                                                        "budget_ms": budget_ms})
+        suggestions = [(p, missing, sc) for p, missing, sc in out["suggestions"]]
+        if out["debug"].get("incomplete") and on_complete is not None:
+            continue_in_background(lambda: self.search_by_selection(selection, max_suggestions), on_complete, on_error)
+        return out["debug"], out["exact"], suggestions
+
+    def facet_counts(self, selection: dict, budget_ms: Optional[float] = None, on_complete=None, on_error=None) -> Dict:
+        out = self._post_json("/api/facets", {"selection": selection, "budget_ms": budget_ms})
+        if out.get("incomplete") and on_complete is not None:
+            continue_in_background(lambda: self.facet_counts(selection), on_complete, on_error)
+        return out
+
+    def complete_code(self, text: str, limit: int = 10) -> List[Tuple[str, int]]:
+        out = self._get_json("/api/complete", {"text": text, "limit": limit})
+        return [(code, n) for code, n in out["completions"]]
+
+    def thumbnail(self, path: str, size: int = 512) -> bytes:
+        url = f"{self.base_url}/api/thumbnail?path={quote(path)}&size={size}"
+        with urlopen(url, timeout=self.timeout) as resp:
+            return resp.read()
+
+    def rebuild(self):
+        status = self._post_json("/api/rebuild", {})
+        self.hash = status.get("hash")
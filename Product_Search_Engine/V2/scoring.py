@@ -0,0 +1,346 @@
+import os
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from .constants import TRIGRAM_MIN_FILES
+from .parsing import normalize_token, make_searchable
+from .trigram import TrigramIndex
+from .attributes import AttributeRecords, HEIGHT_TERMS, term_substrings, name_codes
+
+if TYPE_CHECKING:
+    import numpy as np
+
+CRITERIA = ("material", "color", "size", "design", "file_token")
+CRITERIA_WEIGHTS = {"material": 3, "color": 3, "size": 3, "design": 2, "file_token": 3}
+FACET_FIELDS = ("material", "color", "size", "design")
+CRITERION_MEMO_SIZE = 256
+
+
+def _relative(path: str, base_root: Optional[str]) -> str:
+    if not base_root:
+        return os.path.basename(path)
+    # Candidate paths are joined onto base_root; slicing them gives what relpath would.
+    prefix = base_root if base_root.endswith(os.sep) else base_root + os.sep
+    if path.startswith(prefix):
+        return path[len(prefix):]
+    return os.path.relpath(path, base_root)
+
+
+class FeatureTable:
+    """
+    Column store over the candidate files of one scan root.
+    Every criterion used by compute_match_score reduces to "term is a substring
+    of the searchable relative path", so a column is a boolean array per term,
+    computed once and memoized for the lifetime of the table.
+    NumPy is imported on first use so code search and headless tools that only
+    need the candidate rows don't pay for it.
+    Tables with at least TRIGRAM_MIN_FILES files answer substring lookups from a
+    trigram index over the compact names instead of scanning every row.
+    Questionnaire criteria are answered from per-row attribute records (see
+    attributes.py), built on first use.
+    """
+    def __init__(self, paths: List[str], base_root: Optional[str], searchables: Optional[List[str]] = None):
+        self.paths = paths
+        self.base_root = base_root
+        if searchables is None:
+            searchables = [make_searchable(_relative(p, base_root)) for p in paths]
+        self.searchables = searchables
+        self._columns: Dict[str, "np.ndarray"] = {}
+        self._compacts: Optional[List[str]] = None
+        self._name_rank = None
+        self._trigrams: Optional[TrigramIndex] = None
+        self._text = None
+        self._attributes: Optional[AttributeRecords] = None
+        self._name_codes = None
+        self._criteria: Dict[Tuple[str, Tuple[str, ...]], "np.ndarray"] = {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def take(self, ids: List[int]) -> "FeatureTable":
+        """Table of rows ids (in that order) with the same base root, reusing their searchable forms."""
+        return FeatureTable([self.paths[i] for i in ids], self.base_root, [self.searchables[i] for i in ids])
+
+    @property
+    def compacts(self) -> List[str]:
+        # normalize_alnum_only(rel) is the searchable form with separators dropped.
+        if self._compacts is None:
+            self._compacts = [s.replace("_", "") for s in self.searchables]
+        return self._compacts
+
+    @property
+    def name_rank(self) -> "np.ndarray":
+        # Rank of each file by lowercase basename, used as the ranking tie-break.
+        if self._name_rank is None:
+            import numpy as np
+            order = sorted(range(len(self.paths)), key=lambda i: os.path.basename(self.paths[i]).lower())
+            rank = np.empty(len(self.paths), dtype=np.int64)
+            rank[order] = np.arange(len(self.paths), dtype=np.int64)
+            self._name_rank = rank
+        return self._name_rank
+
+    @property
+    def trigrams(self) -> TrigramIndex:
+        if self._trigrams is None:
+            self._trigrams = TrigramIndex(self.compacts)
+        return self._trigrams
+
+    @property
+    def attributes(self) -> AttributeRecords:
+        if self._attributes is None:
+            self._attributes = AttributeRecords(self)
+        return self._attributes
+
+    @property
+    def name_codes(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(int16 supplier ids, int32 folder codes) read from each row's name; see attributes.name_codes."""
+        if self._name_codes is None:
+            import numpy as np
+            n = len(self.paths)
+            codes = [name_codes(s) for s in self.searchables]
+            self._name_codes = (np.fromiter((s for s, _ in codes), dtype=np.int16, count=n),
+                                np.fromiter((f for _, f in codes), dtype=np.int32, count=n))
+        return self._name_codes
+
+    @property
+    def indexed(self) -> bool:
+        return len(self.paths) >= TRIGRAM_MIN_FILES
+
+    def find(self, term: str) -> Optional[List[int]]:
+        """
+        Ids of rows whose searchable contains term, from the trigram index (None when the
+        table is below TRIGRAM_MIN_FILES or the term is too short to look up).
+        """
+        # term in searchable implies term without "_" in the compact name
+        compact = term.replace("_", "")
+        if not self.indexed or len(compact) < 3:
+            return None
+        ids = self.trigrams.candidates(compact)
+        if ids is None:
+            return None
+        searchables = self.searchables
+        return [i for i in ids.tolist() if term in searchables[i]]
+
+    def find_any(self, terms) -> Optional[List[int]]:
+        found = set()
+        for t in terms:
+            ids = self.find(t)
+            if ids is None:
+                return None
+            found.update(ids)
+        return sorted(found)
+
+    def find_any_compact(self, terms) -> Optional[List[int]]:
+        """Like find_any, against the compact names (series signatures)."""
+        if not self.indexed:
+            return None
+        return self.trigrams.find_any(terms)
+
+    def similar(self, query: str, limit: int = 10, min_similarity: float = 0.5) -> List[Tuple[int, float]]:
+        """Rows ranked by trigram similarity of their compact name to query (any table size)."""
+        return self.trigrams.similar(query, limit=limit, min_similarity=min_similarity)
+
+    def contains(self, term: str) -> "np.ndarray":
+        """Boolean column "term in searchable" (not memoized)."""
+        import numpy as np
+        ids = self.find(term)
+        if ids is None:
+            return self._scan(term)
+        col = np.zeros(len(self.paths), dtype=bool)
+        col[ids] = True
+        return col
+
+    def _scan(self, term: str) -> "np.ndarray":
+        # Searchables are [0-9a-z_], so an ASCII term can be matched on the
+        # newline-joined bytes of all rows at once; hits map back to rows.
+        import numpy as np
+        n = len(self.paths)
+        if not term or "\n" in term or not term.isascii():
+            return np.fromiter((term in s for s in self.searchables), dtype=bool, count=n)
+        if self._text is None:
+            lengths = np.fromiter((len(s) + 1 for s in self.searchables), dtype=np.int64, count=n)
+            buf = np.frombuffer("\n".join(self.searchables).encode("ascii"), dtype=np.uint8)
+            self._text = (buf, np.repeat(np.arange(n, dtype=np.int32), lengths)[:len(buf)])
+        buf, row_of = self._text
+        pattern = np.frombuffer(term.encode("ascii"), dtype=np.uint8)
+        m = len(buf) - len(pattern) + 1
+        col = np.zeros(n, dtype=bool)
+        if m > 0:
+            hit = buf[:m] == pattern[0]
+            for j in range(1, len(pattern)):
+                hit &= buf[j:j + m] == pattern[j]
+            col[row_of[:m][hit]] = True
+        return col
+
+    def contains_any(self, terms) -> "np.ndarray":
+        import numpy as np
+        out = np.zeros(len(self.paths), dtype=bool)
+        for t in terms:
+            out |= self.contains(t)
+        return out
+
+    def has(self, term: str) -> "np.ndarray":
+        """Memoized contains()."""
+        col = self._columns.get(term)
+        if col is None:
+            col = self.contains(term)
+            self._columns[term] = col
+        return col
+
+    def has_any(self, terms) -> "np.ndarray":
+        import numpy as np
+        out = np.zeros(len(self.paths), dtype=bool)
+        for t in terms:
+            out |= self.has(t)
+        return out
+
+    def criterion(self, field: str, terms: List[str]) -> "np.ndarray":
+        """
+        Rows where at least one of terms satisfies field: a bitmask test on the
+        attribute records for vocabulary terms, substring columns for the rest.
+        Memoized per (field, terms), so changing one questionnaire field only
+        recomputes that field's column.
+        """
+        import numpy as np
+        key = (field, tuple(terms))
+        col = self._criteria.get(key)
+        if col is None:
+            bits, extra = self.attributes.mask(field, terms)
+            col = self.attributes.satisfies(field, bits) if bits else np.zeros(len(self.paths), dtype=bool)
+            substrings = set()
+            for t in extra:
+                substrings.update(term_substrings(field, t))
+            if substrings:
+                col = col | self.has_any(sorted(substrings))
+            if len(self._criteria) >= CRITERION_MEMO_SIZE:
+                self._criteria.clear()
+            self._criteria[key] = col
+        return col
+
+
+def criteria_columns(table: FeatureTable,
+                     material_codes: List[str],
+                     color_codes: List[str],
+                     size_tokens: List[str],
+                     design_codes: List[str],
+                     file_token: Optional[str]) -> Dict[str, "np.ndarray"]:
+    """Boolean "criterion satisfied" column for every criterion that was provided."""
+    import numpy as np
+    provided = {
+        "material": [normalize_token(m) for m in material_codes] if material_codes else None,
+        "color": [normalize_token(c) for c in color_codes] if color_codes else None,
+        "size": list(size_tokens) if size_tokens else None,
+        "design": [d for d in (normalize_token(dc) for dc in design_codes) if d] if design_codes else None,
+    }
+    cols = {field: table.criterion(field, terms) for field, terms in provided.items() if terms is not None}
+    if file_token:
+        ft_norm = make_searchable(file_token)
+        cols["file_token"] = table.has(ft_norm) if ft_norm else np.ones(len(table), dtype=bool)
+    return cols
+
+
+def score_table(table: FeatureTable,
+                material_codes: List[str],
+                color_codes: List[str],
+                size_tokens: List[str],
+                design_codes: List[str],
+                file_token: Optional[str],
+                max_suggestions: Optional[int] = 200,
+                timer=None,
+                exists=None) -> Tuple[List[str], List[Tuple[str, List[str], int]]]:
+    """
+    Vectorized equivalent of running compute_match_score over every file in the table.
+    Returns (exact_matches, suggestions) with suggestions ranked by score desc, then
+    by filename asc. An optional StageTimer records "matching" and "ranking".
+    exists (path -> bool), if given, is asked about every returned path only; rows
+    it rejects are left out and the next best suggestions take their place.
+    """
+    import numpy as np
+    with _stage(timer, "matching"):
+        n = len(table)
+        cols = criteria_columns(table, material_codes, color_codes, size_tokens, design_codes, file_token)
+        scores = np.zeros(n, dtype=np.int64)
+        exact = np.ones(n, dtype=bool)
+        for name, ok in cols.items():
+            scores += CRITERIA_WEIGHTS[name] * ok
+            exact &= ok
+
+    with _stage(timer, "ranking"):
+        exact_idx = np.flatnonzero(exact)
+        pool = np.flatnonzero(~exact & (scores > 0))
+        sugg_idx = top_k(pool, scores, table.name_rank, max_suggestions)
+        if exists is not None:
+            exact_idx = exact_idx[np.fromiter((exists(table.paths[i]) for i in exact_idx), dtype=bool,
+                                              count=len(exact_idx))]
+            kept = set()
+            while True:
+                gone = [i for i in sugg_idx if i not in kept and not exists(table.paths[i])]
+                kept.update(i for i in sugg_idx if i not in gone)
+                if not gone:
+                    break
+                pool = np.setdiff1d(pool, gone)
+                sugg_idx = top_k(pool, scores, table.name_rank, max_suggestions)
+
+        exact_matches = [table.paths[i] for i in exact_idx]
+        suggestions = []
+        for i in sugg_idx:
+            missing = [name for name in CRITERIA if name in cols and not cols[name][i]]
+            suggestions.append((table.paths[i], missing, int(scores[i])))
+    return exact_matches, suggestions
+
+
+def facet_counts(table: FeatureTable,
+                 material_codes: List[str],
+                 color_codes: List[str],
+                 size_tokens: List[str],
+                 design_codes: List[str],
+                 file_token: Optional[str]) -> Dict[str, Dict[str, int]]:
+    """
+    For every FACET_FIELDS option (attribute vocabulary term), the number of
+    exact matches if that option were chosen for its field with the other
+    fields unchanged. A design option counts as if it were the only design
+    selected; a size option replaces the selected height and keeps the width.
+    "matches" is the exact-match count of the selection itself.
+    """
+    import numpy as np
+    cols = criteria_columns(table, material_codes, color_codes, size_tokens, design_codes, file_token)
+    widths = [t for t in size_tokens or () if t not in HEIGHT_TERMS]
+    out = {}
+    for field in FACET_FIELDS:
+        rows = np.ones(len(table), dtype=bool)
+        for name, ok in cols.items():
+            if name != field:
+                rows &= ok
+        if field == "size" and widths:
+            # The size criterion is "any size token", so rows with the width match whatever the height.
+            with_width = rows & table.criterion("size", widths)
+            n = int(np.count_nonzero(with_width))
+            counts = table.attributes.field_counts(field, rows & ~with_width)
+            out[field] = {t: c + n for t, c in counts.items()}
+        else:
+            out[field] = table.attributes.field_counts(field, rows)
+    exact = np.ones(len(table), dtype=bool)
+    for ok in cols.values():
+        exact &= ok
+    out["matches"] = int(np.count_nonzero(exact))
+    return out
+
+
+def top_k(idx: "np.ndarray", scores: "np.ndarray", name_rank: "np.ndarray", k: Optional[int]) -> "np.ndarray":
+    """
+    The k best of idx by score desc, then filename asc, in ranked order.
+    name_rank is a permutation (filename order, ties in table order), so the
+    packed key below is unique and the ranking fully deterministic. Selection is
+    an O(n) partition; only the k survivors are sorted.
+    """
+    import numpy as np
+    if k is not None and k <= 0:
+        return idx[:0]
+    key = -scores[idx] * (len(name_rank) + 1) + name_rank[idx]
+    if k is not None and k < len(idx):
+        part = np.argpartition(key, k - 1)[:k]
+        idx, key = idx[part], key[part]
+    return idx[np.argsort(key, kind="stable")]
+
+
+def _stage(timer, name):
+    return timer.stage(name) if timer is not None else nullcontext()
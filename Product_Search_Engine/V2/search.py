@@ -0,0 +1,80 @@
+"""
+Qt-free command line search.
+
+Usage:
+  python -m V2.search "<product code>" [--root DIR] [--no-validate] [--debug] [--json] [--limit N]
+                  [--budget-ms MS]
+
+Only FolderIndex, parsing and matching are imported, so start-up cost is the
+Python interpreter plus the cache load. --no-validate trusts an existing cache
+instead of walking the whole drive to confirm its hash. NATURO_PROFILE=1 writes a
+profiler report for the search to naturo_profiles/.
+"""
+import argparse
+import json
+import sys
+from time import perf_counter
+
+from .cli import add_index_arguments, root_dirs_or_exit
+from .sharded_index import open_index
+from .planner import describe_plan
+from .profiling import profile_next
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m V2.search", description="Find files for a product code.")
+    ap.add_argument("code", help="full or partial product code")
+    add_index_arguments(ap)
+    ap.add_argument("--no-validate", action="store_true", help="use the cache without re-hashing the catalog")
+    ap.add_argument("--debug", action="store_true", help="print folder resolution details")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    ap.add_argument("--limit", type=int, help="stop after this many matches")
+    ap.add_argument("--budget-ms", type=float, help="return the matches found after this many milliseconds")
+    args = ap.parse_args(argv)
+
+    root_dirs = root_dirs_or_exit(ap, args)
+
+    t0 = perf_counter()
+    index = open_index(root_dirs, cache_file=args.cache, validate_cache=not args.no_validate)
+    t1 = perf_counter()
+    with profile_next("search_code", code=args.code) as prof:
+        dbg, results = index.debug_search_files(args.code, limit=args.limit, budget_ms=args.budget_ms)
+    t2 = perf_counter()
+    if prof.report_path:
+        print(f"Profile written to {prof.report_path}", file=sys.stderr)
+
+    if args.json:
+        out = {"code": args.code, "results": results,
+               "load_ms": round((t1 - t0) * 1000.0, 2), "search_ms": round((t2 - t1) * 1000.0, 2)}
+        if not results:
+            out["did_you_mean"] = dbg.get("did_you_mean", [])
+        if args.debug:
+            out["debug"] = dbg
+        print(json.dumps(out, indent=2))
+        return 0 if results else 1
+
+    if args.debug:
+        print(f"Supplier-folder found: {dbg.get('supplier_folder_found')}")
+        print(f"Folder-code folder found: {dbg.get('folder_code_folder_found')}")
+        print(f"Auto-descent final root: {dbg.get('autodescent_final_root')}")
+        print(f"Auto-descent stop reason: {dbg.get('autodescent_stop_reason')}")
+        print(f"Candidate files scanned: {dbg.get('candidate_count')}")
+        if dbg.get("plan"):
+            print(f"Query plan: {describe_plan(dbg['plan'])}")
+        print()
+    for p in results:
+        print(p)
+    if not results and dbg.get("did_you_mean"):
+        print("Did you mean:", file=sys.stderr)
+        for p, sim in dbg["did_you_mean"]:
+            print(f"  {p}  ({sim:.0%})", file=sys.stderr)
+    more = " (limit reached)" if dbg.get("truncated") else ""
+    if dbg.get("incomplete"):
+        more += f" (budget ran out during {dbg.get('stopped_at')})"
+    print(f"{len(results)} match(es){more}; load {(t1 - t0) * 1000.0:.0f} ms, search {(t2 - t1) * 1000.0:.0f} ms",
+          file=sys.stderr)
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,363 @@
+"""
+Local HTTP/JSON search service that keeps one FolderIndex warm for every client.
+
+Usage:
+  python -m V2.server [--host 127.0.0.1] [--port 8765] [--root DIR ...] [--watch SECONDS]
+
+Endpoints:
+  GET  /                         browser search page (V2/web/index.html)
+  GET  /api/health               index status
+  GET  /api/search?code=...      code search (search_files semantics, with debug info);
+                                 &limit=N stops after the first N matches;
+                                 &budget_ms=T returns what was found after T ms, with
+                                 "incomplete" and "stopped_at" in the debug info
+  POST /api/search/selection     questionnaire search; JSON body is either
+                                 {"selection": <build_selection() dict>} or the raw
+                                 questionnaire fields accepted by build_selection(),
+                                 optionally with "budget_ms" (also for /api/facets)
+  POST /api/facets               questionnaire facet counts (same body as above):
+                                 per option, the exact matches if it were chosen
+                                 ("labels" keys them by questionnaire option)
+  GET  /api/vocab                questionnaire option labels (materials, heights, colors,
+                                 designs by category) for the browser page
+  GET  /api/complete?text=...    completions of a partly typed code as [code, names]
+                                 pairs, most common first; &limit=N (default 10)
+  GET  /api/thumbnail?path=...   JPEG thumbnail of a file under a catalog root
+  POST /api/rebuild[?root=DIR]   force a rebuild of every shard, or of one root
+
+Requests are served by a ThreadingHTTPServer. Each catalog root is a shard of a
+ShardedIndex; a rebuild publishes a new generation of the shard, so in-flight
+requests keep using the generation they started with.
+Bind to 0.0.0.0 (or the LAN address) to share one service between workstations;
+nothing is contacted outside the local network.
+"""
+import argparse
+import io
+import json
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter, time
+from urllib.parse import urlparse, parse_qs
+
+from .cli import add_index_arguments, root_dirs_or_exit
+from .constants import TREE_CACHE_FILE, MATERIAL_MAP, COLOR_MAP, DESIGN_CATEGORIES, HEIGHT_OPTIONS
+from .sharded_index import ShardedIndex
+from .parsing import SELECTION_FIELDS, build_selection
+from .attributes import label_counts
+from .timing import StageTimer, log_timing
+from .profiling import profile_next
+from .fsio import io_accounting
+from . import fsio
+
+DEFAULT_PORT = 8765
+WEB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "web")
+THUMB_CACHE_SIZE = 512
+
+
+class BadRequest(ValueError):
+    """A request parameter that can't be used; answered with 400."""
+
+
+def parse_number(name, value, kind, minimum=None):
+    """A query-string or JSON parameter as kind (int or float), None if absent; BadRequest if unusable."""
+    if value is None or value == "":
+        return None
+    try:
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValueError(value)
+        number = kind(value)
+    except ValueError:
+        raise BadRequest(f"'{name}' must be {'an integer' if kind is int else 'a number'}") from None
+    if not math.isfinite(number):
+        raise BadRequest(f"'{name}' must be finite")
+    if minimum is not None and number < minimum:
+        raise BadRequest(f"'{name}' must be at least {minimum}")
+    return number
+
+
+class SearchService:
+    """Owns the warm index, the change watcher and the thumbnail cache."""
+    def __init__(self, root_dirs, cache_file=TREE_CACHE_FILE, watch_interval=60.0):
+        self.root_dirs = [root_dirs] if isinstance(root_dirs, str) else list(root_dirs)
+        self.cache_file = cache_file
+        self.watch_interval = watch_interval
+        self.index = ShardedIndex(self.root_dirs, cache_file=cache_file)
+        self.loaded_at = time()
+        self._rebuild_lock = threading.Lock()
+        self._thumbs = OrderedDict()
+        self._thumbs_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        # Subtrees that triggered the last watcher rebuild, per root
+        self.last_changes = {}
+
+    def start_watcher(self):
+        if self.watch_interval and self.watch_interval > 0:
+            self._watcher = threading.Thread(target=self._watch, name="index-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval):
+            for root in self.root_dirs:
+                try:
+                    if self.rebuild(root):
+                        self.last_changes[root] = self.index.shards[root].last_changes
+                except Exception as e:
+                    print(f"Index watcher error for {root}:", e)
+
+    def rebuild(self, root_dir=None, force=False):
+        """
+        New generations of the shards of root_dir (or every root): rebuilt with force,
+        otherwise only where the catalog changed. True if any was published.
+        """
+        with self._rebuild_lock:
+            # Shards are rebuilt one at a time on this thread; the shard pool keeps serving searches.
+            changed = False
+            for root in ([root_dir] if root_dir else self.root_dirs):
+                changed |= self.index.rebuild_shard(root, force=force)
+            if changed:
+                self.loaded_at = time()
+                with self._thumbs_lock:
+                    self._thumbs.clear()
+        return changed
+
+    def health(self):
+        index = self.index
+        return {
+            "root_dir": self.root_dirs[0],
+            "root_dirs": self.root_dirs,
+            "hash": index.hash,
+            "shard_hashes": {root: shard.hash for root, shard in index.shards.items()},
+            "shard_generations": {root: shard.generation.number for root, shard in index.shards.items()},
+            "ready": index.tree is not None,
+            "loaded_at": self.loaded_at,
+            "changed_dirs": self.last_changes,
+        }
+
+    def search_code(self, code, limit=None, budget_ms=None):
+        with profile_next("search_code", code=code) as prof:
+            dbg, results = self.index.debug_search_files(code, limit=limit, budget_ms=budget_ms)
+        if prof.report_path:
+            dbg["profile_report"] = prof.report_path
+        return {"code": code, "results": results, "debug": dbg}
+
+    @staticmethod
+    def _selection(body):
+        selection = body.get("selection")
+        if selection is None:
+            selection = build_selection(**{k: body.get(k) for k in SELECTION_FIELDS})
+        return selection
+
+    def search_selection(self, body, max_suggestions=200):
+        selection = self._selection(body)
+        budget_ms = parse_number("budget_ms", body.get("budget_ms"), float, 0)
+        with profile_next("search_by_selection", selection=selection) as prof:
+            dbg, exact, suggestions = self.index.search_by_selection(selection, max_suggestions=max_suggestions,
+                                                                     budget_ms=budget_ms)
+        if prof.report_path:
+            dbg["profile_report"] = prof.report_path
+        return {"exact": exact, "suggestions": suggestions, "debug": dbg}
+
+    @staticmethod
+    def vocabulary():
+        """Questionnaire option labels, as the desktop UI lists them."""
+        return {
+            "materials": list(MATERIAL_MAP),
+            "heights": list(HEIGHT_OPTIONS),
+            "colors": list(COLOR_MAP),
+            "designs": {cat: list(designs) for cat, designs in DESIGN_CATEGORIES.items()},
+        }
+
+    def complete_code(self, text, limit=10):
+        return {"text": text, "completions": self.index.complete_code(text, limit)}
+
+    def facet_counts(self, body):
+        counts = self.index.facet_counts(self._selection(body),
+                                         budget_ms=parse_number("budget_ms", body.get("budget_ms"), float, 0))
+        counts["labels"] = label_counts(counts)
+        return counts
+
+    def is_within_root(self, path):
+        real = os.path.realpath(path)
+        for root in map(os.path.realpath, self.root_dirs):
+            if real == root or real.startswith(root + os.sep):
+                return True
+        return False
+
+    def thumbnail(self, path, size=512):
+        """JPEG bytes for path scaled to fit size x size (cached by path, mtime and size)."""
+        timer = StageTimer()
+        with io_accounting() as stats:
+            data = self._thumbnail(path, size)
+        log_timing("thumbnail", timer.as_dict(stats), path=path, size=size)
+        return data
+
+    def _thumbnail(self, path, size):
+        key = (path, fsio.getmtime(path), size)
+        with self._thumbs_lock:
+            data = self._thumbs.get(key)
+            if data is not None:
+                self._thumbs.move_to_end(key)
+                return data
+
+        from PIL import Image
+        with fsio.open_file(path, "rb") as f, Image.open(f) as img:
+            img.thumbnail((size, size))
+            buf = io.BytesIO()
+            img.convert("RGB").save(buf, format="JPEG", quality=85)
+        data = buf.getvalue()
+
+        with self._thumbs_lock:
+            self._thumbs[key] = data
+            while len(self._thumbs) > THUMB_CACHE_SIZE:
+                self._thumbs.popitem(last=False)
+        return data
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    service: SearchService = None
+    server_version = "NaturoSearch/1.0"
+
+    def log_message(self, fmt, *args):
+        sys.stderr.write("%s - %s\n" % (self.address_string(), fmt % args))
+
+    def send_json(self, obj, status=200):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_bytes(self, data, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length).decode("utf-8"))
+        except ValueError:
+            raise BadRequest("request body is not valid JSON") from None
+        if not isinstance(body, dict):
+            raise BadRequest("request body must be a JSON object")
+        return body
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            if url.path in ("/", "/index.html"):
+                with open(os.path.join(WEB_DIR, "index.html"), "rb") as f:
+                    self.send_bytes(f.read(), "text/html; charset=utf-8")
+            elif url.path == "/api/health":
+                self.send_json(self.service.health())
+            elif url.path == "/api/search":
+                code = (query.get("code") or [""])[0].strip()
+                if not code:
+                    self.send_json({"error": "missing 'code'"}, 400)
+                    return
+                limit = parse_number("limit", (query.get("limit") or [""])[0], int, 1)
+                budget = parse_number("budget_ms", (query.get("budget_ms") or [""])[0], float, 0)
+                start = perf_counter()
+                out = self.service.search_code(code, limit, budget)
+                out["elapsed_ms"] = round((perf_counter() - start) * 1000.0, 2)
+                self.send_json(out)
+            elif url.path == "/api/vocab":
+                self.send_json(self.service.vocabulary())
+            elif url.path == "/api/complete":
+                text = (query.get("text") or [""])[0]
+                limit = parse_number("limit", (query.get("limit") or ["10"])[0], int, 1)
+                self.send_json(self.service.complete_code(text, limit))
+            elif url.path == "/api/thumbnail":
+                path = (query.get("path") or [""])[0]
+                size = parse_number("size", (query.get("size") or ["512"])[0], int, 1)
+                if not path or not self.service.is_within_root(path) or not os.path.isfile(path):
+                    self.send_json({"error": "file not found under catalog root"}, 404)
+                    return
+                if path.lower().endswith('.pdf'):
+                    self.send_json({"error": "PDF preview not supported"}, 415)
+                    return
+                try:
+                    data = self.service.thumbnail(path, size)
+                except ImportError:
+                    self.send_json({"error": "thumbnails need Pillow installed on the server"}, 501)
+                    return
+                self.send_bytes(data, "image/jpeg")
+            else:
+                self.send_json({"error": "not found"}, 404)
+        except BadRequest as e:
+            self.send_json({"error": str(e)}, 400)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            if url.path == "/api/search/selection":
+                body = self.read_json()
+                start = perf_counter()
+                max_suggestions = parse_number("max_suggestions", body.get("max_suggestions", 200), int, 0)
+                out = self.service.search_selection(body, max_suggestions=max_suggestions)
+                out["elapsed_ms"] = round((perf_counter() - start) * 1000.0, 2)
+                self.send_json(out)
+            elif url.path == "/api/facets":
+                self.send_json(self.service.facet_counts(self.read_json()))
+            elif url.path == "/api/rebuild":
+                root = (parse_qs(url.query).get("root") or [None])[0]
+                if root and root not in self.service.root_dirs:
+                    self.send_json({"error": "unknown root"}, 400)
+                    return
+                self.service.rebuild(root, force=True)
+                self.send_json(self.service.health())
+            else:
+                self.send_json({"error": "not found"}, 404)
+        except BadRequest as e:
+            self.send_json({"error": str(e)}, 400)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+
+def serve(service: SearchService, host="127.0.0.1", port=DEFAULT_PORT):
+    handler = type("BoundSearchRequestHandler", (SearchRequestHandler,), {"service": service})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    service.start_watcher()
+    print(f"Serving {', '.join(service.root_dirs)} on http://{host}:{port}/")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        httpd.server_close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m V2.server", description="Local search service for the catalog.")
+    ap.add_argument("--host", default="127.0.0.1", help="bind address; use a LAN address to share (default: %(default)s)")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT, help="port (default: %(default)s)")
+    add_index_arguments(ap)
+    ap.add_argument("--watch", type=float, default=60.0, help="seconds between change checks, 0 to disable (default: %(default)s)")
+    args = ap.parse_args(argv)
+
+    root_dirs = root_dirs_or_exit(ap, args)
+
+    serve(SearchService(root_dirs, cache_file=args.cache, watch_interval=args.watch), args.host, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
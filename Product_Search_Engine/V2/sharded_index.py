@@ -0,0 +1,219 @@
+import hashlib
+import heapq
+import os
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .constants import TREE_CACHE_FILE, DID_YOU_MEAN_LIMIT, COMPLETION_LIMIT
+from .folder_index import FolderIndex
+from .scoring import FACET_FIELDS
+from .timing import continue_in_background, merge_timings
+from . import profiling
+
+
+def shard_cache_file(root_dir: str, cache_file: str = TREE_CACHE_FILE) -> str:
+    """Per-root cache file next to cache_file, e.g. folder_tree.marble-sheets-1a2b3c4d.json"""
+    stem, ext = os.path.splitext(cache_file)
+    name = os.path.basename(os.path.normpath(root_dir)) or "root"
+    slug = "".join(ch if ch.isalnum() else "-" for ch in name.lower()).strip("-")[:40] or "root"
+    digest = hashlib.md5(os.path.abspath(root_dir).encode("utf-8", "ignore")).hexdigest()[:8]
+    return f"{stem}.{slug}-{digest}{ext or '.json'}"
+
+
+class ShardedIndex:
+    """
+    One FolderIndex shard per catalog root, each with its own cache file.
+    Searches fan out to all shards in parallel and the results are merged;
+    rebuilding a shard publishes a new generation of that shard only.
+    Exposes the same search methods as FolderIndex. A budget applies to each
+    shard's search, which run in parallel; the merged result is incomplete
+    when any shard's was.
+    """
+    def __init__(self, root_dirs: List[str], cache_file: str = TREE_CACHE_FILE,
+                 force_rebuild: bool = False, validate_cache: bool = True):
+        if not root_dirs:
+            raise ValueError("ShardedIndex needs at least one root directory")
+        self.root_dirs = list(dict.fromkeys(root_dirs))
+        self.root_dir = self.root_dirs[0]
+        self.cache_file = cache_file
+        self.validate_cache = validate_cache
+        self._pool = ThreadPoolExecutor(max_workers=len(self.root_dirs), thread_name_prefix="shard")
+        self.shards: Dict[str, FolderIndex] = dict(zip(
+            self.root_dirs,
+            self._pool.map(lambda r: self._open_shard(r, force_rebuild), self.root_dirs),
+        ))
+
+    def _cache_file_for(self, root_dir: str) -> str:
+        # A single root keeps the historical cache file name.
+        if len(self.root_dirs) == 1:
+            return self.cache_file
+        return shard_cache_file(root_dir, self.cache_file)
+
+    def _open_shard(self, root_dir: str, force: bool) -> FolderIndex:
+        return FolderIndex(root_dir, cache_file=self._cache_file_for(root_dir),
+                           force_rebuild=force, validate_cache=self.validate_cache)
+
+    @property
+    def hash(self) -> str:
+        hasher = hashlib.md5()
+        for root in self.root_dirs:
+            hasher.update((self.shards[root].hash or "").encode("utf-8"))
+        return hasher.hexdigest()
+
+    @property
+    def tree(self):
+        # Truthy when at least one shard has a tree (mirrors FolderIndex.tree checks).
+        return [s.tree for s in self.shards.values() if s.tree] or None
+
+    def rebuild_shard(self, root_dir: str, force: bool = True) -> bool:
+        """
+        Publish a new generation of root_dir's shard: always with force, otherwise only
+        if its catalog changed (FolderIndex.refresh). The shard is kept, so its
+        completion trie and folder summaries update incrementally; other shards are
+        untouched. True if a generation was published.
+        """
+        shard = self.shards[root_dir]
+        if force:
+            shard.rebuild()
+            return True
+        return shard.refresh()
+
+    def rebuild(self, root_dir: Optional[str] = None, force: bool = True) -> bool:
+        roots = [root_dir] if root_dir else self.root_dirs
+        return any(list(self._pool.map(lambda r: self.rebuild_shard(r, force), roots)))
+
+    def _fan_out(self, fn):
+        shards = [self.shards[r] for r in self.root_dirs]
+        # A profiled search stays on the calling thread so the profiler sees the shard work.
+        if len(shards) == 1 or profiling.active():
+            return [fn(s) for s in shards]
+        return list(self._pool.map(fn, shards))
+
+    def search_files(self, code: str, limit: Optional[int] = None, budget_ms: Optional[float] = None) -> List[str]:
+        out = []
+        for results in self._fan_out(lambda s: s.search_files(code, limit, budget_ms)):
+            out.extend(results)
+        return out if limit is None else out[:limit]
+
+    def debug_search_files(self, code: str, max_show: int = 60, limit: Optional[int] = None,
+                           budget_ms: Optional[float] = None, on_complete=None, on_error=None) -> Tuple[Dict, List[str]]:
+        parts = self._fan_out(lambda s: s.debug_search_files(code, max_show, limit, budget_ms))
+        if len(parts) == 1:
+            debug, matches = parts[0]
+        else:
+            debug, matches = self._merge_code_parts(parts, max_show, limit)
+        if debug.get("incomplete") and on_complete is not None:
+            continue_in_background(lambda: self.debug_search_files(code, max_show, limit), on_complete, on_error)
+        return debug, matches
+
+    def _merge_code_parts(self, parts, max_show: int, limit: Optional[int]) -> Tuple[Dict, List[str]]:
+        debugs = [d for d, _ in parts]
+        matches = [p for _, m in parts for p in m]
+        if limit is not None:
+            matches = matches[:limit]
+        debug = merge_debug(debugs, self.root_dirs)
+        debug["matches_count"] = len(matches)
+        debug["truncated"] = any(d.get("truncated") for d in debugs) or (limit is not None and len(matches) >= limit)
+        debug["matches"] = matches[:max_show]
+        debug["rejections"] = [r for d in debugs for r in d.get("rejections", [])][:max_show]
+        suggested = sorted((s for d in debugs for s in d.get("did_you_mean", [])), key=lambda x: -x[1])
+        debug["did_you_mean"] = [] if matches else suggested[:DID_YOU_MEAN_LIMIT]
+        return debug, matches
+
+    def search_by_selection(self, selection: dict, max_suggestions: int = 200, budget_ms: Optional[float] = None,
+                            on_complete=None, on_error=None):
+        parts = self._fan_out(lambda s: s.search_by_selection(selection, max_suggestions, budget_ms))
+        if len(parts) == 1:
+            result = parts[0]
+        else:
+            result = self._merge_selection_parts(parts, selection, max_suggestions)
+        if result[0].get("incomplete") and on_complete is not None:
+            continue_in_background(lambda: self.search_by_selection(selection, max_suggestions), on_complete, on_error)
+        return result
+
+    def _merge_selection_parts(self, parts, selection: dict, max_suggestions: int):
+        exact = [p for _, ex, _ in parts for p in ex]
+        # Each shard's suggestions are already ranked top-k lists, so a lazy k-way merge
+        # only pulls max_suggestions items.
+        merged = heapq.merge(*[sugg for _, _, sugg in parts],
+                             key=lambda x: (-x[2], os.path.basename(x[0]).lower()))
+        suggestions = list(islice(merged, max_suggestions))
+        debug = merge_debug([d for d, _, _ in parts], self.root_dirs)
+        debug["selection"] = selection
+        debug["matches_count"] = len(exact)
+        debug["suggestions_count"] = len(suggestions)
+        debug["sample_suggestions"] = suggestions[:60]
+        return debug, exact, suggestions
+
+    def facet_counts(self, selection: dict, budget_ms: Optional[float] = None, on_complete=None, on_error=None) -> Dict:
+        parts = self._fan_out(lambda s: s.facet_counts(selection, budget_ms))
+        out = parts[0] if len(parts) == 1 else self._merge_facet_parts(parts)
+        if out.get("incomplete") and on_complete is not None:
+            continue_in_background(lambda: self.facet_counts(selection), on_complete, on_error)
+        return out
+
+    def complete_code(self, text: str, limit: int = COMPLETION_LIMIT) -> List[Tuple[str, int]]:
+        totals: Dict[str, int] = {}
+        for part in self._fan_out(lambda s: s.complete_code(text, limit)):
+            for code, n in part:
+                totals[code] = totals.get(code, 0) + n
+        return sorted(totals.items(), key=lambda x: (-x[1], x[0]))[:limit]
+
+    @staticmethod
+    def _merge_facet_parts(parts) -> Dict:
+        out = {}
+        for field in FACET_FIELDS:
+            totals = {}
+            for part in parts:
+                for code, n in part[field].items():
+                    totals[code] = totals.get(code, 0) + n
+            out[field] = totals
+        out["matches"] = sum(p["matches"] for p in parts)
+        out["candidates"] = sum(p["candidates"] for p in parts)
+        out["timings"] = merge_timings(p.get("timings") for p in parts)
+        out.update(merge_budget_info(parts))
+        return out
+
+
+def merge_debug(debugs: List[Dict], root_dirs: List[str]) -> Dict:
+    """Combine per-shard debug dicts; folder fields list every shard that found one."""
+    def found(key):
+        vals = [d.get(key) for d in debugs if d.get(key)]
+        return " | ".join(vals) if vals else None
+
+    debug = {
+        "initial_root": " | ".join(root_dirs),
+        "supplier_folder_found": found("supplier_folder_found"),
+        "folder_code_folder_found": found("folder_code_folder_found"),
+        "autodescent_final_root": found("autodescent_final_root"),
+        "autodescent_stop_reason": found("autodescent_stop_reason"),
+        "candidate_count": sum(d.get("candidate_count") or 0 for d in debugs),
+        "shards": dict(zip(root_dirs, debugs)),
+        "timings": merge_timings(d.get("timings") for d in debugs),
+    }
+    if "parsed" in debugs[0]:
+        debug["parsed"] = debugs[0]["parsed"]
+    debug.update(merge_budget_info(debugs))
+    return debug
+
+
+def merge_budget_info(parts: List[Dict]) -> Dict:
+    """Budget fields of per-shard results: incomplete if any shard was; stopped_at lists each shard's stage."""
+    if not any("budget_ms" in p for p in parts):
+        return {}
+    stopped = [p.get("stopped_at") for p in parts if p.get("stopped_at")]
+    return {
+        "budget_ms": max(p.get("budget_ms") or 0 for p in parts),
+        "incomplete": any(p.get("incomplete") for p in parts),
+        "stopped_at": " | ".join(stopped) if stopped else None,
+    }
+
+
+def open_index(root_dirs, cache_file: str = TREE_CACHE_FILE, **kwargs):
+    """FolderIndex for a single root, ShardedIndex when several roots are configured."""
+    if isinstance(root_dirs, str):
+        root_dirs = [root_dirs]
+    if len(root_dirs) == 1:
+        return FolderIndex(root_dirs[0], cache_file=cache_file, **kwargs)
+    return ShardedIndex(root_dirs, cache_file=cache_file, **kwargs)
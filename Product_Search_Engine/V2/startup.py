@@ -0,0 +1,20 @@
+"""
+Start-up milestones measured from the first import of this module.
+V2.main imports it before anything else, so marks are close to process start.
+"""
+from time import perf_counter
+
+PROCESS_START = perf_counter()
+_marks = {}
+
+
+def mark(name: str) -> float:
+    """Record a milestone once (later calls are ignored) and return its time in ms."""
+    if name not in _marks:
+        _marks[name] = (perf_counter() - PROCESS_START) * 1000.0
+        print(f"[startup] {name}: {_marks[name]:.0f} ms")
+    return _marks[name]
+
+
+def marks() -> dict:
+    return dict(_marks)
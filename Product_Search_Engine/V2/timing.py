@@ -0,0 +1,150 @@
+import json
+import logging
+import logging.handlers
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+from .constants import TIMING_LOG_FILE, TIMING_LOG_MAX_BYTES, TIMING_LOG_BACKUPS
+
+_logger: Optional[logging.Logger] = None
+_logger_lock = threading.Lock()
+
+
+class StageTimer:
+    """
+    Monotonic per-stage timings plus counters for one search or index operation.
+    Stages entered more than once accumulate.
+
+    With a budget_ms, out_of_time() turns true once the budget has run out and
+    remembers the stage that was running then (stopped_at); work that waits on
+    the disk checks it and returns what it has so far.
+    """
+    def __init__(self, budget_ms: Optional[float] = None):
+        self.start = perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.budget_ms = budget_ms
+        self.stopped_at: Optional[str] = None
+        self._deadline = None if budget_ms is None else self.start + budget_ms / 1000.0
+        self._running: List[str] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = perf_counter()
+        self._running.append(name)
+        try:
+            yield
+        finally:
+            self._running.pop()
+            self.stages[name] = self.stages.get(name, 0.0) + (perf_counter() - t0) * 1000.0
+
+    def out_of_time(self) -> bool:
+        if self.stopped_at is not None:
+            return True
+        if self._deadline is None or perf_counter() < self._deadline:
+            return False
+        self.stopped_at = self._running[-1] if self._running else "start"
+        return True
+
+    @property
+    def incomplete(self) -> bool:
+        return self.stopped_at is not None
+
+    def budget_info(self) -> Dict:
+        """{"budget_ms", "incomplete", "stopped_at"} for operations run with a budget, else {}."""
+        if self.budget_ms is None:
+            return {}
+        return {"budget_ms": self.budget_ms, "incomplete": self.incomplete, "stopped_at": self.stopped_at}
+
+    def count(self, name: str, value: int):
+        self.counts[name] = value
+
+    def as_dict(self, io=None) -> Dict:
+        """io: optional fsio.IOStats collected over the same operation."""
+        out = {
+            "total_ms": round((perf_counter() - self.start) * 1000.0, 3),
+            "stages_ms": {k: round(v, 3) for k, v in self.stages.items()},
+            "counts": dict(self.counts),
+        }
+        if io is not None:
+            out["io"] = io.as_dict()
+        return out
+
+
+def continue_in_background(fn: Callable, on_complete: Callable, on_error: Optional[Callable] = None):
+    """
+    Run fn (an unbudgeted search) on a daemon thread and pass its result to on_complete
+    there; if it fails, the error message goes to on_error (printed without one).
+    """
+    def run():
+        try:
+            result = fn()
+        except Exception as e:
+            if on_error is None:
+                print("Background search failed:", e)
+            else:
+                on_error(str(e))
+            return
+        on_complete(result)
+
+    threading.Thread(target=run, name="search-continue", daemon=True).start()
+
+
+def get_timing_logger() -> logging.Logger:
+    """JSON-lines logger writing to a rotating TIMING_LOG_FILE (configured on first use)."""
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                logger = logging.getLogger("naturo.timing")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                try:
+                    handler = logging.handlers.RotatingFileHandler(
+                        TIMING_LOG_FILE, maxBytes=TIMING_LOG_MAX_BYTES,
+                        backupCount=TIMING_LOG_BACKUPS, encoding="utf-8", delay=True)
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    logger.addHandler(handler)
+                except Exception as e:
+                    print("Failed to open timing log:", e)
+                    logger.addHandler(logging.NullHandler())
+                _logger = logger
+    return _logger
+
+
+def log_timing(operation: str, timings: Dict, **fields):
+    """Append one structured record for a finished operation."""
+    record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "op": operation}
+    record.update(fields)
+    record.update(timings)
+    try:
+        get_timing_logger().info(json.dumps(record, default=str))
+    except Exception:
+        pass
+
+
+def merge_timings(parts) -> Dict:
+    """Combine timings of operations that ran in parallel (slowest stage wins, counts and I/O add up)."""
+    stages, counts, total = {}, {}, 0.0
+    io_calls, io_ms = {}, {}
+    for t in parts:
+        if not t:
+            continue
+        total = max(total, t.get("total_ms", 0.0))
+        for k, v in t.get("stages_ms", {}).items():
+            stages[k] = max(stages.get(k, 0.0), v)
+        for k, v in t.get("counts", {}).items():
+            counts[k] = counts.get(k, 0) + v
+        io = t.get("io") or {}
+        for k, v in io.get("calls", {}).items():
+            io_calls[k] = io_calls.get(k, 0) + v
+        for k, v in io.get("ms", {}).items():
+            io_ms[k] = round(io_ms.get(k, 0.0) + v, 3)
+    out = {"total_ms": total, "stages_ms": stages, "counts": counts}
+    if io_calls:
+        out["io"] = {"calls": io_calls, "ms": io_ms, "total_calls": sum(io_calls.values()),
+                     "total_ms": round(sum(io_ms.values()), 3)}
+    return out
@@ -0,0 +1,82 @@
+"""
+Read-only tree nodes backed by a cache file.
+
+FolderIndex code walks tree nodes as dicts: {"_path": ..., "_files": [...],
+<child name>: <child node>, ...}. TreeNode gives cache-backed nodes the same
+mapping interface. Subclasses provide path, files and children; files are
+only produced when "_files" is read, and items() hands out a LazyFiles
+placeholder for it, so the usual "for k, v in node.items(): skip _path and
+_files" walks never load file names.
+Unlike dict nodes they compare and hash by identity.
+"""
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterator, List
+
+META_KEYS = ("_path", "_files")
+
+
+class LazyFiles(Sequence):
+    """The "_files" value handed out by TreeNode.items(); reads the list on first use."""
+    __slots__ = ("_node",)
+
+    def __init__(self, node: "TreeNode"):
+        self._node = node
+
+    def __getitem__(self, i):
+        return self._node.files[i]
+
+    def __len__(self):
+        return len(self._node.files)
+
+    def __iter__(self):
+        return iter(self._node.files)
+
+    def __repr__(self):
+        return repr(self._node.files)
+
+
+class TreeNode(Mapping):
+    """Mapping view of one folder."""
+    __slots__ = ()
+
+    @property
+    def path(self) -> str:
+        raise NotImplementedError
+
+    @property
+    def files(self) -> List[str]:
+        raise NotImplementedError
+
+    @property
+    def children(self) -> Dict[str, "TreeNode"]:
+        raise NotImplementedError
+
+    @property
+    def file_count(self) -> int:
+        """len(files), without reading the names where the cache records the count."""
+        return len(self.files)
+
+    def __getitem__(self, key):
+        if key == "_path":
+            return self.path
+        if key == "_files":
+            return self.files
+        return self.children[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from META_KEYS
+        yield from self.children
+
+    def __len__(self):
+        return len(META_KEYS) + len(self.children)
+
+    def items(self):
+        return [("_path", self.path), ("_files", LazyFiles(self))] + list(self.children.items())
+
+    __hash__ = object.__hash__
+
+    def __eq__(self, other):
+        return self is other
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.path!r})"
@@ -0,0 +1,121 @@
+"""
+Trigram index over normalized file names.
+
+Every substring test the matchers do ("term in searchable") can be narrowed to
+the files containing all of the term's trigrams; those candidates are then
+verified with the real test, so results are identical to a full scan. Terms
+shorter than three characters (or with characters outside [0-9a-z]) cannot be
+narrowed and return None.
+The same postings rank files by trigram similarity for typo-tolerant lookup
+("did you mean").
+"""
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+_CODE = {ch: i for i, ch in enumerate(ALPHABET)}
+_BASE = len(ALPHABET)
+N_TRIGRAMS = _BASE ** 3  # 46656, fits in uint16
+
+
+def trigram_codes(text: str) -> Optional[set]:
+    """Integer codes of the trigrams of text; None if it has a character outside ALPHABET."""
+    try:
+        digits = [_CODE[ch] for ch in text]
+    except KeyError:
+        return None
+    return {(digits[i] * _BASE + digits[i + 1]) * _BASE + digits[i + 2] for i in range(len(digits) - 2)}
+
+
+class TrigramIndex:
+    """
+    Postings for every trigram of texts (expected to be normalize_alnum_only
+    strings). Ids are positions in texts, so callers keep their own id -> path
+    mapping. Built with NumPy in one pass over the concatenated texts; postings
+    are slices of a single id array sorted by (trigram, id).
+    """
+    def __init__(self, texts: Sequence[str]):
+        import numpy as np
+        self.texts = texts
+        n = len(texts)
+        lookup = np.full(256, -1, dtype=np.int64)
+        for ch, i in _CODE.items():
+            lookup[ord(ch)] = i
+        # "|" separates texts and breaks every trigram that would span two of them.
+        joined = "|".join(texts).encode("ascii", "replace")
+        sym = lookup[np.frombuffer(joined, dtype=np.uint8)]
+        if len(sym) >= 3:
+            a, b, c = sym[:-2], sym[1:-1], sym[2:]
+            valid = (a >= 0) & (b >= 0) & (c >= 0)
+            codes = (a * _BASE + b) * _BASE + c
+            lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=n)
+            doc = np.repeat(np.arange(n, dtype=np.int64), lengths + 1)[:len(sym) - 2]
+            codes, doc = codes[valid].astype(np.uint16), doc[valid]
+            # A stable sort on 16-bit keys is a radix sort and keeps ids ascending within a trigram.
+            order = np.argsort(codes, kind="stable")
+            trigram_of, ids = codes[order], doc[order]
+            first = np.ones(len(ids), dtype=bool)
+            first[1:] = (trigram_of[1:] != trigram_of[:-1]) | (ids[1:] != ids[:-1])
+            trigram_of, self.ids = trigram_of[first], ids[first].astype(np.int32)
+        else:
+            trigram_of = np.zeros(0, dtype=np.uint16)
+            self.ids = np.zeros(0, dtype=np.int32)
+        self.offsets = np.searchsorted(trigram_of, np.arange(N_TRIGRAMS + 1))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def posting(self, code: int) -> "np.ndarray":
+        return self.ids[self.offsets[code]:self.offsets[code + 1]]
+
+    def candidates(self, substring: str) -> Optional["np.ndarray"]:
+        """Sorted ids of texts that contain every trigram of substring (None: cannot narrow)."""
+        import numpy as np
+        codes = trigram_codes(substring)
+        if not codes:
+            return None
+        postings = sorted((self.posting(c) for c in codes), key=len)
+        out = postings[0]
+        for p in postings[1:]:
+            if not len(out):
+                break
+            out = np.intersect1d(out, p, assume_unique=True)
+        return out
+
+    def find(self, substring: str) -> Optional[List[int]]:
+        """Ids of texts containing substring, in id order (None: cannot narrow)."""
+        ids = self.candidates(substring)
+        if ids is None:
+            return None
+        texts = self.texts
+        return [i for i in ids.tolist() if substring in texts[i]]
+
+    def find_any(self, substrings: Iterable[str]) -> Optional[List[int]]:
+        """Ids of texts containing at least one of substrings (None if any of them cannot be narrowed)."""
+        found = set()
+        for s in substrings:
+            ids = self.find(s)
+            if ids is None:
+                return None
+            found.update(ids)
+        return sorted(found)
+
+    def similar(self, query: str, limit: int = 10, min_similarity: float = 0.5) -> List[Tuple[int, float]]:
+        """
+        Texts ranked by the share of query trigrams they contain (1.0 = all of
+        them), best first; ties go to the lower id. Tolerates typos and missing
+        or extra segments in the query. Characters outside ALPHABET are dropped.
+        """
+        import numpy as np
+        codes = trigram_codes("".join(ch for ch in query if ch in _CODE))
+        if not codes or not len(self.texts):
+            return []
+        counts = np.bincount(np.concatenate([self.posting(c) for c in codes]), minlength=len(self.texts))
+        need = max(1, int(np.ceil(min_similarity * len(codes))))
+        ids = np.flatnonzero(counts >= need)
+        if not len(ids):
+            return []
+        order = np.lexsort((ids, -counts[ids]))[:limit]
+        return [(int(ids[k]), round(float(counts[ids[k]]) / len(codes), 3)) for k in order]
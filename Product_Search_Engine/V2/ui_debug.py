@@ -1,5 +1,6 @@
 import json
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QTextEdit
+from .planner import describe_plan
 
 class DebugDialog(QDialog):
     def __init__(self, debug_info):
@@ -19,6 +20,10 @@ class DebugDialog(QDialog):
         content.append(f"Auto-descent stop reason: {debug_info.get('autodescent_stop_reason')}")
         content.append("")
         content.append(f"Candidate files scanned: {debug_info['candidate_count']}")
+        if debug_info.get("plan"):
+            content.append(f"Query plan: {describe_plan(debug_info['plan'])}")
+        if debug_info.get("incomplete"):
+            content.append(f"Time budget of {debug_info['budget_ms']:g} ms ran out during: {debug_info['stopped_at']}")
         content.append(f"Matching files found: {debug_info['matches_count']} (showing up to {len(debug_info['matches'])})")
         content.append("Matches:")
         for m in debug_info["matches"]:
@@ -27,6 +32,24 @@ class DebugDialog(QDialog):
         content.append("Sample rejections (file -> missing parts):")
         for p, reasons in debug_info["rejections"]:
             content.append(" - " + p + " -> missing: " + ",".join(reasons))
+        if debug_info.get("did_you_mean"):
+            content.append("")
+            content.append("Did you mean (trigram similarity):")
+            for p, sim in debug_info["did_you_mean"]:
+                content.append(f" - {p} ({sim:.0%})")
+        timings = debug_info.get("timings")
+        if timings:
+            content.append("")
+            content.append(f"Timings (total {timings.get('total_ms')} ms):")
+            for stage, ms in timings.get("stages_ms", {}).items():
+                content.append(f" - {stage}: {ms:.3f} ms")
+            for name, value in timings.get("counts", {}).items():
+                content.append(f" - {name}: {value}")
+            io = timings.get("io")
+            if io:
+                content.append(f"Filesystem calls: {io.get('total_calls')} in {io.get('total_ms')} ms")
+                for kind, n in io.get("calls", {}).items():
+                    content.append(f" - {kind}: {n} ({io.get('ms', {}).get(kind, 0.0):.3f} ms)")
         text.setText("\n".join(content))
         layout.addWidget(text)
         self.setLayout(layout)
@@ -0,0 +1,17 @@
+from PySide6.QtCore import QThread, Signal
+
+
+class IndexLoader(QThread):
+    """Runs an index build/load callable off the GUI thread."""
+    loaded = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, build, parent=None):
+        super().__init__(parent)
+        self._build = build
+
+    def run(self):
+        try:
+            self.loaded.emit(self._build())
+        except Exception as e:
+            self.failed.emit(str(e))
@@ -1,25 +1,44 @@
 import os
-from PIL import Image, ImageQt
-from PySide6.QtCore import Qt, QPropertyAnimation
+from typing import Optional
+from PySide6.QtCore import Qt, QPropertyAnimation, QStringListModel, QTimer, Signal
 from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, QComboBox, QLineEdit, QToolBox,
     QScrollArea, QCheckBox, QSizePolicy, QLabel, QPushButton, QStackedWidget,
-    QRadioButton, QButtonGroup, QSplitter, QListWidget, QMessageBox, QListWidgetItem
+    QRadioButton, QButtonGroup, QSplitter, QListWidget, QMessageBox, QListWidgetItem,
+    QProgressBar, QCompleter
 )
 
 from .constants import (
     MATERIAL_MAP, COLOR_MAP, DESIGN_CATEGORIES,
-    HEIGHT_SEARCH, HEIGHT_QN, HEIGHT_COLLAPSED_QN
+    HEIGHT_SEARCH, HEIGHT_QN, HEIGHT_COLLAPSED_QN, HEIGHT_OPTIONS, SEARCH_BUDGET_MS, COMPLETION_DEBOUNCE_MS
 )
 from .folder_index import FolderIndex
-from .ui_debug import DebugDialog
+from .parsing import build_selection
+from .attributes import label_counts
+from .startup import mark
+from .timing import StageTimer, log_timing
+from .fsio import io_accounting
+from . import profiling
+from . import fsio
+from .ui_index_loader import IndexLoader
 
 class SearchTab(QWidget):
-    def __init__(self, root_dir, index: FolderIndex):
+    """
+    Search UI. Only the code-search controls and results pane are built up front;
+    the questionnaire, the height animation, PIL and the debug dialog are created
+    on first use, and the index can be attached later via load_index()/set_index().
+    """
+    index_ready = Signal(object)
+    # (search seq, code, (debug, matches)) / (search seq, code, error) of a code search finished in the background
+    code_search_finished = Signal(int, str, object)
+    code_search_failed = Signal(int, str, str)
+
+    def __init__(self, root_dir, index: Optional[FolderIndex] = None):
         super().__init__()
         self.root_dir = root_dir
         self.index = index
+        self.loader = None
         layout = QVBoxLayout()
 
         toggle_row = QHBoxLayout()
@@ -39,75 +58,26 @@ class SearchTab(QWidget):
         code_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Enter full product code...")
+        # Suggestions come from the index's completion trie; the completer only displays them.
+        self.code_completions = QStringListModel(self)
+        self.code_completer = QCompleter(self.code_completions, self)
+        self.code_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.search_input.setCompleter(self.code_completer)
+        # Completions are fetched in the background once typing pauses (the index may be remote).
+        self.completion_timer = QTimer(self)
+        self.completion_timer.setSingleShot(True)
+        self.completion_timer.setInterval(COMPLETION_DEBOUNCE_MS)
+        self.completion_timer.timeout.connect(self.update_completions)
+        self.search_input.textEdited.connect(lambda _: self.completion_timer.start())
         code_layout.addWidget(self.search_input)
         code_widget.setLayout(code_layout)
 
-        qn_widget = QWidget()
-
-        left_form = QFormLayout()
-
-        self.material_cb = QComboBox()
-        self.material_cb.addItems([""] + list(MATERIAL_MAP.keys()))
-        left_form.addRow("Material:", self.material_cb)
-
-        self.height_cb = QComboBox()
-        self.height_cb.addItems(["", '8F', '9F', '9.5F'])
-        left_form.addRow("Height:", self.height_cb)
-
-        self.width_input = QLineEdit()
-        self.width_input.setPlaceholderText('Width in inches')
-        left_form.addRow("Width:", self.width_input)
-
-        self.color_cb = QComboBox()
-        self.color_cb.addItems([""] + list(COLOR_MAP.keys()))
-        left_form.addRow("Colour:", self.color_cb)
-
-        left_widget = QWidget()
-        left_widget.setLayout(left_form)
-
-        self.design_toolbox = QToolBox()
-        self.design_checkboxes = {}
-        for cat, designs in DESIGN_CATEGORIES.items():
-            scroll = QScrollArea()
-            scroll.setWidgetResizable(True)
-            container = QWidget()
-
-            vbox = QVBoxLayout(container)
-            vbox.setContentsMargins(0, 0, 0, 0)
-            vbox.setSpacing(2)
-
-            cb_list = []
-            for name in designs.keys():
-                cb = QCheckBox(name)
-                cb.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
-                row_layout = QHBoxLayout()
-                row_layout.setContentsMargins(0, 0, 0, 0)
-                row_layout.addWidget(cb)
-                row_layout.addStretch()
-                vbox.addLayout(row_layout)
-                cb_list.append(cb)
-
-            vbox.addStretch()
-            scroll.setWidget(container)
-            self.design_toolbox.addItem(scroll, cat)
-            self.design_checkboxes[cat] = cb_list
-
-        right_widget = self.design_toolbox
-
-        top_cols = QHBoxLayout()
-        top_cols.setContentsMargins(0, 0, 0, 0)
-        top_cols.setSpacing(10)
-        top_cols.addWidget(left_widget, 1)
-        top_cols.addWidget(right_widget, 2)
-
-        qn_main_vbox = QVBoxLayout()
-        qn_main_vbox.setContentsMargins(0, 0, 0, 0)
-        qn_main_vbox.setSpacing(5)
-        qn_main_vbox.addLayout(top_cols)
-        qn_widget.setLayout(qn_main_vbox)
+        # Questionnaire page is filled in by ensure_questionnaire() when first opened.
+        self.qn_widget = QWidget()
+        self.qn_built = False
 
         self.stack.addWidget(code_widget)
-        self.stack.addWidget(qn_widget)
+        self.stack.addWidget(self.qn_widget)
 
         self.top_widget = QWidget()
         top_panel = QVBoxLayout()
@@ -117,8 +87,7 @@ class SearchTab(QWidget):
         self.top_widget.setMaximumHeight(HEIGHT_SEARCH)
         self.top_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
 
-        self.height_anim = QPropertyAnimation(self.top_widget, b"maximumHeight")
-        self.height_anim.setDuration(300)
+        self.height_anim = None
 
         self.active_filters_label = QLabel("")
         self.active_filters_label.setStyleSheet("font-weight: bold; padding: 6px;")
@@ -154,15 +123,28 @@ class SearchTab(QWidget):
         self.splitter.setStretchFactor(1, 1)
         self.splitter.setMinimumHeight(300)
 
+        self.progress_label = QLabel("Loading folder index…")
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 0)  # busy indicator
+        self.progress_bar.setMaximumHeight(12)
+        self.progress_bar.setTextVisible(False)
+        progress_row = QHBoxLayout()
+        progress_row.addWidget(self.progress_label)
+        progress_row.addWidget(self.progress_bar, 1)
+
         debug_row = QHBoxLayout()
         self.reopen_btn = QPushButton("See questionnaire")
         self.debug_btn = QPushButton("Show Last Debug Info")
         self.refresh_cache_btn = QPushButton("Refresh Cache")
+        self.profile_check = QCheckBox("Profile next search")
+        self.profile_check.setChecked(profiling.is_armed())
+        self.profile_check.toggled.connect(lambda on: profiling.arm() if on else profiling.disarm())
         self.reopen_btn.clicked.connect(self.toggle_mode)
         self.debug_btn.clicked.connect(self.show_last_debug)
         self.refresh_cache_btn.clicked.connect(self.refresh_cache)
         debug_row.addStretch()
         debug_row.addWidget(self.reopen_btn)
+        debug_row.addWidget(self.profile_check)
         debug_row.addWidget(self.debug_btn)
         debug_row.addWidget(self.refresh_cache_btn)
 
@@ -170,13 +152,221 @@ class SearchTab(QWidget):
         layout.addWidget(self.active_filters_label)
         layout.addLayout(controls_row)
         layout.addWidget(self.splitter, stretch=1)
+        layout.addLayout(progress_row)
         layout.addLayout(debug_row)
         self.setLayout(layout)
 
         self.code_radio.toggled.connect(self.toggle_mode)
 
         self.last_debug = None
-        self.height_anim.finished.connect(self.enforce_splitter_sizes)
+        self.facet_worker = None
+        self.facet_pending = False
+        self.search_seq = 0
+        self.code_search_finished.connect(self.finish_search_code)
+        self.code_search_failed.connect(self.fail_search_code)
+        self.completion_worker = None
+        self.completion_pending = False
+        self.preview_path = None
+        self.set_index(index)
+
+    def ensure_questionnaire(self):
+        if self.qn_built:
+            return
+        self.qn_built = True
+
+        left_form = QFormLayout()
+
+        # Item data holds the option label; the visible text gets the facet count appended.
+        self.material_cb = QComboBox()
+        self.add_options(self.material_cb, MATERIAL_MAP.keys())
+        left_form.addRow("Material:", self.material_cb)
+
+        self.height_cb = QComboBox()
+        self.add_options(self.height_cb, HEIGHT_OPTIONS)
+        left_form.addRow("Height:", self.height_cb)
+
+        self.width_input = QLineEdit()
+        self.width_input.setPlaceholderText('Width in inches')
+        left_form.addRow("Width:", self.width_input)
+
+        self.color_cb = QComboBox()
+        self.add_options(self.color_cb, COLOR_MAP.keys())
+        left_form.addRow("Colour:", self.color_cb)
+
+        left_widget = QWidget()
+        left_widget.setLayout(left_form)
+
+        self.design_toolbox = QToolBox()
+        self.design_checkboxes = {}
+        for cat, designs in DESIGN_CATEGORIES.items():
+            scroll = QScrollArea()
+            scroll.setWidgetResizable(True)
+            container = QWidget()
+
+            vbox = QVBoxLayout(container)
+            vbox.setContentsMargins(0, 0, 0, 0)
+            vbox.setSpacing(2)
+
+            cb_list = []
+            for name in designs.keys():
+                cb = QCheckBox(name)
+                cb.setProperty("design", name)
+                cb.toggled.connect(self.update_facets)
+                cb.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
+                row_layout = QHBoxLayout()
+                row_layout.setContentsMargins(0, 0, 0, 0)
+                row_layout.addWidget(cb)
+                row_layout.addStretch()
+                vbox.addLayout(row_layout)
+                cb_list.append(cb)
+
+            vbox.addStretch()
+            scroll.setWidget(container)
+            self.design_toolbox.addItem(scroll, cat)
+            self.design_checkboxes[cat] = cb_list
+
+        right_widget = self.design_toolbox
+
+        top_cols = QHBoxLayout()
+        top_cols.setContentsMargins(0, 0, 0, 0)
+        top_cols.setSpacing(10)
+        top_cols.addWidget(left_widget, 1)
+        top_cols.addWidget(right_widget, 2)
+
+        qn_main_vbox = QVBoxLayout()
+        qn_main_vbox.setContentsMargins(0, 0, 0, 0)
+        qn_main_vbox.setSpacing(5)
+        qn_main_vbox.addLayout(top_cols)
+        self.qn_widget.setLayout(qn_main_vbox)
+
+        for cb in (self.material_cb, self.height_cb, self.color_cb):
+            cb.currentIndexChanged.connect(self.update_facets)
+        self.width_input.textChanged.connect(self.update_facets)
+        self.update_facets()
+
+    @staticmethod
+    def add_options(cb: QComboBox, labels):
+        cb.addItem("", None)
+        for label in labels:
+            cb.addItem(label, label)
+
+    def questionnaire_values(self):
+        """(material, height, width, color, designs) as currently entered."""
+        designs = []
+        for cb_list in self.design_checkboxes.values():
+            for cb in cb_list:
+                if cb.isChecked():
+                    designs.append(cb.property("design"))
+        return (
+            self.material_cb.currentData(),
+            self.height_cb.currentData(),
+            self.width_input.text().strip() or None,
+            self.color_cb.currentData(),
+            designs,
+        )
+
+    def update_facets(self, *_):
+        """Recompute facet counts in the background; changes made meanwhile trigger one more run."""
+        if not self.qn_built or self.index is None or not hasattr(self.index, "facet_counts"):
+            return
+        if self.facet_worker is not None and self.facet_worker.isRunning():
+            self.facet_pending = True
+            return
+        self.facet_pending = False
+        material, height, width_in, color, designs = self.questionnaire_values()
+        selection = build_selection(material=material, height=height, width_inches=width_in,
+                                    color=color, designs=designs)
+        index = self.index
+        self.facet_worker = IndexLoader(lambda: index.facet_counts(selection), self)
+        self.facet_worker.loaded.connect(self.apply_facets)
+        self.facet_worker.failed.connect(lambda message: print("Facet counts failed:", message))
+        self.facet_worker.finished.connect(self.facets_finished)
+        self.facet_worker.start()
+
+    def update_completions(self):
+        """Fetch completions of the search text in the background; edits made meanwhile trigger one more run."""
+        if self.index is None or not self.code_radio.isChecked() or not hasattr(self.index, "complete_code"):
+            return
+        if self.completion_worker is not None and self.completion_worker.isRunning():
+            self.completion_pending = True
+            return
+        self.completion_pending = False
+        index, text = self.index, self.search_input.text()
+        self.completion_worker = IndexLoader(lambda: index.complete_code(text), self)
+        self.completion_worker.loaded.connect(lambda completions: self.show_completions(text, completions))
+        self.completion_worker.failed.connect(lambda message: print("Code completion failed:", message))
+        self.completion_worker.finished.connect(self.completions_finished)
+        self.completion_worker.start()
+
+    def completions_finished(self):
+        if self.completion_pending:
+            self.update_completions()
+
+    def show_completions(self, text, completions):
+        if text != self.search_input.text():
+            return  # the text changed since; its own run shows its completions
+        self.code_completions.setStringList([code for code, _ in completions])
+        if completions and self.search_input.hasFocus():
+            self.code_completer.complete()
+
+    def facets_finished(self):
+        if self.facet_pending:
+            self.update_facets()
+
+    def apply_facets(self, counts):
+        """Append each option's match count and grey out options that would match nothing."""
+        if self.facet_pending:
+            return
+        labels = label_counts(counts)
+        self.show_option_counts(self.material_cb, labels["material"])
+        self.show_option_counts(self.height_cb, labels["height"])
+        self.show_option_counts(self.color_cb, labels["color"])
+        for cb_list in self.design_checkboxes.values():
+            for cb in cb_list:
+                name = cb.property("design")
+                n = labels["design"].get(name, 0)
+                cb.setText(f"{name} ({n})")
+                cb.setEnabled(n > 0 or cb.isChecked())
+
+    @staticmethod
+    def show_option_counts(cb: QComboBox, counts):
+        model = cb.model()
+        for i in range(1, cb.count()):
+            label = cb.itemData(i)
+            n = counts.get(label, 0)
+            cb.setItemText(i, f"{label} ({n})")
+            model.item(i).setEnabled(n > 0 or i == cb.currentIndex())
+
+    def set_index(self, index: Optional[FolderIndex]):
+        self.index = index
+        ready = index is not None
+        if ready:
+            self.update_facets()
+        self.search_btn_main.setEnabled(ready)
+        self.refresh_cache_btn.setEnabled(ready)
+        self.progress_label.setVisible(not ready)
+        self.progress_bar.setVisible(not ready)
+
+    def load_index(self, build, message="Loading folder index…"):
+        """Run build() (returning a FolderIndex) in the background, then attach it."""
+        if self.loader is not None and self.loader.isRunning():
+            return
+        self.set_index(None)
+        self.progress_label.setText(message)
+        self.loader = IndexLoader(build, self)
+        self.loader.loaded.connect(self.on_index_loaded)
+        self.loader.failed.connect(self.on_index_failed)
+        self.loader.start()
+
+    def on_index_loaded(self, index):
+        self.set_index(index)
+        mark("index_ready")
+        self.index_ready.emit(index)
+
+    def on_index_failed(self, message):
+        self.progress_label.setText("Folder index failed to load.")
+        self.progress_bar.setVisible(False)
+        QMessageBox.critical(self, "Index", f"Could not load the folder index:\n{message}")
 
     def enforce_splitter_sizes(self):
         total_w = max(self.width(), 1)
@@ -185,13 +375,14 @@ class SearchTab(QWidget):
         self.splitter.setSizes([left, right])
 
     def master_clear_all(self):
-        self.material_cb.setCurrentIndex(0)
-        self.height_cb.setCurrentIndex(0)
-        self.width_input.clear()
-        self.color_cb.setCurrentIndex(0)
-        for cb_list in self.design_checkboxes.values():
-            for cb in cb_list:
-                cb.setChecked(False)
+        if self.qn_built:
+            self.material_cb.setCurrentIndex(0)
+            self.height_cb.setCurrentIndex(0)
+            self.width_input.clear()
+            self.color_cb.setCurrentIndex(0)
+            for cb_list in self.design_checkboxes.values():
+                for cb in cb_list:
+                    cb.setChecked(False)
         self.search_input.clear()
         self.active_filters_label.setText("No filters applied")
         QMessageBox.information(self, "Cleared", "All inputs have been cleared.")
@@ -201,6 +392,7 @@ class SearchTab(QWidget):
             self.stack.setCurrentIndex(0)
             self.animate_height(HEIGHT_SEARCH)
         else:
+            self.ensure_questionnaire()
             self.stack.setCurrentIndex(1)
             avail = self.parent().height() if self.parent() else self.height()
             min_results_area = 300
@@ -209,16 +401,30 @@ class SearchTab(QWidget):
             self.animate_height(target)
 
     def animate_height(self, target_height):
+        if self.height_anim is None:
+            self.height_anim = QPropertyAnimation(self.top_widget, b"maximumHeight")
+            self.height_anim.setDuration(300)
+            self.height_anim.finished.connect(self.enforce_splitter_sizes)
         self.height_anim.stop()
         self.height_anim.setStartValue(self.top_widget.maximumHeight())
         self.height_anim.setEndValue(target_height)
         self.height_anim.start()
 
     def search_clicked(self):
-        if self.code_radio.isChecked():
-            self.do_search_code()
-        else:
-            self.do_search_qn()
+        if self.index is None:
+            QMessageBox.information(self, "Index", "The folder index is still loading.")
+            return
+        op = "search_code" if self.code_radio.isChecked() else "search_by_selection"
+        self.search_seq += 1  # late results of an earlier search are dropped
+        with profiling.profile_next(op, query=self.search_input.text().strip()) as prof:
+            if self.code_radio.isChecked():
+                self.do_search_code()
+            else:
+                self.do_search_qn()
+        mark("first_search")
+        if prof.report_path:
+            self.profile_check.setChecked(profiling.is_armed())
+            QMessageBox.information(self, "Profile", f"Profile written to:\n{os.path.abspath(prof.report_path)}")
 
     def do_search_code(self):
         code = self.search_input.text().strip()
@@ -228,32 +434,47 @@ class SearchTab(QWidget):
 
         self.active_filters_label.setText(f"Product code: {code}")
 
-        # Single search call with debug info
-        dbg, results = self.index.debug_search_files(code)
+        # Single search call with debug info; one that runs out of time shows what it
+        # found so far and finishes in the background, its result coming back through
+        # the signals (emitted on the search thread, delivered on this one)
+        seq = self.search_seq
+        dbg, results = self.index.debug_search_files(
+            code, budget_ms=SEARCH_BUDGET_MS,
+            on_complete=lambda out: self.code_search_finished.emit(seq, code, out),
+            on_error=lambda message: self.code_search_failed.emit(seq, code, message))
+        self.show_code_results(dbg, results)
+        if dbg.get("incomplete"):
+            self.active_filters_label.setText(f"Product code: {code} (partial results, still searching…)")
+
+    def finish_search_code(self, seq, code, out):
+        if seq != self.search_seq:
+            return
+        self.active_filters_label.setText(f"Product code: {code}")
+        self.show_code_results(*out)
+
+    def fail_search_code(self, seq, code, message):
+        if seq != self.search_seq:
+            return
+        self.active_filters_label.setText(f"Product code: {code} (partial results; search failed: {message})")
+
+    def show_code_results(self, dbg, results):
         self.last_debug = dbg
         self.populate_results(results)
 
-        if not results:
-            QMessageBox.information(self, "No Results", "No matching files found.")
-
-    from .parsing import build_selection  # add near imports
+        if not results and not dbg.get("incomplete"):
+            msg = "No matching files found."
+            similar = dbg.get("did_you_mean") or []
+            if similar:
+                msg += "\n\nDid you mean:\n" + "\n".join(os.path.basename(p) for p, _ in similar)
+            QMessageBox.information(self, "No Results", msg)
 
     def do_search_qn(self):
+        self.ensure_questionnaire()
         # Collapse the panel to free space
         self.animate_height(HEIGHT_COLLAPSED_QN)
 
-        # Collect selections
-        material = self.material_cb.currentText().strip() or None
-        height = self.height_cb.currentText().strip() or None
-        width_in = self.width_input.text().strip() or None
-        color = self.color_cb.currentText().strip() or None
-
-        # Collect selected designs across all categories
-        designs = []
-        for cat, cb_list in self.design_checkboxes.items():
-            for cb in cb_list:
-                if cb.isChecked():
-                    designs.append(cb.text())
+        # Collect selections (designs across all categories)
+        material, height, width_in, color, designs = self.questionnaire_values()
 
         # Build normalized selection
         selection = build_selection(
@@ -261,7 +482,7 @@ class SearchTab(QWidget):
             height=height,
             width_inches=width_in,
             color=color,
-            designs=designs,x
+            designs=designs,
             supplier=None,        # optionally add a Supplier dropdown later
             folder_code=None,     # optionally add Folder Code input later
             file_token=None       # optionally add extra token input later
@@ -290,6 +511,7 @@ class SearchTab(QWidget):
             "matches_count": len(exact),
             "matches": exact[:60],
             "rejections": [(p, m) for (p, m, _sc) in dbg.get("sample_suggestions", [])],
+            "timings": dbg.get("timings"),
         }
 
         # Populate UI list: exact first, then a separator, then suggestions
@@ -330,27 +552,61 @@ class SearchTab(QWidget):
 
     def show_preview(self, current, previous):
         if not current:
+            self.preview_path = None
             self.preview_label.setText("Preview will appear here")
             self.preview_label.setPixmap(QPixmap())
             return
         p = current.data(Qt.UserRole)
+        self.preview_path = p
+        timer = StageTimer()
+        with io_accounting() as io:
+            self._load_preview(p)
+        log_timing("preview", timer.as_dict(io), path=p)
+
+    def _load_preview(self, p):
         try:
             if p.lower().endswith(('.pdf',)):
                 # Future-proof: Add PDF preview support later
                 self.preview_label.setText("PDF preview not supported; open externally.")
                 self.preview_label.setPixmap(QPixmap())
                 return
-            img = Image.open(p)
+            if hasattr(self.index, "thumbnail"):
+                # Remote index: the service renders the preview; fetch it off the GUI thread.
+                self.preview_label.setText("Loading preview...")
+                self.preview_label.setPixmap(QPixmap())
+                index = self.index
+                worker = IndexLoader(lambda: index.thumbnail(p, 1024), self)
+                worker.loaded.connect(lambda data: self.show_thumbnail(p, data))
+                worker.failed.connect(lambda message: self.show_thumbnail(p, None))
+                worker.finished.connect(worker.deleteLater)
+                worker.start()
+                return
+            # PIL is only needed once a result is previewed.
+            from PIL import Image, ImageQt
+            with fsio.open_file(p, "rb") as f:
+                img = Image.open(f)
+                img.load()
             qimg = ImageQt.ImageQt(img)
-            pix = QPixmap.fromImage(qimg)
-            if not pix.isNull():
-                scaled = pix.scaled(self.preview_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.preview_label.setPixmap(scaled)
-            else:
-                self.preview_label.setText("Cannot preview image.")
+            self.show_pixmap(QPixmap.fromImage(qimg))
         except Exception:
             self.preview_label.setText("Cannot preview this file.")
 
+    def show_thumbnail(self, p, data):
+        if p != self.preview_path:
+            return  # another result was selected meanwhile
+        pix = QPixmap()
+        if data is None or not pix.loadFromData(data):
+            self.preview_label.setText("Cannot preview this file.")
+            return
+        self.show_pixmap(pix)
+
+    def show_pixmap(self, pix):
+        if not pix.isNull():
+            scaled = pix.scaled(self.preview_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.preview_label.setPixmap(scaled)
+        else:
+            self.preview_label.setText("Cannot preview image.")
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
         if self.preview_label.pixmap():
@@ -370,9 +626,19 @@ class SearchTab(QWidget):
         if not self.last_debug:
             QMessageBox.information(self, "Debug", "No debug info available yet.")
             return
+        from .ui_debug import DebugDialog
         dlg = DebugDialog(self.last_debug)
         dlg.exec()
 
     def refresh_cache(self):
-        self.index.rebuild()
-        QMessageBox.information(self, "Cache", "Folder index cache rebuilt.")
\ No newline at end of file
+        index = self.index
+        if index is None:
+            return
+
+        def rebuild():
+            index.rebuild()
+            return index
+
+        self.load_index(rebuild, "Rebuilding folder index…")
+        self.loader.loaded.connect(
+            lambda _index: QMessageBox.information(self, "Cache", "Folder index cache rebuilt."))
\ No newline at end of file